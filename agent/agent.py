@@ -42,6 +42,20 @@ def load_config():
         "collect_software": True,
         "max_retries": 3,
         "retry_delay": 5,
+        "collector_workers": 6,
+        "collector_timeout": 20,
+        "collection_timeout": 25,
+        "collector_intervals": {},
+        "cpu_sample_interval": 2,
+        "network_probe_interval": 10,
+        "network_probe_targets": ["8.8.8.8:53"],
+        "windows_update_ttl": 14400,
+        "license_cache_ttl": 86400,
+        "printer_probe_timeout": 5,
+        "report_compression": "auto",
+        "command_channel": True,
+        "command_wait": 25,
+        "command_workers": 4,
     }
 
     if os.path.exists(config_path):
@@ -67,9 +81,11 @@ CONFIG = load_config()
 
 from collectors import (
     collect_cpu,
+    start_cpu_sampler,
     collect_memory,
     collect_disk,
     collect_network,
+    start_network_monitor,
     collect_os_info,
     collect_processes,
     collect_event_logs,
@@ -81,13 +97,24 @@ from collectors import (
     collect_startup,
     collect_shared_folders,
     collect_usb_devices,
+    start_usb_monitor,
+    ack_usb_events,
     collect_windows_update,
     collect_services,
 )
 
+from collection import init_engine, Collector
+from report_delta import ReportDelta
+from compression import encode_json, resolve_codec
+from http_client import init_client
+from command_channel import CommandChannel
+
+# Shared keep-alive HTTP client for every agent-to-server call
+http = init_client(CONFIG["server_url"], CONFIG["api_key"], workers=CONFIG.get("command_workers", 4))
+
 # Remote actions
-from remote_actions import execute_command
-from server_messages import process_server_messages
+from command_executor import CommandExecutor
+from server_messages import process_server_messages, show_server_messages
 
 # Self-update
 from updater import auto_update, get_current_version
@@ -149,10 +176,38 @@ logger = logging.getLogger("ITMonitorAgent")
 logger.info(f"Agent started, logs directory: {log_dir}")
 
 
+_collection_engine = init_engine(
+    max_workers=CONFIG.get("collector_workers", 6),
+    collector_timeout=CONFIG.get("collector_timeout", 20),
+    cycle_timeout=CONFIG.get("collection_timeout", 25),
+)
+
+
+# Default refresh interval (seconds) per collector; anything not listed is
+# collected every cycle. Override per collector with "collector_intervals".
+DEFAULT_COLLECTOR_INTERVALS = {
+    "OS Info": 300,
+    "Antivirus": 3600,
+    "Printers": 900,
+    "Windows License": 900,
+    "Office License": 900,
+    "Startup Programs": 900,
+    "Shared Folders": 900,
+    "Windows Update": 300,
+    "Services": 300,
+    "Software": 6 * 3600,
+}
+
+
+def _interval(name):
+    """Get refresh interval for a collector (config overrides defaults)."""
+    intervals = CONFIG.get("collector_intervals") or {}
+    return intervals.get(name, DEFAULT_COLLECTOR_INTERVALS.get(name, 0))
+
+
 def collect_all_data():
-    """Collect all system data from all collectors."""
+    """Collect all system data from all collectors (concurrently)."""
     global tray
-    data = {}
 
     collectors = [
         ("OS Info", collect_os_info, {}),
@@ -163,26 +218,30 @@ def collect_all_data():
         ("Processes", collect_processes, {"top_count": CONFIG.get("top_processes_count", 15)}),
         ("Event Logs", collect_event_logs, {"max_count": CONFIG.get("event_log_count", 20)}),
         ("Antivirus", collect_antivirus, {}),
-        ("Printers", collect_printers, {}),
-        ("Windows License", collect_windows_license, {}),
-        ("Office License", collect_office_license, {}),
+        ("Printers", collect_printers, {"probe_timeout": CONFIG.get("printer_probe_timeout", 5)}),
+        ("Windows License", collect_windows_license, {"ttl": CONFIG.get("license_cache_ttl", 24 * 3600)}),
+        ("Office License", collect_office_license, {"ttl": CONFIG.get("license_cache_ttl", 24 * 3600)}),
         ("Startup Programs", collect_startup, {}),
         ("Shared Folders", collect_shared_folders, {}),
         ("USB Devices", collect_usb_devices, {}),
-        ("Windows Update", collect_windows_update, {}),
+        ("Windows Update", collect_windows_update, {"pending_ttl": CONFIG.get("windows_update_ttl", 4 * 3600)}),
         ("Services", collect_services, {}),
     ]
 
     if CONFIG.get("collect_software", True):
         collectors.append(("Software", collect_software, {}))
 
-    for name, collector, kwargs in collectors:
-        try:
-            result = collector(**kwargs)
-            data.update(result)
-            logger.debug(f"Collected {name} data")
-        except Exception as e:
-            logger.error(f"Error collecting {name}: {e}")
+    collectors = [
+        Collector(name, func, kwargs, interval=_interval(name))
+        for name, func, kwargs in collectors
+    ]
+
+    data, status = _collection_engine.collect(collectors)
+
+    # Report collectors that missed their deadline or failed
+    not_ok = {name: s for name, s in status.items() if s not in ("ok", "cached")}
+    if not_ok:
+        data["collection_status"] = not_ok
 
     data["department"] = CONFIG.get("department", "General")
 
@@ -193,30 +252,78 @@ def collect_all_data():
     return data
 
 
-def send_report(data):
-    """Send collected data to the IT Monitor server."""
-    global tray
-    url = f"{CONFIG['server_url']}/api/agent/report"
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": CONFIG["api_key"],
-    }
+class EndpointNotFound(Exception):
+    """Raised when the server does not implement an agent endpoint (HTTP 404)."""
+
+
+_report_delta = ReportDelta()
+_report_codec = resolve_codec(CONFIG.get("report_compression", "auto"))
+
+
+def send_report(data, incremental=True, endpoint="/api/agent/report", extra=None):
+    """
+    Send collected data to the IT Monitor server.
+    With incremental=True only sections changed since the last
+    acknowledged report are sent in full. extra fields are added to the
+    payload as-is. Returns the server's response dict, or None on failure.
+    """
+    global tray, _report_codec
 
     if tray:
         tray.update_status(tray.STATUS_SENDING)
 
+    def _build():
+        payload, hashes = _report_delta.encode(data) if incremental else (dict(data), {})
+        payload.update(extra or {})
+        return payload, hashes
+
+    payload, hashes = _build()
+    not_found = False
+
     for attempt in range(CONFIG.get("max_retries", 3)):
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            body, headers = encode_json(payload, _report_codec)
+            response = http.post(endpoint, data=body, headers=headers)
+            if "Content-Encoding" in headers and response.status_code == 415:
+                # Server can't decode this codec: step down for the rest of this run
+                _report_codec = "gzip" if _report_codec == "zstd" else "identity"
+                logger.warning(f"Server rejected compressed report (HTTP 415), falling back to {_report_codec}")
+                continue
+            if (
+                "Content-Encoding" in headers
+                and response.status_code >= 400
+                and response.status_code not in (404, 413)
+            ):
+                # Older servers parse the body as plain JSON and fail with
+                # 400/500, which a transient error looks like too: retry once
+                # uncompressed and keep identity only if that is accepted
+                plain_body, plain_headers = encode_json(payload, "identity")
+                response = http.post(endpoint, data=plain_body, headers=plain_headers)
+                if response.status_code == 200:
+                    logger.warning(
+                        "Server only accepted the report uncompressed, falling back to identity"
+                    )
+                    _report_codec = "identity"
             if response.status_code == 200:
                 result = response.json()
+                if result.get("resync") and payload.get("unchanged_sections"):
+                    # Server could not carry sections forward - resend in full
+                    logger.info("Server requested resync, resending full report")
+                    _report_delta.reset()
+                    payload, hashes = _build()
+                    continue
+                _report_delta.acknowledge(hashes)
                 logger.info(
                     f"Report sent successfully. Computer ID: {result.get('computerId', 'N/A')}, "
                     f"Alerts: {result.get('alerts', [])}"
                 )
                 if tray:
                     tray.on_report_sent(True)
-                return True
+                return result
+            elif response.status_code == 404 and endpoint != "/api/agent/report":
+                # Older server without this endpoint - let the caller fall back
+                not_found = True
+                break
             else:
                 logger.warning(
                     f"Server returned status {response.status_code}: {response.text[:200]}"
@@ -235,14 +342,17 @@ def send_report(data):
         if attempt < CONFIG.get("max_retries", 3) - 1:
             time.sleep(CONFIG.get("retry_delay", 5))
 
+    if not_found:
+        raise EndpointNotFound(endpoint)
+
     logger.error("Failed to send report after all retries")
     if tray:
         tray.on_report_sent(False)
-    return False
+    return None
 
 
 def save_offline_report(data):
-    """Save report locally when server is unreachable."""
+    """Save report locally when server is unreachable. Returns True if saved."""
     offline_dir = os.path.join(BASE_DIR, "offline_reports")
     os.makedirs(offline_dir, exist_ok=True)
 
@@ -253,8 +363,10 @@ def save_offline_report(data):
         with open(filepath, "w") as f:
             json.dump(data, f)
         logger.info(f"Saved offline report: {filename}")
+        return True
     except Exception as e:
         logger.error(f"Failed to save offline report: {e}")
+        return False
 
 
 def send_offline_reports():
@@ -270,7 +382,10 @@ def send_offline_reports():
             with open(filepath, "r") as f:
                 data = json.load(f)
 
-            if send_report(data):
+            # Replayed reports become the server's latest snapshot,
+            # so the next live report must not rely on older hashes
+            if send_report(data, incremental=False):
+                _report_delta.reset()
                 os.remove(filepath)
                 logger.info(f"Sent and removed offline report: {filename}")
             else:
@@ -279,18 +394,55 @@ def send_offline_reports():
             logger.error(f"Error processing offline report {filename}: {e}")
 
 
+# Results and delivered message ids waiting to ride on the next sync
+_pending_results = []
+_results_lock = threading.Lock()
+_delivered_messages = []
+_sync_supported = True
+_command_channel = None
+
+
+def post_command_result(result):
+    """Report a command result back to the server. Returns True on success."""
+    result = dict(result)
+    cmd_id = result.pop("id")
+    try:
+        resp = http.post(f"/api/agent/commands/{cmd_id}/result", json=result)
+        if resp.status_code == 200:
+            logger.info(f"Command {cmd_id} result sent: success={result.get('success')}")
+            return True
+        logger.warning(f"Command {cmd_id} result rejected: HTTP {resp.status_code}")
+    except Exception as e:
+        logger.error(f"Failed to send command result: {e}")
+    return False
+
+
+def _on_command_result(result):
+    """Executor callback: post the result now, or queue it for the next sync."""
+    if not post_command_result(result):
+        with _results_lock:
+            _pending_results.append(result)
+
+
+_command_executor = CommandExecutor(
+    _on_command_result,
+    max_workers=CONFIG.get("command_workers", 4),
+)
+
+
+def dispatch_commands(commands):
+    """Hand commands received from the server to the executor."""
+    logger.info(f"Received {len(commands)} pending command(s)")
+    _command_executor.submit(commands)
+
+
 def poll_commands():
-    """Poll server for pending commands and execute them."""
+    """Poll server for pending commands and execute them (legacy endpoints)."""
     import socket
-    url = f"{CONFIG['server_url']}/api/agent/commands"
-    headers = {
-        "Content-Type": "application/json",
-        "x-api-key": CONFIG["api_key"],
-    }
     params = {"hostname": socket.gethostname()}
 
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
+        resp = http.get("/api/agent/commands", params=params)
         if resp.status_code != 200:
             return
 
@@ -298,29 +450,7 @@ def poll_commands():
         if not commands:
             return
 
-        logger.info(f"Received {len(commands)} pending command(s)")
-
-        for cmd in commands:
-            cmd_id = cmd.get("id")
-            action = cmd.get("action")
-            cmd_params = cmd.get("params")
-
-            logger.info(f"Executing command {cmd_id}: {action}")
-
-            result = execute_command(action, cmd_params)
-
-            # Report result back to server
-            try:
-                result_url = f"{CONFIG['server_url']}/api/agent/commands/{cmd_id}/result"
-                requests.post(
-                    result_url,
-                    json=result,
-                    headers=headers,
-                    timeout=10,
-                )
-                logger.info(f"Command {cmd_id} result sent: success={result.get('success')}")
-            except Exception as e:
-                logger.error(f"Failed to send command result: {e}")
+        dispatch_commands(commands)
 
     except requests.exceptions.ConnectionError:
         pass  # Server unreachable, skip silently
@@ -328,10 +458,65 @@ def poll_commands():
         logger.error(f"Error polling commands: {e}")
 
 
+def flush_pending_results():
+    """Post queued command results directly (servers without /api/agent/sync)."""
+    global _pending_results
+    with _results_lock:
+        queued, _pending_results = _pending_results, []
+    failed = [r for r in queued if not post_command_result(r)]
+    if failed:
+        with _results_lock:
+            _pending_results = failed + _pending_results
+
+
+def sync_with_server(data):
+    """
+    Single round trip per cycle: send the report together with command
+    results and delivered message ids, and receive pending commands,
+    server messages and the latest agent version in the response.
+    Returns the response dict, or None if the sync failed.
+    """
+    global _sync_supported, _pending_results, _delivered_messages
+
+    with _results_lock:
+        sent_results = list(_pending_results)
+    extra = {
+        "command_results": sent_results,
+        "delivered_message_ids": list(_delivered_messages),
+    }
+    try:
+        result = send_report(data, endpoint="/api/agent/sync", extra=extra)
+    except EndpointNotFound:
+        logger.warning("Server has no /api/agent/sync - using separate requests")
+        _sync_supported = False
+        result = send_report(data)
+        if result is not None:
+            flush_pending_results()
+        return result
+    if result is None:
+        return None
+
+    # Server acknowledged the results we sent
+    with _results_lock:
+        _pending_results = _pending_results[len(sent_results):]
+    _delivered_messages = _delivered_messages[len(extra["delivered_message_ids"]):]
+
+    commands = result.get("commands") or []
+    if commands:
+        dispatch_commands(commands)
+
+    messages = result.get("messages") or []
+    if messages:
+        _delivered_messages.extend(show_server_messages(messages))
+
+    return result
+
+
 # Flag to control the agent loop
 _running = True
 _loop_count = 0
 _UPDATE_CHECK_INTERVAL = 10  # Check for updates every N cycles
+_latest_version = None  # Latest agent version as reported by the server
 
 
 def stop_agent():
@@ -344,42 +529,60 @@ def stop_agent():
 
 def agent_loop():
     """Main agent loop (runs in background thread when tray is active)."""
-    global _running, _loop_count
+    global _running, _loop_count, _latest_version
 
     while _running:
         try:
             # Send any offline reports first
             send_offline_reports()
 
-            # Poll for remote commands
-            poll_commands()
+            if not _sync_supported:
+                # Poll for remote commands unless the long-poll channel delivers them
+                if _command_channel is None:
+                    poll_commands()
 
-            # Check for server messages
-            try:
-                process_server_messages(CONFIG["server_url"], CONFIG["api_key"])
-            except Exception as e:
-                logger.debug(f"Error processing server messages: {e}")
+                # Messages only arrive via sync or this endpoint
+                try:
+                    process_server_messages(CONFIG["server_url"], CONFIG["api_key"])
+                except Exception as e:
+                    logger.debug(f"Error processing server messages: {e}")
 
-            # Check for self-update periodically
+            # Check for self-update periodically (skipped while the server
+            # reports that we already run the latest version)
             _loop_count += 1
             if _loop_count % _UPDATE_CHECK_INTERVAL == 1:
-                try:
-                    should_restart = auto_update(CONFIG["server_url"])
-                    if should_restart:
-                        logger.info("Update applied - agent will restart")
-                        os._exit(0)
-                except Exception as e:
-                    logger.error(f"Auto-update error: {e}")
+                stats = http.stats()
+                logger.info(
+                    f"HTTP client: {stats['requests']} requests over "
+                    f"{stats['connections']} connection(s)"
+                )
+                if _latest_version is None or _latest_version != get_current_version():
+                    try:
+                        should_restart = auto_update(CONFIG["server_url"])
+                        if should_restart:
+                            logger.info("Update applied - agent will restart")
+                            os._exit(0)
+                    except Exception as e:
+                        logger.error(f"Auto-update error: {e}")
 
             # Collect data
             logger.info("Collecting system data...")
             data = collect_all_data()
 
-            # Send report
-            success = send_report(data)
+            # Send report (plus commands/messages in the same round trip)
+            if _sync_supported:
+                result = sync_with_server(data)
+                if result and result.get("latest_version"):
+                    _latest_version = result["latest_version"].replace("agent-v", "")
+            else:
+                result = send_report(data)
+                if result is not None:
+                    flush_pending_results()
 
-            if not success:
-                save_offline_report(data)
+            # USB events stay queued (and ride on the next report) until
+            # the server or an offline report has them
+            if result is not None or save_offline_report(data):
+                ack_usb_events(data.get("usb_events"))
 
         except Exception as e:
             logger.error(f"Unexpected error in main loop: {e}")
@@ -393,7 +596,7 @@ def agent_loop():
 
 def main():
     """Main entry point."""
-    global tray
+    global tray, _command_channel
 
     logger.info("=" * 50)
     logger.info("IT Monitor Agent Starting")
@@ -405,6 +608,26 @@ def main():
     logger.info(f"System Tray: {'Enabled' if TRAY_AVAILABLE else 'Disabled'}")
     logger.info("=" * 50)
 
+    # Sample CPU in the background so reports carry interval statistics
+    start_cpu_sampler(CONFIG.get("cpu_sample_interval", 2))
+
+    # Probe gateway/server/targets in the background for link quality stats
+    start_network_monitor(
+        CONFIG.get("network_probe_interval", 10),
+        CONFIG["server_url"],
+        CONFIG.get("network_probe_targets", []),
+    )
+
+    # Keep the USB inventory current from device change notifications
+    start_usb_monitor()
+
+    # Receive remote commands over a long-poll channel, independent of reporting
+    if CONFIG.get("command_channel", True):
+        _command_channel = CommandChannel(
+            dispatch_commands, wait=CONFIG.get("command_wait", 25)
+        )
+        _command_channel.start()
+
     if TRAY_AVAILABLE:
         # Create tray icon
         tray = AgentTray(config=CONFIG, on_quit=stop_agent)
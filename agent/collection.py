@@ -0,0 +1,177 @@
+"""
+IT Monitor Agent - Collection Engine
+Runs collectors concurrently on a bounded thread pool with per-collector
+and per-cycle deadlines, so one slow collector cannot hold up the report.
+"""
+
+import time
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger("ITMonitorAgent")
+
+# name: display name, func: collector function, kwargs: collector arguments,
+# timeout: per-collector deadline in seconds (None = engine default),
+# interval: refresh interval in seconds (0 = collect every cycle)
+Collector = namedtuple("Collector", ["name", "func", "kwargs", "timeout", "interval"])
+Collector.__new__.__defaults__ = ({}, None, 0)
+
+STATUS_OK = "ok"
+STATUS_CACHED = "cached"
+STATUS_STALE = "stale"
+STATUS_MISSING = "missing"
+STATUS_ERROR = "error"
+
+# A collector that handles its own failure returns its fallback section plus
+# this key with the error text: the fallback is reported, but not cached
+ERROR_KEY = "collector_error"
+
+
+def _init_worker():
+    """Initialize COM on worker threads (required by WMI-based collectors)."""
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+
+
+class CollectionEngine:
+    """Runs collectors concurrently and merges their results."""
+
+    def __init__(self, max_workers=6, collector_timeout=20, cycle_timeout=25):
+        self.collector_timeout = collector_timeout
+        self.cycle_timeout = cycle_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="collector",
+            initializer=_init_worker,
+        )
+        # name -> (future, submitted_at) for collectors still running
+        self._running = {}
+        # name -> (result, collected_at) for the last successful result
+        self._last_results = {}
+
+    def _submit(self, collector):
+        """Submit a collector unless a previous run is still in flight."""
+        running = self._running.get(collector.name)
+        if running and not running[0].done():
+            return running
+        future = self._executor.submit(collector.func, **collector.kwargs)
+        future.add_done_callback(
+            lambda f, name=collector.name: self._on_done(name, f)
+        )
+        self._running[collector.name] = (future, time.time())
+        return self._running[collector.name]
+
+    def _on_done(self, name, future):
+        """Remember the latest successful result, even if it arrived late."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if isinstance(result, dict) and ERROR_KEY not in result:
+            self._last_results[name] = (result, time.time())
+
+    def collect(self, collectors):
+        """
+        Run collectors concurrently and merge their results.
+        Collectors whose refresh interval has not elapsed are served from
+        the cache. Returns (data, status) where status maps collector name
+        to ok/cached/stale/missing/error.
+        """
+        cycle_start = time.time()
+        cycle_deadline = cycle_start + self.cycle_timeout
+
+        data = {}
+        status = {}
+
+        pending = {}
+        for collector in collectors:
+            if not self._is_due(collector):
+                data.update(self._last_results[collector.name][0])
+                status[collector.name] = STATUS_CACHED
+                continue
+            future, submitted_at = self._submit(collector)
+            timeout = collector.timeout or self.collector_timeout
+            pending[future] = (collector, min(submitted_at + timeout, cycle_deadline))
+
+        while pending:
+            now = time.time()
+            expired = [f for f, (_, deadline) in pending.items() if deadline <= now and not f.done()]
+            for future in expired:
+                collector, _ = pending.pop(future)
+                status[collector.name] = self._merge_last(collector.name, data)
+                logger.warning(f"Collector {collector.name} missed its deadline ({status[collector.name]})")
+            if not pending:
+                break
+
+            next_deadline = min(deadline for _, deadline in pending.values())
+            done, _ = wait(
+                list(pending),
+                timeout=max(0, next_deadline - time.time()),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                collector, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                    data.update((k, v) for k, v in result.items() if k != ERROR_KEY)
+                    if ERROR_KEY in result:
+                        # Retried next cycle, since the error is not cached
+                        logger.warning(f"Collector {collector.name} reported: {result[ERROR_KEY]}")
+                        status[collector.name] = STATUS_ERROR
+                    else:
+                        status[collector.name] = STATUS_OK
+                        logger.debug(f"Collected {collector.name} data")
+                except Exception as e:
+                    logger.error(f"Error collecting {collector.name}: {e}")
+                    status[collector.name] = STATUS_ERROR
+
+        cached = list(status.values()).count(STATUS_CACHED)
+        logger.info(
+            f"Collection finished in {time.time() - cycle_start:.1f}s "
+            f"({len(status) - cached} collected, {cached} cached)"
+        )
+        return data, status
+
+    def _merge_last(self, name, data):
+        """Fall back to the last known result for a collector, if any."""
+        last = self._last_results.get(name)
+        if not last:
+            return STATUS_MISSING
+        data.update(last[0])
+        return STATUS_STALE
+
+    def _is_due(self, collector):
+        """Check whether a collector's cached result has expired."""
+        last = self._last_results.get(collector.name)
+        if not last or not collector.interval:
+            return True
+        return time.time() - last[1] >= collector.interval
+
+    def invalidate(self, name):
+        """Collect name again on the next cycle, whatever its refresh interval."""
+        last = self._last_results.get(name)
+        if last:
+            # Kept (as collected long ago) so a timeout can still fall back to it
+            self._last_results[name] = (last[0], 0)
+
+    def shutdown(self):
+        """Stop the worker pool without waiting for in-flight collectors."""
+        self._executor.shutdown(wait=False)
+
+
+_engine = None
+
+
+def init_engine(**kwargs):
+    """Create the agent's shared collection engine."""
+    global _engine
+    _engine = CollectionEngine(**kwargs)
+    return _engine
+
+
+def get_engine():
+    """The shared collection engine, or None before init_engine()."""
+    return _engine
@@ -1,7 +1,7 @@
-from .cpu import collect_cpu
+from .cpu import collect_cpu, start_cpu_sampler
 from .memory import collect_memory
 from .disk import collect_disk
-from .network import collect_network
+from .network import collect_network, start_network_monitor
 from .os_info import collect_os_info
 from .processes import collect_processes
 from .event_log import collect_event_logs
@@ -12,15 +12,17 @@ from .windows_license import collect_windows_license
 from .office_license import collect_office_license
 from .startup import collect_startup
 from .shared_folders import collect_shared_folders
-from .usb_devices import collect_usb_devices
+from .usb_devices import collect_usb_devices, start_usb_monitor, ack_usb_events
 from .windows_update import collect_windows_update
 from .services import collect_services
 
 __all__ = [
     "collect_cpu",
+    "start_cpu_sampler",
     "collect_memory",
     "collect_disk",
     "collect_network",
+    "start_network_monitor",
     "collect_os_info",
     "collect_processes",
     "collect_event_logs",
@@ -32,6 +34,8 @@ __all__ = [
     "collect_startup",
     "collect_shared_folders",
     "collect_usb_devices",
+    "start_usb_monitor",
+    "ack_usb_events",
     "collect_windows_update",
     "collect_services",
 ]
@@ -1,25 +1,27 @@
 import sys
 
+from wmi_pool import WMIError, available, wmi_query
+
 
 def collect_antivirus():
     """Collect antivirus status using WMI."""
     if sys.platform != "win32":
         return {"antivirus_status": "N/A (not Windows)"}
 
-    try:
-        import wmi
+    if not available():
+        return {"antivirus_status": "WMI not available"}
 
-        c = wmi.WMI(namespace="root\\SecurityCenter2")
-        products = c.AntiVirusProduct()
+    try:
+        products = wmi_query(
+            "SELECT displayName FROM AntiVirusProduct", namespace="root\\SecurityCenter2"
+        )
 
         if products:
-            names = [p.displayName for p in products if p.displayName]
+            names = [p["displayName"] for p in products if p.get("displayName")]
             status = ", ".join(names) if names else "Unknown"
             return {"antivirus_status": status}
         else:
             return {"antivirus_status": "No antivirus detected"}
 
-    except ImportError:
-        return {"antivirus_status": "WMI not available"}
-    except Exception as e:
-        return {"antivirus_status": f"Error: {str(e)[:100]}"}
+    except (WMIError, TimeoutError) as e:
+        return {"antivirus_status": f"Error: {str(e)[:100]}", "collector_error": str(e)[:200]}
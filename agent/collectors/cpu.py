@@ -1,27 +1,94 @@
+import time
+import threading
+from collections import deque
+
 import psutil
 
+# Ring buffer of (timestamp, total %, freq MHz, temp C)
+_samples = deque(maxlen=600)
+_lock = threading.Lock()
+_sampler = None
+_last_collect = 0.0
 
-def collect_cpu():
-    """Collect CPU usage, cores, speed, and temperature."""
-    usage = psutil.cpu_percent(interval=1)
-    cores = psutil.cpu_count(logical=True)
-    freq = psutil.cpu_freq()
-    speed = f"{freq.current:.0f} MHz" if freq else "N/A"
 
-    temp = None
+def _read_temp():
+    """Read the first available CPU temperature sensor."""
     try:
         temps = psutil.sensors_temperatures()
         if temps:
             for name, entries in temps.items():
                 if entries:
-                    temp = entries[0].current
-                    break
+                    return entries[0].current
     except (AttributeError, Exception):
         pass
+    return None
+
+
+def _sample_loop(interval):
+    """Sample CPU usage, frequency and temperature into the ring buffer."""
+    psutil.cpu_percent(interval=None, percpu=True)  # prime the counters
+    while True:
+        time.sleep(interval)
+        try:
+            per_core = psutil.cpu_percent(interval=None, percpu=True)
+            total = sum(per_core) / len(per_core) if per_core else 0.0
+            freq = psutil.cpu_freq()
+            sample = (time.time(), total, freq.current if freq else None, _read_temp())
+            with _lock:
+                _samples.append(sample)
+        except Exception:
+            continue
+
+
+def start_cpu_sampler(interval=2):
+    """Start the background CPU sampler thread (idempotent)."""
+    global _sampler
+    if _sampler and _sampler.is_alive():
+        return
+    _sampler = threading.Thread(
+        target=_sample_loop, args=(interval,), name="cpu-sampler", daemon=True
+    )
+    _sampler.start()
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+def collect_cpu():
+    """Collect CPU usage (avg/max/p95 since last report), cores, speed, and temperature."""
+    global _last_collect
+    start_cpu_sampler()
+
+    now = time.time()
+    with _lock:
+        window = [s for s in _samples if s[0] > _last_collect]
+    _last_collect = now
+
+    if window:
+        totals = [s[1] for s in window]
+        usage = round(sum(totals) / len(totals), 1)
+        usage_max = round(max(totals), 1)
+        usage_p95 = round(_percentile(totals, 95), 1)
+        freq_mhz = window[-1][2]
+        temp = window[-1][3]
+    else:
+        # Sampler has not produced data yet (first cycle after start)
+        per_core = psutil.cpu_percent(interval=1, percpu=True)
+        usage = round(sum(per_core) / len(per_core), 1) if per_core else 0.0
+        usage_max = usage_p95 = usage
+        freq = psutil.cpu_freq()
+        freq_mhz = freq.current if freq else None
+        temp = _read_temp()
 
     return {
         "cpu_usage": usage,
-        "cpu_cores": cores,
-        "cpu_speed": speed,
+        "cpu_usage_max": usage_max,
+        "cpu_usage_p95": usage_p95,
+        "cpu_cores": psutil.cpu_count(logical=True),
+        "cpu_speed": f"{freq_mhz:.0f} MHz" if freq_mhz else "N/A",
         "cpu_temp": temp,
     }
@@ -1,61 +1,159 @@
+"""
+Collect new Windows Event Log errors and warnings.
+Keeps a per-log bookmark (last EventRecordID) so each cycle only reads
+records written since the previous one.
+"""
 import sys
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from .state import load_state, save_state
+
+LOG_TYPES = ["Application", "System"]
+
+# Level 1=Critical, 2=Error, 3=Warning
+LEVELS = {1: "Critical", 2: "Error", 3: "Warning"}
+LEVEL_FILTER = "(Level=1 or Level=2 or Level=3)"
+
+_STATE_NAME = "event_log_bookmarks"
+_NS = "{http://schemas.microsoft.com/win/2004/08/events/event}"
+
+# source -> publisher metadata handle (None if the publisher can't be opened)
+_publishers = {}
+# (source, event id, insertion strings) -> formatted message
+_message_cache = OrderedDict()
+_MESSAGE_CACHE_SIZE = 500
+
+
+def _build_query(bookmark):
+    """XPath query selecting errors/warnings newer than the bookmark."""
+    if bookmark:
+        return f"*[System[{LEVEL_FILTER} and EventRecordID > {bookmark}]]"
+    return f"*[System[{LEVEL_FILTER}]]"
+
+
+def _parse_event_xml(xml):
+    """Extract the fields we report from rendered event XML."""
+    root = ET.fromstring(xml)
+    system = root.find(f"{_NS}System")
+    provider = system.find(f"{_NS}Provider")
+    time_created = system.find(f"{_NS}TimeCreated")
+    strings = tuple(
+        (d.text or "") for d in root.iter(f"{_NS}Data")
+    )
+    return {
+        "record_id": int(system.findtext(f"{_NS}EventRecordID", "0")),
+        "event_id": int(system.findtext(f"{_NS}EventID", "0")),
+        "level": int(system.findtext(f"{_NS}Level", "0")),
+        "source": provider.get("Name", "Unknown") if provider is not None else "Unknown",
+        "time": time_created.get("SystemTime", "Unknown") if time_created is not None else "Unknown",
+        "strings": strings,
+    }
+
+
+def _format_message(win32evtlog, event, parsed):
+    """Format an event message, reusing cached publisher handles and messages."""
+    key = (parsed["source"], parsed["event_id"], parsed["strings"])
+    if key in _message_cache:
+        _message_cache.move_to_end(key)
+        return _message_cache[key]
+
+    source = parsed["source"]
+    if source not in _publishers:
+        try:
+            _publishers[source] = win32evtlog.EvtOpenPublisherMetadata(source)
+        except Exception:
+            _publishers[source] = None
+
+    msg = None
+    metadata = _publishers[source]
+    if metadata is not None:
+        try:
+            msg = win32evtlog.EvtFormatMessage(
+                metadata, event, win32evtlog.EvtFormatMessageEvent
+            )
+        except Exception:
+            msg = None
+    if not msg:
+        msg = " ".join(s for s in parsed["strings"] if s) or "No message"
+    msg = msg.strip()[:200]
+
+    _message_cache[key] = msg
+    if len(_message_cache) > _MESSAGE_CACHE_SIZE:
+        _message_cache.popitem(last=False)
+    return msg
+
+
+def _latest_record_id(win32evtlog, log_type):
+    """EventRecordID of the newest record in a log (0 if empty)."""
+    handle = win32evtlog.EvtQuery(
+        log_type,
+        win32evtlog.EvtQueryChannelPath | win32evtlog.EvtQueryReverseDirection,
+        "*",
+    )
+    batch = win32evtlog.EvtNext(handle, 1)
+    if not batch:
+        return 0
+    return _parse_event_xml(
+        win32evtlog.EvtRender(batch[0], win32evtlog.EvtRenderEventXml)
+    )["record_id"]
+
+
+def _read_new_events(win32evtlog, log_type, bookmark, max_count):
+    """Read up to max_count newest matching events after the bookmark."""
+    if bookmark:
+        latest = _latest_record_id(win32evtlog, log_type)
+        if latest < bookmark:
+            bookmark = None  # log was cleared; record ids restarted
+
+    handle = win32evtlog.EvtQuery(
+        log_type,
+        win32evtlog.EvtQueryChannelPath | win32evtlog.EvtQueryReverseDirection,
+        _build_query(bookmark),
+    )
+    events = []
+    newest = bookmark or 0
+    while len(events) < max_count:
+        batch = win32evtlog.EvtNext(handle, min(50, max_count - len(events)))
+        if not batch:
+            break
+        for event in batch:
+            parsed = _parse_event_xml(
+                win32evtlog.EvtRender(event, win32evtlog.EvtRenderEventXml)
+            )
+            newest = max(newest, parsed["record_id"])
+            events.append({
+                "level": LEVELS.get(parsed["level"], "Warning"),
+                "source": parsed["source"],
+                "message": _format_message(win32evtlog, event, parsed),
+                "time": parsed["time"],
+            })
+    return events, newest
 
 
 def collect_event_logs(max_count=20):
-    """Collect recent Windows Event Log errors and warnings."""
+    """Collect Windows Event Log errors and warnings written since the last cycle."""
     if sys.platform != "win32":
         return {"event_logs": []}
 
-    logs = []
     try:
         import win32evtlog
-        import win32evtlogutil
-
-        server = "localhost"
-        log_types = ["Application", "System"]
-
-        for log_type in log_types:
-            try:
-                hand = win32evtlog.OpenEventLog(server, log_type)
-                flags = (
-                    win32evtlog.EVENTLOG_BACKWARDS_READ
-                    | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-                )
-                total = 0
-
-                while total < max_count:
-                    events = win32evtlog.ReadEventLog(hand, flags, 0)
-                    if not events:
-                        break
-
-                    for event in events:
-                        if total >= max_count:
-                            break
-
-                        event_type = event.EventType
-                        if event_type in (1, 2):  # Error=1, Warning=2
-                            level = "Error" if event_type == 1 else "Warning"
-                            try:
-                                msg = win32evtlogutil.SafeFormatMessage(event, log_type)
-                                msg = msg[:200] if msg else "No message"
-                            except Exception:
-                                msg = "Could not read message"
-
-                            logs.append({
-                                "level": level,
-                                "source": event.SourceName or "Unknown",
-                                "message": msg,
-                                "time": event.TimeGenerated.Format() if event.TimeGenerated else "Unknown",
-                            })
-                            total += 1
-
-                win32evtlog.CloseEventLog(hand)
-            except Exception:
-                continue
-
     except ImportError:
-        pass
-    except Exception:
-        pass
+        return {"event_logs": []}
+
+    bookmarks = load_state(_STATE_NAME, {})
+    logs = []
+
+    for log_type in LOG_TYPES:
+        try:
+            events, newest = _read_new_events(
+                win32evtlog, log_type, bookmarks.get(log_type), max_count
+            )
+            logs.extend(events)
+            if newest:
+                bookmarks[log_type] = newest
+        except Exception:
+            continue
 
+    save_state(_STATE_NAME, bookmarks)
     return {"event_logs": logs}
@@ -0,0 +1,215 @@
+"""
+Persistent cache for expensive, rarely-changing facts (license status).
+
+Each fact is stored in its own state file together with the key it was
+computed for (boot time plus whatever install paths it depends on). The
+value is recomputed when the key changes, the TTL elapses or a refresh is
+forced, and every refresh logs what it cost. Failures are remembered too,
+so a script that keeps timing out is retried every ERROR_RETRY seconds
+instead of every cycle.
+
+Run directly to self-test the license collectors against stubbed command
+runners (works on Linux):
+    python -m collectors.fact_cache
+"""
+import sys
+import time
+import logging
+import threading
+import subprocess
+
+import psutil
+
+from .state import load_state, save_state
+
+logger = logging.getLogger("ITMonitorAgent")
+
+# Retry a failed refresh after this long, serving the last good value meanwhile
+ERROR_RETRY = 900
+# psutil.boot_time() can drift by a second or so between calls on Windows
+BOOT_TIME_SLACK = 5
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class FactError(Exception):
+    """A fact could not be computed and there is no earlier value to serve."""
+
+
+def boot_key(**extra):
+    """Cache key for a fact that may change across reboots."""
+    key = {"boot_time": psutil.boot_time()}
+    key.update(extra)
+    return key
+
+
+def _same_key(a, b):
+    if not isinstance(a, dict) or not isinstance(b, dict) or a.keys() != b.keys():
+        return False
+    for name, value in a.items():
+        if name == "boot_time":
+            if abs((value or 0) - (b[name] or 0)) > BOOT_TIME_SLACK:
+                return False
+        elif value != b[name]:
+            return False
+    return True
+
+
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def get_fact(name, key, compute, ttl, force=False):
+    """
+    Return the value of fact name, calling compute() only when the cached
+    entry was made for a different key, is older than ttl seconds, or
+    force is set. If compute raises, the last good value is served (and
+    the failure retried after ERROR_RETRY); without one FactError is raised.
+    """
+    with _lock_for(name):
+        entry = load_state(f"fact_{name}") or {}
+        now = time.time()
+
+        if not force and _same_key(entry.get("key"), key):
+            if entry.get("failed_at") and now - entry["failed_at"] < ERROR_RETRY:
+                if "value" in entry:
+                    return entry["value"]
+                raise FactError(entry.get("error") or "Refresh failed")
+            if not entry.get("failed_at") and now - entry.get("computed_at", 0) < ttl:
+                return entry["value"]
+
+        if force:
+            reason = "forced"
+        elif "key" not in entry:
+            reason = "no cache"
+        elif not _same_key(entry["key"], key):
+            reason = "key changed"
+        else:
+            reason = "expired"
+
+        started = time.perf_counter()
+        try:
+            value = compute()
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            logger.warning(f"Refreshing {name} failed after {elapsed:.1f}s ({reason}): {e}")
+            entry.update({"key": key, "failed_at": now, "error": str(e)[:200]})
+            save_state(f"fact_{name}", entry)
+            if "value" in entry:
+                return entry["value"]
+            raise FactError(entry["error"])
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Refreshed {name} in {elapsed:.1f}s ({reason})")
+        save_state(f"fact_{name}", {
+            "key": key,
+            "value": value,
+            "computed_at": now,
+            "cost": round(elapsed, 3),
+        })
+        return value
+
+
+def run_cscript(script, *args, timeout=30):
+    """Default command runner: run a VBScript with cscript and return stdout."""
+    kwargs = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+    result = subprocess.run(
+        ["cscript", "//nologo", script, *args],
+        capture_output=True, text=True, timeout=timeout, **kwargs,
+    )
+    return result.stdout
+
+
+_SLMGR_OUTPUT = """
+Name: Windows(R), Professional edition
+Description: Windows(R) Operating System, RETAIL channel
+Partial Product Key: 3V66T
+License Status: Licensed
+"""
+
+_OSPP_OUTPUT = """
+---Processing--------------------------
+---------------------------------------
+SKU ID: 1234
+LICENSE NAME: Office 16, Office16ProPlusVL_KMS_Client edition
+LICENSE DESCRIPTION: Office 16, VOLUME_KMSCLIENT channel
+LICENSE STATUS:  ---LICENSED---
+Last 5 characters of installed product key: WFG99
+
+---------------------------------------
+---Exiting-----------------------------
+"""
+
+
+def _selftest():
+    """Exercise the cache and both license collectors with stubbed runners."""
+    import os
+    import tempfile
+    from . import windows_license, office_license
+
+    os.environ["PROGRAMDATA"] = tempfile.mkdtemp()
+    calls = []
+
+    def slmgr(script, *args, timeout=30):
+        calls.append(args)
+        return _SLMGR_OUTPUT
+
+    info = windows_license.collect_windows_license(runner=slmgr)["windows_license"]
+    assert info["is_activated"] and info["partial_key"] == "3V66T", info
+    windows_license.collect_windows_license(runner=slmgr)
+    assert len(calls) == 1, "second call served from cache"
+    windows_license.collect_windows_license(runner=slmgr, force=True)
+    assert len(calls) == 2, "forced refresh"
+    windows_license.collect_windows_license(ttl=0, runner=slmgr)
+    assert len(calls) == 3, "refresh after ttl"
+
+    real_boot_time = psutil.boot_time
+    psutil.boot_time = lambda: real_boot_time() + 3600
+    try:
+        windows_license.collect_windows_license(runner=slmgr)
+        assert len(calls) == 4, "refresh after reboot"
+    finally:
+        psutil.boot_time = real_boot_time
+
+    def broken(script, *args, timeout=30):
+        calls.append(args)
+        raise subprocess.TimeoutExpired(script, timeout)
+
+    info = windows_license.collect_windows_license(runner=broken, force=True)["windows_license"]
+    assert info["status"] == "Licensed" and len(calls) == 5, "last good value served on failure"
+    windows_license.collect_windows_license(runner=broken)
+    assert len(calls) == 5, "failure not retried before ERROR_RETRY"
+
+    ospp = r"C:\Program Files\Microsoft Office\root\Office16\OSPP.VBS"
+    office_calls = []
+
+    def dstatus(script, *args, timeout=30):
+        office_calls.append(script)
+        return _OSPP_OUTPUT
+
+    def collect_office(path):
+        return office_license.collect_office_license(
+            runner=dstatus, find_ospp=lambda: (path, 1700000000.0 if path else None)
+        )["office_license"]
+
+    info = collect_office(ospp)
+    assert info["installed"] and info["products"][0]["is_activated"], info
+    assert info["products"][0]["partial_key"] == "WFG99", info
+    collect_office(ospp)
+    assert office_calls == [ospp], "second call served from cache"
+    other = ospp.replace("Program Files", "Program Files (x86)")
+    collect_office(other)
+    assert office_calls == [ospp, other], "refresh after install path change"
+    info = collect_office(None)
+    assert len(office_calls) == 2 and not info["products"], "no OSPP.VBS, no script run"
+
+    cost = load_state("fact_windows_license")["cost"]
+    print(f"ok - license collectors cached (last refresh cost {cost * 1000:.2f} ms with stub)")
+
+
+if __name__ == "__main__":
+    _selftest()
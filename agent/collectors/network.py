@@ -1,18 +1,161 @@
+import sys
+import time
 import socket
-import psutil
+import struct
+import threading
 import uuid
+from collections import deque
+from urllib.parse import urlparse
+
+import psutil
+
+# Ring buffer of probe rounds: (timestamp, [per-target result], {nic: (rx, tx)})
+_rounds = deque(maxlen=720)
+_lock = threading.Lock()
+_monitor = None
+_last_collect = 0.0
+
+
+def _default_gateway():
+    """IPv4 default gateway address, or None."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class MIB_IPFORWARDROW(ctypes.Structure):
+                _fields_ = [(name, wintypes.DWORD) for name in (
+                    "dwForwardDest", "dwForwardMask", "dwForwardPolicy",
+                    "dwForwardNextHop", "dwForwardIfIndex", "dwForwardType",
+                    "dwForwardProto", "dwForwardAge", "dwForwardNextHopAS",
+                    "dwForwardMetric1", "dwForwardMetric2", "dwForwardMetric3",
+                    "dwForwardMetric4", "dwForwardMetric5",
+                )]
+
+            row = MIB_IPFORWARDROW()
+            if ctypes.windll.iphlpapi.GetBestRoute(0, 0, ctypes.byref(row)) == 0:
+                return socket.inet_ntoa(struct.pack("=L", row.dwForwardNextHop))
+            return None
+
+        with open("/proc/net/route") as f:
+            for line in f.readlines()[1:]:
+                fields = line.split()
+                if fields[1] == "00000000" and int(fields[3], 16) & 2:
+                    return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+    except Exception:
+        pass
+    return None
+
+
+def _probe_targets(server_url, targets):
+    """Targets for one round: gateway (ICMP), the IT Monitor server and configured ones."""
+    probe = []
+    gateway = _default_gateway()
+    if gateway:
+        probe.append(gateway)
+    if server_url:
+        parsed = urlparse(server_url)
+        if parsed.hostname:
+            port = parsed.port or (443 if parsed.scheme == "https" else 80)
+            probe.append(f"{parsed.hostname}:{port}")
+    probe.extend(t for t in targets if t not in probe)
+    return probe, gateway
+
+
+def _monitor_loop(interval, server_url, targets):
+    """Probe targets and sample NIC counters into the ring buffer."""
+    from net_diag import parse_options, run_diagnostics
+
+    gateway_checked = 0.0
+    probe = gateway = None
+    while True:
+        try:
+            # Re-resolve the gateway now and then (laptops change networks)
+            if time.time() - gateway_checked > 300:
+                probe, gateway = _probe_targets(server_url, targets)
+                gateway_checked = time.time()
+
+            options = parse_options({"targets": probe, "count": 1, "timeout": 1.0})
+            results = run_diagnostics(options)["results"] if probe else []
+            for r in results:
+                if r["target"] == gateway:
+                    r["role"] = "gateway"
+            counters = {
+                nic: (c.bytes_recv, c.bytes_sent)
+                for nic, c in psutil.net_io_counters(pernic=True).items()
+            }
+            with _lock:
+                _rounds.append((time.time(), results, counters))
+        except Exception:
+            pass
+        time.sleep(interval)
+
+
+def start_network_monitor(interval=10, server_url="", targets=None):
+    """Start the background network probe thread (idempotent)."""
+    global _monitor
+    if _monitor and _monitor.is_alive():
+        return
+    _monitor = threading.Thread(
+        target=_monitor_loop,
+        args=(interval, server_url, list(targets or [])),
+        name="network-monitor",
+        daemon=True,
+    )
+    _monitor.start()
+
+
+def _summarize_quality(window):
+    """Per-target latency/jitter/loss over the rounds in window."""
+    from net_diag import summarize
+
+    per_target = {}
+    for _, results, _ in window:
+        for r in results:
+            entry = per_target.setdefault(
+                r["target"], {"method": r["method"], "role": r.get("role"), "rtts": [], "sent": 0}
+            )
+            entry["sent"] += r["sent"]
+            if r["rtt_avg"] is not None:
+                entry["rtts"].append(r["rtt_avg"])
+
+    quality = []
+    for target, entry in per_target.items():
+        summary = summarize(target, entry["method"], entry["rtts"], entry["sent"])
+        if entry["role"]:
+            summary["role"] = entry["role"]
+        quality.append(summary)
+    return quality
+
+
+def _throughput(window):
+    """Bytes/s per NIC between the first and last sample of window."""
+    if len(window) < 2:
+        return {}
+    (t0, _, first), (t1, _, last) = window[0], window[-1]
+    elapsed = t1 - t0
+    rates = {}
+    for nic, (rx, tx) in last.items():
+        if nic not in first or elapsed <= 0 or nic == "lo" or "Loopback" in nic:
+            continue
+        rx_rate = max(0, rx - first[nic][0]) / elapsed
+        tx_rate = max(0, tx - first[nic][1]) / elapsed
+        if rx_rate or tx_rate:
+            rates[nic] = {"rx_bps": round(rx_rate), "tx_bps": round(tx_rate)}
+    return rates
 
 
 def collect_network():
-    """Collect network information including IP and MAC address."""
+    """Collect network information, link quality and throughput since the last report."""
+    global _last_collect
     ip_address = "unknown"
     mac_address = "unknown"
 
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip_address = s.getsockname()[0]
-        s.close()
+        # UDP connect sends nothing; it only selects the outgoing interface
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            ip_address = s.getsockname()[0]
     except Exception:
         try:
             ip_address = socket.gethostbyname(socket.gethostname())
@@ -37,15 +180,30 @@ def collect_network():
     except Exception:
         pass
 
-    net_up = True
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-    except OSError:
-        net_up = False
+    now = time.time()
+    with _lock:
+        window = [r for r in _rounds if r[0] > _last_collect]
+        previous = _rounds[-len(window) - 1] if len(_rounds) > len(window) else None
+    _last_collect = now
+
+    # Throughput is measured from the last sample of the previous window
+    rate_window = ([previous] if previous else []) + window
+    quality = _summarize_quality(window)
+    throughput = _throughput(rate_window)
+
+    if window:
+        net_up = any(r["received"] for r in window[-1][1]) if window[-1][1] else True
+    else:
+        # Monitor has not completed a round yet; assume up rather than block
+        net_up = True
 
     return {
         "ip_address": ip_address,
         "mac_address": mac_address,
         "network_up": net_up,
         "network_info": net_info,
+        "network_quality": quality,
+        "network_throughput": throughput,
+        "network_rx_bps": sum(r["rx_bps"] for r in throughput.values()),
+        "network_tx_bps": sum(r["tx_bps"] for r in throughput.values()),
     }
@@ -1,116 +1,147 @@
-"""Collect Microsoft Office activation/license information."""
+"""
+Collect Microsoft Office activation/license information.
+
+`OSPP.VBS /dstatus` costs several seconds of script-host time, so the
+result is kept in the fact cache keyed by boot time and the OSPP.VBS path
+and modification time (an install, upgrade or removal changes the key).
+It is refreshed after ttl seconds or when forced (refresh_licenses
+remote action).
+"""
 import sys
-import subprocess
 import os
 
+from .fact_cache import FactError, boot_key, get_fact, run_cscript
 
-def collect_office_license():
-    """Collect MS Office version and license status."""
-    if sys.platform != "win32":
-        return {"office_license": {}}
-
-    info = {
-        "installed": False,
-        "version": "",
-        "products": [],
-    }
-
-    # Common Office installation paths for OSPP.VBS
-    ospp_paths = [
-        r"C:\Program Files\Microsoft Office\Office16\OSPP.VBS",
-        r"C:\Program Files\Microsoft Office\Office15\OSPP.VBS",
-        r"C:\Program Files\Microsoft Office\Office14\OSPP.VBS",
-        r"C:\Program Files (x86)\Microsoft Office\Office16\OSPP.VBS",
-        r"C:\Program Files (x86)\Microsoft Office\Office15\OSPP.VBS",
-        r"C:\Program Files (x86)\Microsoft Office\Office14\OSPP.VBS",
-    ]
-
-    # Also check Click-to-Run paths
-    c2r_paths = [
-        r"C:\Program Files\Microsoft Office\root\Office16\OSPP.VBS",
-        r"C:\Program Files (x86)\Microsoft Office\root\Office16\OSPP.VBS",
-    ]
-
-    ospp_path = None
-    for path in c2r_paths + ospp_paths:
-        if os.path.exists(path):
-            ospp_path = path
-            break
-
-    if ospp_path is None:
-        # Try to detect Office via registry
-        try:
-            import winreg
-            office_versions = {
-                "16.0": "Office 2016/2019/2021/365",
-                "15.0": "Office 2013",
-                "14.0": "Office 2010",
-            }
-            for ver, name in office_versions.items():
-                try:
-                    key = winreg.OpenKey(
-                        winreg.HKEY_LOCAL_MACHINE,
-                        rf"SOFTWARE\Microsoft\Office\{ver}\Common\InstallRoot"
-                    )
-                    winreg.CloseKey(key)
-                    info["installed"] = True
-                    info["version"] = name
-                    break
-                except FileNotFoundError:
-                    continue
-        except Exception:
-            pass
-
-        if not info["installed"]:
-            return {"office_license": info}
-
-    if ospp_path:
-        info["installed"] = True
+# Click-to-Run paths first, then MSI installs
+OSPP_PATHS = [
+    r"C:\Program Files\Microsoft Office\root\Office16\OSPP.VBS",
+    r"C:\Program Files (x86)\Microsoft Office\root\Office16\OSPP.VBS",
+    r"C:\Program Files\Microsoft Office\Office16\OSPP.VBS",
+    r"C:\Program Files\Microsoft Office\Office15\OSPP.VBS",
+    r"C:\Program Files\Microsoft Office\Office14\OSPP.VBS",
+    r"C:\Program Files (x86)\Microsoft Office\Office16\OSPP.VBS",
+    r"C:\Program Files (x86)\Microsoft Office\Office15\OSPP.VBS",
+    r"C:\Program Files (x86)\Microsoft Office\Office14\OSPP.VBS",
+]
 
-        # Determine version from path
-        if "Office16" in ospp_path:
-            info["version"] = "Office 2016/2019/2021/365"
-        elif "Office15" in ospp_path:
-            info["version"] = "Office 2013"
-        elif "Office14" in ospp_path:
-            info["version"] = "Office 2010"
 
+def _find_ospp():
+    """Return (path, mtime) of the first OSPP.VBS found, or (None, None)."""
+    for path in OSPP_PATHS:
         try:
-            result = subprocess.run(
-                ["cscript", "//nologo", ospp_path, "/dstatus"],
-                capture_output=True, text=True, timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW,
-            )
-            output = result.stdout
-
+            return path, os.path.getmtime(path)
+        except OSError:
+            continue
+    return None, None
+
+
+def _registry_version():
+    """Detect an Office install without OSPP.VBS via the registry."""
+    try:
+        import winreg
+        office_versions = {
+            "16.0": "Office 2016/2019/2021/365",
+            "15.0": "Office 2013",
+            "14.0": "Office 2010",
+        }
+        for ver, name in office_versions.items():
+            try:
+                key = winreg.OpenKey(
+                    winreg.HKEY_LOCAL_MACHINE,
+                    rf"SOFTWARE\Microsoft\Office\{ver}\Common\InstallRoot"
+                )
+                winreg.CloseKey(key)
+                return name
+            except FileNotFoundError:
+                continue
+    except Exception:
+        pass
+    return None
+
+
+def _parse_dstatus(output):
+    """Parse `OSPP.VBS /dstatus` output into a list of products."""
+    products = []
+    current_product = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            if current_product.get("name"):
+                products.append(current_product)
             current_product = {}
-            for line in output.splitlines():
-                line = line.strip()
-                if not line:
-                    if current_product.get("name"):
-                        info["products"].append(current_product)
-                    current_product = {}
-                    continue
-
-                if "PRODUCT ID" in line.upper() or "SKU ID" in line.upper():
-                    pass
-                elif "LICENSE NAME" in line.upper() or line.startswith("LICENSE NAME"):
-                    current_product["name"] = line.split(":", 1)[-1].strip()
-                elif "LICENSE DESCRIPTION" in line.upper():
-                    current_product["description"] = line.split(":", 1)[-1].strip()
-                elif "LICENSE STATUS" in line.upper():
-                    status = line.split(":", 1)[-1].strip()
-                    current_product["status"] = status
-                    current_product["is_activated"] = "licensed" in status.lower()
-                elif "LAST 5" in line.upper() or "PARTIAL" in line.upper():
-                    current_product["partial_key"] = line.split(":", 1)[-1].strip()
+            continue
 
-            if current_product.get("name"):
-                info["products"].append(current_product)
+        if "PRODUCT ID" in line.upper() or "SKU ID" in line.upper():
+            pass
+        elif "LICENSE NAME" in line.upper() or line.startswith("LICENSE NAME"):
+            current_product["name"] = line.split(":", 1)[-1].strip()
+        elif "LICENSE DESCRIPTION" in line.upper():
+            current_product["description"] = line.split(":", 1)[-1].strip()
+        elif "LICENSE STATUS" in line.upper():
+            status = line.split(":", 1)[-1].strip()
+            current_product["status"] = status
+            current_product["is_activated"] = "licensed" in status.lower()
+        elif "LAST 5" in line.upper() or "PARTIAL" in line.upper():
+            current_product["partial_key"] = line.split(":", 1)[-1].strip()
+
+    if current_product.get("name"):
+        products.append(current_product)
+    return products
+
+
+def _version_from_path(ospp_path):
+    if "Office16" in ospp_path:
+        return "Office 2016/2019/2021/365"
+    if "Office15" in ospp_path:
+        return "Office 2013"
+    if "Office14" in ospp_path:
+        return "Office 2010"
+    return ""
+
+
+def collect_office_license(ttl=24 * 3600, force=False, runner=None, find_ospp=None):
+    """Collect MS Office version and license status (cached)."""
+    if sys.platform != "win32" and runner is None:
+        return {"office_license": {}}
 
-        except subprocess.TimeoutExpired:
-            info["products"] = [{"name": "Timeout", "status": "Could not check"}]
-        except Exception as e:
-            info["products"] = [{"name": "Error", "status": str(e)[:100]}]
+    runner = runner or run_cscript
+    ospp_path, ospp_mtime = (find_ospp or _find_ospp)()
+
+    def _compute():
+        info = {
+            "installed": False,
+            "version": "",
+            "products": [],
+        }
+        if ospp_path is None:
+            version = _registry_version()
+            if version:
+                info["installed"] = True
+                info["version"] = version
+            return info
 
-    return {"office_license": info}
+        info["installed"] = True
+        info["version"] = _version_from_path(ospp_path)
+        info["products"] = _parse_dstatus(runner(ospp_path, "/dstatus", timeout=30))
+        return info
+
+    key = boot_key(ospp=ospp_path, mtime=ospp_mtime)
+    error = None
+    try:
+        info = get_fact("office_license", key, _compute, ttl, force)
+    except FactError as e:
+        error = str(e)[:200]
+        timed_out = "timed out" in str(e).lower()
+        info = {
+            "installed": True,
+            "version": _version_from_path(ospp_path or ""),
+            "products": [
+                {"name": "Timeout", "status": "Could not check"} if timed_out
+                else {"name": "Error", "status": str(e)[:100]}
+            ],
+        }
+
+    result = {"office_license": info}
+    if error:
+        result["collector_error"] = error
+    return result
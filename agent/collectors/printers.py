@@ -1,9 +1,90 @@
-"""Collect installed printers information."""
+"""
+Collect installed printers information.
+
+Local printers come from one EnumPrinters (level 2) call, which never
+leaves the machine. Printer connections need OpenPrinter/GetPrinter on the
+print server, so they are probed in parallel with a shared deadline: a
+printer whose server does not answer in time is reported as Unreachable
+instead of stalling the cycle. Static attributes (port, driver, network
+flag) are cached and only re-read when the printer list changes.
+"""
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+STATUS_MAP = {
+    0x00000001: "Paused",
+    0x00000002: "Error",
+    0x00000004: "Pending Deletion",
+    0x00000008: "Paper Jam",
+    0x00000010: "Paper Out",
+    0x00000020: "Manual Feed",
+    0x00000040: "Paper Problem",
+    0x00000080: "Offline",
+    0x00000200: "Not Available",
+    0x00000400: "No Toner",
+}
+
+# Probe threads stuck in OpenPrinter cannot be interrupted; a printer with a
+# probe still in flight is not probed again until it returns
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="printer-probe")
+_in_flight = {}  # name -> future
+_static = {}  # name -> {"port", "driver", "is_network"}
+_stale = set()  # names whose static attributes are to be re-read
+_printer_names = None
+_lock = threading.Lock()
+
+
+def _status_text(status):
+    if not status:
+        return "Ready"
+    for code, text in STATUS_MAP.items():
+        if status & code:
+            return text
+    return "Ready"
 
 
-def collect_printers():
+def _remember(name, info, is_network):
+    """Cache static attributes unless a current copy is already cached."""
+    with _lock:
+        if name in _static and name not in _stale:
+            return
+        _static[name] = {
+            "port": info.get("pPortName", "") or "",
+            "driver": info.get("pDriverName", "") or "",
+            "is_network": is_network,
+        }
+        _stale.discard(name)
+
+
+def _probe(name):
+    """GetPrinter level 2 for one printer (may block on the print server)."""
+    import win32print
+
+    handle = win32print.OpenPrinter(name)
+    try:
+        return win32print.GetPrinter(handle, 2)
+    finally:
+        win32print.ClosePrinter(handle)
+
+
+def _enumerate():
+    """(local level-2 infos, connection names) without touching the network."""
+    import win32print
+
+    local = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL, None, 2)
+    # Level 4 is read from the local registry, even for connections
+    connections = [
+        p["pPrinterName"]
+        for p in win32print.EnumPrinters(win32print.PRINTER_ENUM_CONNECTIONS, None, 4)
+    ]
+    local_names = {p["pPrinterName"] for p in local}
+    return local, [n for n in connections if n not in local_names]
+
+
+def collect_printers(probe_timeout=5):
     """Collect list of installed printers and default printer."""
+    global _printer_names
     if sys.platform != "win32":
         return {"printers": []}
 
@@ -13,53 +94,68 @@ def collect_printers():
     try:
         import win32print
 
-        default_printer = win32print.GetDefaultPrinter()
+        try:
+            default_printer = win32print.GetDefaultPrinter()
+        except Exception:
+            pass
+
+        local, connections = _enumerate()
 
-        for printer in win32print.EnumPrinters(
-            win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
-        ):
-            flags, desc, name, comment = printer
-            is_network = bool(flags & win32print.PRINTER_ENUM_CONNECTIONS)
+        # Printer list changed: re-read the static attributes, keeping the old
+        # ones until then (an unreachable printer still shows its port/driver)
+        names = tuple(sorted([p["pPrinterName"] for p in local] + connections))
+        with _lock:
+            if names != _printer_names:
+                for name in set(_static) - set(names):
+                    del _static[name]
+                _stale.clear()
+                _stale.update(names)
+                for name in [n for n, f in _in_flight.items() if n not in names and f.done()]:
+                    del _in_flight[name]
+                _printer_names = names
 
-            # Get printer status
+        statuses = {}
+        for info in local:
+            name = info["pPrinterName"]
+            statuses[name] = _status_text(info.get("Status", 0))
+            _remember(name, info, is_network=False)
+
+        # Connections: probe in parallel, one probe per printer at a time
+        with _lock:
+            for name in connections:
+                future = _in_flight.get(name)
+                if future is None or future.done():
+                    _in_flight[name] = _executor.submit(_probe, name)
+            probes = {name: _in_flight[name] for name in connections}
+        wait(list(probes.values()), timeout=probe_timeout)
+
+        for name, future in probes.items():
+            if not future.done():
+                statuses[name] = "Unreachable"
+                continue
+            with _lock:
+                if _in_flight.get(name) is future:
+                    del _in_flight[name]
             try:
-                handle = win32print.OpenPrinter(name)
-                info = win32print.GetPrinter(handle, 2)
-                win32print.ClosePrinter(handle)
-                status = info.get("Status", 0)
-                port = info.get("pPortName", "")
-                driver = info.get("pDriverName", "")
+                info = future.result()
             except Exception:
-                status = 0
-                port = ""
-                driver = ""
-
-            status_text = "Ready"
-            if status != 0:
-                status_map = {
-                    0x00000001: "Paused",
-                    0x00000002: "Error",
-                    0x00000004: "Pending Deletion",
-                    0x00000008: "Paper Jam",
-                    0x00000010: "Paper Out",
-                    0x00000020: "Manual Feed",
-                    0x00000040: "Paper Problem",
-                    0x00000080: "Offline",
-                    0x00000200: "Not Available",
-                    0x00000400: "No Toner",
-                }
-                for code, text in status_map.items():
-                    if status & code:
-                        status_text = text
-                        break
+                statuses[name] = "Unreachable"
+                continue
+            statuses[name] = _status_text(info.get("Status", 0))
+            _remember(name, info, is_network=True)
 
+        for name in [p["pPrinterName"] for p in local] + connections:
+            with _lock:
+                static = _static.get(name) or {
+                    "port": "", "driver": "", "is_network": name in connections,
+                }
             printers.append({
                 "name": name,
                 "is_default": name == default_printer,
-                "is_network": is_network,
-                "status": status_text,
-                "port": port,
-                "driver": driver,
+                "is_network": static["is_network"],
+                "status": statuses.get(name, "Unknown"),
+                "port": static["port"],
+                "driver": static["driver"],
             })
     except ImportError:
         pass
@@ -1,10 +1,61 @@
+"""
+Collect the top processes by CPU and memory.
+
+psutil.process_iter keeps its Process handles across calls, so
+cpu_percent() measures the delta since the previous report (100 = one
+full core). The report carries one merged list: the top-K by CPU plus the
+top-K by memory, selected with heaps instead of sorting every row.
+Processes whose memory cannot be read (protected/system processes) are
+still listed, with memory None.
+
+Run directly to benchmark one cycle against the previous implementation
+with stand-in processes (works on Linux):
+    python -m collectors.processes [processes]
+"""
+import sys
+import heapq
+import threading
+
 import psutil
 
+_lock = threading.Lock()
+
+
+def _snapshot():
+    """Read pid, name, CPU and memory (MB, None if not permitted) for every process."""
+    rows = []
+    # Attributes that are not permitted come back as None (ad_value)
+    for proc in psutil.process_iter(["name", "cpu_percent", "memory_info"]):
+        info = proc.info
+        mem = info["memory_info"]
+        rows.append({
+            "pid": proc.pid,
+            "name": info["name"] or "unknown",
+            "cpu": round(info["cpu_percent"] or 0, 1),
+            "memory": round(mem.rss / (1024 ** 2), 1) if mem else None,
+        })
+    return rows
+
 
 def collect_processes(top_count=15):
-    """Collect top processes by CPU and memory usage."""
-    processes = []
+    """Collect the top processes by CPU and by memory as one list."""
+    with _lock:
+        rows = _snapshot()
+
+    by_cpu = heapq.nlargest(top_count, rows, key=lambda x: (x["cpu"], x["memory"] or 0))
+    by_memory = heapq.nlargest(top_count, rows, key=lambda x: x["memory"] or 0)
+    merged = {row["pid"]: row for row in by_cpu + by_memory}
+
+    return {
+        "top_processes": sorted(
+            merged.values(), key=lambda x: (x["cpu"], x["memory"] or 0), reverse=True
+        ),
+    }
+
 
+def _previous_collect(top_count=15):
+    """The process_iter implementation this module replaced, for comparison."""
+    processes = []
     for proc in psutil.process_iter(["pid", "name", "cpu_percent", "memory_info"]):
         try:
             info = proc.info
@@ -16,9 +67,49 @@ def collect_processes(top_count=15):
             })
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             continue
-
     processes.sort(key=lambda x: x["cpu"] + x["memory"], reverse=True)
+    return {"top_processes": processes[:top_count]}
 
-    return {
-        "top_processes": processes[:top_count],
-    }
+
+def _benchmark(count=1000, cycles=5):
+    """Time collection cycles with count idle stand-in processes running."""
+    import time
+    import subprocess
+
+    if sys.platform == "win32":
+        command = ["ping", "-n", "3600", "127.0.0.1"]
+    else:
+        command = ["sleep", "3600"]
+
+    stand_ins = []
+    try:
+        for _ in range(count):
+            stand_ins.append(subprocess.Popen(
+                command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+        total = len(psutil.pids())
+
+        def _time(func):
+            func()  # warm-up (primes the handle cache)
+            start = time.perf_counter()
+            for _ in range(cycles):
+                result = func()
+            return (time.perf_counter() - start) / cycles * 1000, result
+
+        previous_ms, _ = _time(_previous_collect)
+        current_ms, result = _time(collect_processes)
+        assert 15 <= len(result["top_processes"]) <= 30
+        assert all(p["memory"] is None or p["memory"] >= 0 for p in result["top_processes"])
+    finally:
+        for proc in stand_ins:
+            proc.kill()
+        for proc in stand_ins:
+            proc.wait()
+
+    print(f"{count} stand-in processes ({total} total), {cycles} cycles")
+    print(f"  previous (process_iter + sort): {previous_ms:7.1f} ms per cycle")
+    print(f"  process_iter + heaps:           {current_ms:7.1f} ms per cycle")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -3,37 +3,27 @@ Windows Services Collector
 Collects information about Windows services.
 """
 
-import subprocess
+import json
 import logging
 
+from ps_host import run_powershell, PowerShellError
+
 logger = logging.getLogger("ITMonitorAgent")
 
 
 def collect_services():
     """
     Collect Windows services information.
-    Returns list of services with name, display name, status, and startup type.
+    Returns dict with list of services with name, display name, status, and startup type.
     """
     try:
-        # Get services using PowerShell
+        # Get services using the shared PowerShell host
         ps_script = """
 Get-Service | Select-Object Name, DisplayName, Status, StartType | 
 ConvertTo-Json -Compress
 """
-        result = subprocess.run(
-            ["powershell", "-NoProfile", "-Command", ps_script],
-            capture_output=True,
-            text=True,
-            timeout=15,
-            creationflags=subprocess.CREATE_NO_WINDOW,
-        )
-
-        if result.returncode != 0:
-            logger.error(f"PowerShell services query failed: {result.stderr}")
-            return []
-
-        import json
-        services = json.loads(result.stdout)
+        output = run_powershell(ps_script, timeout=15)
+        services = json.loads(output)
         
         # Ensure it's a list
         if not isinstance(services, list):
@@ -50,11 +40,14 @@ ConvertTo-Json -Compress
             })
 
         logger.info(f"Collected {len(service_list)} services")
-        return service_list
+        return {"services": service_list}
 
-    except subprocess.TimeoutExpired:
+    except TimeoutError:
         logger.error("Services collection timed out")
-        return []
+        return {"services": [], "collector_error": "timed out"}
+    except PowerShellError as e:
+        logger.error(f"PowerShell services query failed: {e}")
+        return {"services": [], "collector_error": str(e)[:200]}
     except Exception as e:
         logger.error(f"Error collecting services: {e}")
-        return []
+        return {"services": [], "collector_error": str(e)[:200]}
@@ -1,56 +1,135 @@
 import sys
+import time
 
+from .state import load_state, save_state
 
-def collect_software():
-    """Collect list of installed software from Windows registry."""
-    if sys.platform != "win32":
-        return {"software": []}
+UNINSTALL_PATHS = [
+    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall",
+]
 
-    software_list = []
+# Re-check every subkey timestamp at least this often, even if the
+# Uninstall key itself did not change (in-place upgrades only touch the subkey)
+FULL_CHECK_INTERVAL = 24 * 3600
 
-    try:
+_STATE_NAME = "software_inventory"
+
+# Software list built from the last scan, rebuilt only when the scan changed
+_software = None
+
+
+class WinRegistry:
+    """Read-only access to HKLM used by the software collector."""
+
+    def __init__(self):
         import winreg
+        self._winreg = winreg
+
+    def last_write(self, path):
+        """Last-write time of a key (100ns intervals since 1601)."""
+        with self._winreg.OpenKey(self._winreg.HKEY_LOCAL_MACHINE, path) as key:
+            return self._winreg.QueryInfoKey(key)[2]
+
+    def subkeys(self, path):
+        """Names of all direct subkeys of a key."""
+        with self._winreg.OpenKey(self._winreg.HKEY_LOCAL_MACHINE, path) as key:
+            return [
+                self._winreg.EnumKey(key, i)
+                for i in range(self._winreg.QueryInfoKey(key)[0])
+            ]
+
+    def values(self, path, names):
+        """Read named values from a key; missing values are omitted."""
+        result = {}
+        with self._winreg.OpenKey(self._winreg.HKEY_LOCAL_MACHINE, path) as key:
+            for name in names:
+                try:
+                    result[name] = self._winreg.QueryValueEx(key, name)[0]
+                except FileNotFoundError:
+                    continue
+        return result
+
+
+def _read_entry(registry, path):
+    """Read one Uninstall subkey into a cache entry."""
+    values = registry.values(path, ["DisplayName", "DisplayVersion"])
+    name = values.get("DisplayName")
+    if not name or not str(name).strip():
+        return {"name": None}
+    return {
+        "name": str(name).strip(),
+        "version": str(values.get("DisplayVersion", "N/A")).strip(),
+    }
+
 
-        reg_paths = [
-            r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-            r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall",
-        ]
+def scan_inventory(registry, state):
+    """
+    Refresh the cached inventory against the registry.
+    Only subkeys whose last-write time changed are re-read.
+    Returns (new_state, changed).
+    """
+    state = state or {}
+    old_keys = state.get("keys", {})
+    old_entries = state.get("entries", {})
+    full_check = time.time() - state.get("full_check", 0) >= FULL_CHECK_INTERVAL
 
-        for reg_path in reg_paths:
+    keys = {}
+    entries = {}
+    changed = False
+
+    for reg_path in UNINSTALL_PATHS:
+        try:
+            parent_ts = registry.last_write(reg_path)
+        except OSError:
+            continue
+        keys[reg_path] = parent_ts
+
+        if not full_check and old_keys.get(reg_path) == parent_ts:
+            # Nothing added or removed under this key: reuse cached entries
+            prefix = reg_path + "\\"
+            entries.update(
+                (path, entry) for path, entry in old_entries.items()
+                if path.startswith(prefix)
+            )
+            continue
+
+        try:
+            subkey_names = registry.subkeys(reg_path)
+        except OSError:
+            continue
+
+        for subkey_name in subkey_names:
+            path = f"{reg_path}\\{subkey_name}"
             try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
-                for i in range(winreg.QueryInfoKey(key)[0]):
-                    try:
-                        subkey_name = winreg.EnumKey(key, i)
-                        subkey = winreg.OpenKey(key, subkey_name)
-
-                        try:
-                            name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                        except FileNotFoundError:
-                            continue
-
-                        try:
-                            version = winreg.QueryValueEx(subkey, "DisplayVersion")[0]
-                        except FileNotFoundError:
-                            version = "N/A"
-
-                        if name and name.strip():
-                            software_list.append({
-                                "name": name.strip(),
-                                "version": str(version).strip(),
-                            })
-
-                        winreg.CloseKey(subkey)
-                    except (OSError, WindowsError):
-                        continue
-
-                winreg.CloseKey(key)
-            except (OSError, WindowsError):
+                ts = registry.last_write(path)
+                cached = old_entries.get(path)
+                if cached and cached.get("ts") == ts:
+                    entries[path] = cached
+                    continue
+                entry = _read_entry(registry, path)
+                entry["ts"] = ts
+                entries[path] = entry
+                changed = True
+            except OSError:
                 continue
 
-    except Exception:
-        pass
+    if set(entries) != set(old_entries):
+        changed = True
+
+    new_state = {
+        "keys": keys,
+        "entries": entries,
+        "full_check": time.time() if full_check else state.get("full_check", 0),
+    }
+    return new_state, changed
 
+
+def build_software_list(entries):
+    """Build the sorted, de-duplicated software list from cache entries."""
+    software_list = [
+        {"name": e["name"], "version": e["version"]}
+        for e in entries.values() if e.get("name")
+    ]
     software_list.sort(key=lambda x: x["name"].lower())
 
     seen = set()
@@ -60,5 +139,32 @@ def collect_software():
         if key not in seen:
             seen.add(key)
             unique.append(sw)
+    return unique
+
+
+def collect_software(registry=None):
+    """
+    Collect list of installed software from Windows registry.
+    The registry scan is incremental (see scan_inventory), but the full list
+    is always returned: report delta encoding (report_delta.py) leaves it out
+    of reports while unchanged and can resend it whenever the server asks
+    for a resync.
+    """
+    global _software
+    if registry is None:
+        if sys.platform != "win32":
+            return {"software": []}
+        try:
+            registry = WinRegistry()
+        except ImportError:
+            return {"software": []}
+
+    state = load_state(_STATE_NAME, {})
+    new_state, changed = scan_inventory(registry, state)
+    if changed or _software is None:
+        _software = build_software_list(new_state["entries"])
+    # Nothing re-read and no key or full-check time moved: the state file is current
+    if changed or any(new_state[k] != state.get(k) for k in ("keys", "full_check")):
+        save_state(_STATE_NAME, new_state)
 
-    return {"software": unique}
+    return {"software": _software}
@@ -0,0 +1,44 @@
+"""Persistent on-disk state for collectors (caches, bookmarks)."""
+import os
+import json
+import tempfile
+import logging
+
+logger = logging.getLogger("ITMonitorAgent")
+
+
+def get_state_dir():
+    """Get (and create) the directory used for collector state files."""
+    base = os.environ.get("PROGRAMDATA") or tempfile.gettempdir()
+    state_dir = os.path.join(base, "ITMonitorAgent", "state")
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+    except OSError:
+        state_dir = os.path.join(tempfile.gettempdir(), "ITMonitorAgent", "state")
+        os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+
+def load_state(name, default=None):
+    """Load a JSON state file by name, returning default if missing or corrupt."""
+    path = os.path.join(get_state_dir(), f"{name}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logger.warning(f"Could not load state {name}: {e}")
+        return default
+
+
+def save_state(name, data):
+    """Atomically write a JSON state file by name."""
+    path = os.path.join(get_state_dir(), f"{name}.json")
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Could not save state {name}: {e}")
@@ -1,50 +1,156 @@
-"""Collect USB devices information."""
+"""
+Collect USB devices information.
+
+A background watcher builds the USB inventory once and keeps it current:
+it subscribes to Win32_DeviceChangeEvent (an extrinsic event raised by the
+device manager, so WMI does not poll) and re-reads only the USB\\ entries,
+through the shared WMI worker, when a device arrives or leaves. The
+collector reads the cached inventory and reports the inserts/removals not
+yet acknowledged: events stay queued until ack_usb_events() is called for
+a report the server accepted (or that was saved for offline replay).
+"""
 import sys
+import time
+import logging
+import threading
+from collections import deque
+
+from wmi_pool import wmi_query
+
+logger = logging.getLogger("ITMonitorAgent")
+
+# Only USB\ device IDs, only the properties we report
+USB_QUERY = (
+    "SELECT Name, Description, Status, Manufacturer, DeviceID "
+    "FROM Win32_PnPEntity WHERE DeviceID LIKE 'USB\\\\%'"
+)
+# Events of a burst (hub with several functions) are coalesced into one rescan
+DEBOUNCE = 1.0
+
+_inventory = None  # device_id -> device dict, None until the first scan
+_events = deque(maxlen=500)
+_lock = threading.Lock()
+_watcher = None
+
+
+def _query_usb():
+    """USB devices by device id."""
+    devices = {}
+    for device in wmi_query(USB_QUERY, timeout=60):
+        device_id = device.get("DeviceID") or ""
+        devices[device_id] = {
+            "name": device.get("Name") or device.get("Description") or "Unknown USB Device",
+            "status": device.get("Status") or "Unknown",
+            "manufacturer": device.get("Manufacturer") or "",
+            "device_id": device_id[:80],
+        }
+    return devices
+
+
+def _apply(devices, when):
+    """Replace the inventory, recording inserts and removals at time when."""
+    global _inventory
+    with _lock:
+        previous = _inventory
+        _inventory = devices
+        if previous is None:
+            return
+        changes = [("inserted", d) for i, d in devices.items() if i not in previous]
+        changes += [("removed", d) for i, d in previous.items() if i not in devices]
+        for action, device in changes:
+            _events.append({
+                "time": when,
+                "action": action,
+                "name": device["name"],
+                "manufacturer": device["manufacturer"],
+                "device_id": device["device_id"],
+            })
+    for action, device in changes:
+        logger.info(f"USB device {action}: {device['name']} ({device['device_id']})")
+
+
+def _watch_loop(rescan_interval):
+    """Keep the inventory current from device change notifications."""
+    import pythoncom
+    import wmi
+
+    pythoncom.CoInitialize()
+    while True:
+        try:
+            # This connection only carries the event subscription, which
+            # blocks its thread; queries go through the shared worker
+            c = wmi.WMI()
+            _apply(_query_usb(), time.time())
+            last_scan = time.time()
+            # EventType 2 = arrival, 3 = removal
+            watcher = c.watch_for(
+                raw_wql="SELECT * FROM Win32_DeviceChangeEvent WHERE EventType = 2 OR EventType = 3"
+            )
+            while True:
+                try:
+                    watcher(timeout_ms=60000)
+                except wmi.x_wmi_timed_out:
+                    # Safety net for missed notifications
+                    if time.time() - last_scan >= rescan_interval:
+                        _apply(_query_usb(), time.time())
+                        last_scan = time.time()
+                    continue
+
+                changed_at = time.time()
+                deadline = changed_at + DEBOUNCE
+                while time.time() < deadline:
+                    try:
+                        watcher(timeout_ms=max(1, int((deadline - time.time()) * 1000)))
+                    except wmi.x_wmi_timed_out:
+                        break
+                _apply(_query_usb(), changed_at)
+                last_scan = time.time()
+        except Exception as e:
+            logger.warning(f"USB device watcher failed, restarting: {e}")
+            time.sleep(30)
+
+
+def start_usb_monitor(rescan_interval=3600):
+    """Start the background USB device watcher thread (idempotent, Windows only)."""
+    global _watcher
+    if sys.platform != "win32" or (_watcher and _watcher.is_alive()):
+        return
+    _watcher = threading.Thread(
+        target=_watch_loop, args=(rescan_interval,), name="usb-watcher", daemon=True
+    )
+    _watcher.start()
+
+
+def _event_key(event):
+    return (event.get("time"), event.get("action"), event.get("device_id"))
+
+
+def ack_usb_events(events):
+    """Drop events that reached the server (or an offline report) from the queue."""
+    if not events:
+        return
+    sent = {_event_key(e) for e in events}
+    with _lock:
+        kept = [e for e in _events if _event_key(e) not in sent]
+        _events.clear()
+        _events.extend(kept)
 
 
 def collect_usb_devices():
-    """Collect list of connected USB devices."""
+    """Collect connected USB devices and the insert/remove events not yet acknowledged."""
     if sys.platform != "win32":
-        return {"usb_devices": []}
-
-    devices = []
-
-    try:
-        import wmi
-        c = wmi.WMI()
-
-        for usb in c.Win32_USBControllerDevice():
-            try:
-                device = usb.Dependent
-                # Get the actual device object
-                dep_path = device.replace("\\\\", "\\").replace('"', '')
-                # Query the PnP device
-            except Exception:
-                continue
-
-        # Better approach: query PnP devices with USB
-        for device in c.Win32_PnPEntity():
-            try:
-                device_id = device.DeviceID or ""
-                if not device_id.startswith("USB\\"):
-                    continue
+        return {"usb_devices": [], "usb_events": []}
+
+    with _lock:
+        devices = None if _inventory is None else list(_inventory.values())
+        events = list(_events)
+
+    if devices is None:
+        # Watcher not started or its first scan is still running
+        try:
+            devices = list(_query_usb().values())
+        except Exception:
+            devices = []
 
-                name = device.Name or device.Description or "Unknown USB Device"
-                status = device.Status or "Unknown"
-                manufacturer = device.Manufacturer or ""
-
-                devices.append({
-                    "name": name,
-                    "status": status,
-                    "manufacturer": manufacturer,
-                    "device_id": device_id[:80],
-                })
-            except Exception:
-                continue
-
-    except ImportError:
-        pass
-    except Exception:
-        pass
-
-    return {"usb_devices": devices}
+    devices.sort(key=lambda d: (d["name"].lower(), d["device_id"]))
+    return {"usb_devices": devices, "usb_events": events}
@@ -1,13 +1,19 @@
-"""Collect Windows activation/license information."""
+"""
+Collect Windows activation/license information.
+
+slmgr.vbs costs a few seconds of script-host time, so the result is kept
+in the fact cache for the current boot and refreshed after ttl seconds or
+when forced (refresh_licenses remote action).
+"""
 import sys
-import subprocess
 
+from .fact_cache import FactError, boot_key, get_fact, run_cscript
 
-def collect_windows_license():
-    """Collect Windows license status, edition, and partial product key."""
-    if sys.platform != "win32":
-        return {"windows_license": {}}
+SLMGR_PATH = "C:\\Windows\\System32\\slmgr.vbs"
 
+
+def _parse_dli(output):
+    """Parse `slmgr /dli` output into the license info dict."""
     info = {
         "edition": "",
         "status": "Unknown",
@@ -15,47 +21,61 @@ def collect_windows_license():
         "license_type": "",
     }
 
-    try:
-        # Get license status using slmgr
-        result = subprocess.run(
-            ["cscript", "//nologo", "C:\\Windows\\System32\\slmgr.vbs", "/dli"],
-            capture_output=True, text=True, timeout=15,
-            creationflags=subprocess.CREATE_NO_WINDOW,
-        )
-        output = result.stdout
-
-        for line in output.splitlines():
-            line = line.strip()
-            if "Name:" in line or "ชื่อ:" in line:
-                info["edition"] = line.split(":", 1)[-1].strip()
-            elif "License Status:" in line or "สถานะสิทธิ์การใช้งาน:" in line:
-                status = line.split(":", 1)[-1].strip()
-                info["status"] = status
-            elif "Partial Product Key:" in line:
-                info["partial_key"] = line.split(":", 1)[-1].strip()
-            elif "Description:" in line:
-                info["license_type"] = line.split(":", 1)[-1].strip()
-
-        # Fallback: get edition from systeminfo if not found
-        if not info["edition"]:
-            try:
-                import platform
-                info["edition"] = platform.platform()
-            except Exception:
-                pass
-
-        # Determine simple status
-        status_lower = info["status"].lower()
-        if "licensed" in status_lower or "ลิขสิทธิ์" in status_lower:
-            info["is_activated"] = True
-        else:
-            info["is_activated"] = False
-
-    except subprocess.TimeoutExpired:
-        info["status"] = "Timeout"
-        info["is_activated"] = False
-    except Exception as e:
-        info["status"] = f"Error: {str(e)[:100]}"
+    for line in output.splitlines():
+        line = line.strip()
+        if "Name:" in line or "ชื่อ:" in line:
+            info["edition"] = line.split(":", 1)[-1].strip()
+        elif "License Status:" in line or "สถานะสิทธิ์การใช้งาน:" in line:
+            status = line.split(":", 1)[-1].strip()
+            info["status"] = status
+        elif "Partial Product Key:" in line:
+            info["partial_key"] = line.split(":", 1)[-1].strip()
+        elif "Description:" in line:
+            info["license_type"] = line.split(":", 1)[-1].strip()
+
+    # Fallback: get edition from platform if not found
+    if not info["edition"]:
+        try:
+            import platform
+            info["edition"] = platform.platform()
+        except Exception:
+            pass
+
+    # Determine simple status
+    status_lower = info["status"].lower()
+    if "licensed" in status_lower or "ลิขสิทธิ์" in status_lower:
+        info["is_activated"] = True
+    else:
         info["is_activated"] = False
 
-    return {"windows_license": info}
+    return info
+
+
+def collect_windows_license(ttl=24 * 3600, force=False, runner=None):
+    """Collect Windows license status, edition, and partial product key (cached)."""
+    if sys.platform != "win32" and runner is None:
+        return {"windows_license": {}}
+
+    runner = runner or run_cscript
+
+    def _compute():
+        return _parse_dli(runner(SLMGR_PATH, "/dli", timeout=15))
+
+    error = None
+    try:
+        info = get_fact("windows_license", boot_key(script=SLMGR_PATH), _compute, ttl, force)
+    except FactError as e:
+        error = str(e)[:200]
+        timed_out = "timed out" in str(e).lower()
+        info = {
+            "edition": "",
+            "status": "Timeout" if timed_out else f"Error: {str(e)[:100]}",
+            "partial_key": "",
+            "license_type": "",
+            "is_activated": False,
+        }
+
+    result = {"windows_license": info}
+    if error:
+        result["collector_error"] = error
+    return result
@@ -1,65 +1,159 @@
-"""Collect Windows Update information."""
+"""
+Collect Windows Update information.
+
+The pending-update search (Microsoft.Update.Session, often 20-60 s and
+sometimes a WSUS round trip) runs in a background thread at most once per
+TTL, or sooner after a reboot or a hotfix change. The Get-HotFix listing is
+re-read only when the servicing packages registry key changes. The
+collector itself returns the cached results immediately.
+"""
 import sys
-import subprocess
+import time
+import logging
+import threading
 
+import psutil
 
-def collect_windows_update():
-    """Collect Windows Update status and recent updates."""
-    if sys.platform != "win32":
-        return {"windows_update": {}}
+from ps_host import run_powershell
+from .state import load_state, save_state
 
-    info = {
-        "recent_updates": [],
-        "pending_count": 0,
-    }
+logger = logging.getLogger("ITMonitorAgent")
 
-    try:
-        # Get recent installed updates using PowerShell
-        result = subprocess.run(
-            [
-                "powershell", "-NoProfile", "-Command",
-                "Get-HotFix | Sort-Object -Property InstalledOn -Descending -ErrorAction SilentlyContinue | "
-                "Select-Object -First 10 HotFixID, Description, InstalledOn | "
-                "ForEach-Object { $_.HotFixID + '|' + $_.Description + '|' + ($_.InstalledOn -f 'yyyy-MM-dd') }"
-            ],
-            capture_output=True, text=True, timeout=30,
-            creationflags=subprocess.CREATE_NO_WINDOW,
-        )
+# Changes whenever an update/hotfix package is installed or removed
+PACKAGES_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Component Based Servicing\Packages"
+# Re-read the hotfix list at least this often even without a key change
+HOTFIX_MAX_AGE = 24 * 3600
+# Retry a failed pending search after this long instead of waiting the full TTL
+ERROR_RETRY = 1800
+
+_state = None
+_lock = threading.Lock()
+_search_thread = None
 
-        for line in result.stdout.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split("|")
-            if len(parts) >= 2:
-                info["recent_updates"].append({
-                    "id": parts[0].strip(),
-                    "description": parts[1].strip(),
-                    "installed_on": parts[2].strip() if len(parts) >= 3 else "",
-                })
-
-    except subprocess.TimeoutExpired:
-        info["recent_updates"] = [{"id": "Timeout", "description": "Could not check"}]
+
+def _packages_stamp():
+    """Last-write time of the servicing packages key, or None."""
+    try:
+        from .software import WinRegistry
+        return WinRegistry().last_write(PACKAGES_KEY)
     except Exception:
-        pass
+        return None
+
 
+def _read_hotfixes():
+    """Recent installed updates via Get-HotFix."""
+    updates = []
+    output = run_powershell(
+        "Get-HotFix | Sort-Object -Property InstalledOn -Descending -ErrorAction SilentlyContinue | "
+        "Select-Object -First 10 HotFixID, Description, InstalledOn | "
+        "ForEach-Object { $_.HotFixID + '|' + $_.Description + '|' + ($_.InstalledOn -f 'yyyy-MM-dd') }",
+        timeout=30,
+    )
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split("|")
+        if len(parts) >= 2:
+            updates.append({
+                "id": parts[0].strip(),
+                "description": parts[1].strip(),
+                "installed_on": parts[2].strip() if len(parts) >= 3 else "",
+            })
+    return updates
+
+
+def _search_pending():
+    """Background job: count pending updates and store the result."""
+    started = time.time()
     try:
-        # Check for pending updates using COM (Windows Update Agent)
-        result = subprocess.run(
-            [
-                "powershell", "-NoProfile", "-Command",
-                "$UpdateSession = New-Object -ComObject Microsoft.Update.Session; "
-                "$UpdateSearcher = $UpdateSession.CreateUpdateSearcher(); "
-                "$SearchResult = $UpdateSearcher.Search('IsInstalled=0'); "
-                "$SearchResult.Updates.Count"
-            ],
-            capture_output=True, text=True, timeout=60,
-            creationflags=subprocess.CREATE_NO_WINDOW,
+        output = run_powershell(
+            "$UpdateSession = New-Object -ComObject Microsoft.Update.Session; "
+            "$UpdateSearcher = $UpdateSession.CreateUpdateSearcher(); "
+            "$SearchResult = $UpdateSearcher.Search('IsInstalled=0'); "
+            "$SearchResult.Updates.Count",
+            timeout=300,
         )
-        count = result.stdout.strip()
-        if count.isdigit():
-            info["pending_count"] = int(count)
-    except Exception:
-        pass
+        count = output.strip()
+        result = {"pending_count": int(count)} if count.isdigit() else {"pending_error": "Unexpected result"}
+    except TimeoutError:
+        result = {"pending_error": "Search timed out"}
+    except Exception as e:
+        result = {"pending_error": str(e)[:200]}
+
+    with _lock:
+        _state.update(result)
+        if "pending_count" in result:
+            _state.pop("pending_error", None)
+        _state["pending_checked_at"] = time.time()
+        _state["pending_boot_time"] = psutil.boot_time()
+        _state["pending_stamp"] = _state.get("hotfix_stamp")
+        save_state("windows_update", _state)
+    logger.info(f"Windows Update search finished in {time.time() - started:.0f}s: {result}")
+
+
+def _search_due(state, ttl):
+    if not state.get("pending_checked_at"):
+        return True
+    age = time.time() - state["pending_checked_at"]
+    if age >= ttl or (state.get("pending_error") and age >= ERROR_RETRY):
+        return True
+    # Rebooted (updates may have been applied) or hotfixes changed since the search
+    if abs(state.get("pending_boot_time", 0) - psutil.boot_time()) > 5:
+        return True
+    return state.get("pending_stamp") != state.get("hotfix_stamp")
+
+
+def collect_windows_update(pending_ttl=4 * 3600):
+    """Collect Windows Update status and recent updates (cached)."""
+    global _state, _search_thread
+    if sys.platform != "win32":
+        return {"windows_update": {}}
+
+    with _lock:
+        if _state is None:
+            _state = load_state("windows_update", {}) or {}
+        state = _state
+
+    # Hotfix listing: refresh only when the servicing key changed
+    stamp = _packages_stamp()
+    if (
+        "recent_updates" not in state
+        or stamp != state.get("hotfix_stamp")
+        or time.time() - state.get("hotfix_checked_at", 0) >= HOTFIX_MAX_AGE
+    ):
+        try:
+            updates = _read_hotfixes()
+        except Exception as e:
+            # Keep the previous list and stamp so the next cycle retries
+            logger.debug(f"Get-HotFix failed: {e}")
+            updates = None
+        if updates is not None:
+            with _lock:
+                state["recent_updates"] = updates
+                state["hotfix_stamp"] = stamp
+                state["hotfix_checked_at"] = time.time()
+                save_state("windows_update", state)
+
+    # Pending search: start a background refresh when due
+    with _lock:
+        if _search_due(state, pending_ttl) and not (_search_thread and _search_thread.is_alive()):
+            _search_thread = threading.Thread(
+                target=_search_pending, name="windows-update-search", daemon=True
+            )
+            _search_thread.start()
+
+        # The age is reported as the check timestamp so the section stays
+        # unchanged (delta-encodable) between searches
+        info = {
+            "recent_updates": state.get(
+                "recent_updates", [{"id": "Timeout", "description": "Could not check"}]
+            ),
+            "pending_count": state.get("pending_count", 0),
+            "pending_checked_at": state.get("pending_checked_at"),
+            "pending_searching": bool(_search_thread and _search_thread.is_alive()),
+        }
+        if state.get("pending_error"):
+            info["pending_error"] = state["pending_error"]
 
     return {"windows_update": info}
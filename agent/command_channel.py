@@ -0,0 +1,206 @@
+"""
+IT Monitor Agent - Command Channel
+Holds a long-poll request open on /api/agent/commands in a dedicated
+thread so remote commands are delivered within a second, independently
+of the reporting schedule.
+
+Run directly to measure pickup latency with many simulated agents against
+a local long-poll stand-in server (works on Linux):
+    python command_channel.py [agents]
+"""
+
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import threading
+
+from http_client import get_client
+
+logger = logging.getLogger("ITMonitorAgent")
+
+
+class CommandChannel:
+    """Long-poll loop that receives commands and hands them to a dispatcher."""
+
+    def __init__(self, dispatch, wait=25, max_backoff=60, hostname=None, client=None):
+        """
+        dispatch: callable taking a list of command dicts from the server.
+        wait: seconds the server holds each poll open.
+        hostname/client: identity and HTTP client (default: this machine's
+        hostname and the shared agent client).
+        """
+        self.dispatch = dispatch
+        self.wait = wait
+        self.max_backoff = max_backoff
+        self.hostname = hostname or socket.gethostname()
+        self.client = client
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the channel thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="command-channel", daemon=True
+        )
+        self._thread.start()
+        logger.info("Command channel started")
+
+    def stop(self):
+        self._stop.set()
+
+    def _poll(self):
+        """One long-poll request. Returns the list of commands received."""
+        resp = (self.client or get_client()).get(
+            "/api/agent/commands",
+            params={"hostname": self.hostname, "wait": self.wait},
+            timeout=self.wait + 10,
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code}")
+        return resp.json() or []
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                started = time.time()
+                commands = self._poll()
+                backoff = 1
+                if commands:
+                    self.dispatch(commands)
+                elif time.time() - started < 1:
+                    # Server answered immediately (no long-poll support): throttle
+                    self._stop.wait(5)
+            except Exception as e:
+                # Reconnect with exponential backoff and jitter
+                delay = backoff + random.uniform(0, backoff / 2)
+                logger.debug(f"Command channel error: {e} - retrying in {delay:.1f}s")
+                self._stop.wait(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+class _StandInServer:
+    """Local /api/agent/commands long-poll endpoint with per-host queues."""
+
+    def __init__(self):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        from urllib.parse import urlsplit, parse_qs
+
+        self._lock = threading.Lock()
+        self._queues = {}   # hostname -> [command]
+        self._events = {}   # hostname -> Event set when a command is queued
+        self.waiting = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query)
+                host = query.get("hostname", [""])[0]
+                wait = float(query.get("wait", ["0"])[0])
+                body = json.dumps(server.take(host, wait)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.request_queue_size = 2048
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _event(self, host):
+        with self._lock:
+            return self._events.setdefault(host, threading.Event())
+
+    def push(self, host, command):
+        with self._lock:
+            self._queues.setdefault(host, []).append(command)
+        self._event(host).set()
+
+    def take(self, host, wait):
+        event = self._event(host)
+        with self._lock:
+            self.waiting += 1
+        event.wait(wait)
+        with self._lock:
+            self.waiting -= 1
+            commands = self._queues.pop(host, [])
+            event.clear()
+        return commands
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def _harness(agents=1000, rounds=200, wait=20):
+    """Pickup latency from queueing a command to its dispatch on the agent."""
+    from http_client import AgentHttpClient
+
+    server = _StandInServer()
+    latencies = []
+    lock = threading.Lock()
+
+    def dispatch(commands):
+        now = time.perf_counter()
+        with lock:
+            latencies.extend(now - c["queued_at"] for c in commands)
+
+    channels = []
+    for i in range(agents):
+        channel = CommandChannel(
+            dispatch, wait=wait, hostname=f"agent-{i}",
+            client=AgentHttpClient(server.url, "", pool_size=1),
+        )
+        channel.start()
+        channels.append(channel)
+
+    deadline = time.time() + 60
+    while server.waiting < agents and time.time() < deadline:
+        time.sleep(0.1)
+    connected = server.waiting
+
+    def _report(label, count):
+        deadline = time.time() + 30
+        while len(latencies) < count and time.time() < deadline:
+            time.sleep(0.01)
+        ms = sorted(x * 1000 for x in latencies)
+        print(
+            f"  {label}: {len(ms)}/{count} picked up, "
+            f"p50 {ms[len(ms) // 2]:.1f} ms, p95 {ms[int(len(ms) * 0.95)]:.1f} ms, max {ms[-1]:.1f} ms"
+        )
+        latencies.clear()
+
+    print(f"{connected}/{agents} channels holding a long poll")
+
+    # One command at a time to a random agent
+    for _ in range(rounds):
+        server.push(f"agent-{random.randrange(agents)}", {"queued_at": time.perf_counter()})
+        time.sleep(0.01)
+    _report("single", rounds)
+
+    # One command to every agent at once
+    for i in range(agents):
+        server.push(f"agent-{i}", {"queued_at": time.perf_counter()})
+    _report("burst", agents)
+
+    for channel in channels:
+        channel.stop()
+    server.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    _harness(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,284 @@
+"""
+IT Monitor Agent - Command Executor
+Runs remote commands on a bounded worker pool so long jobs (sfc_scan,
+disk_cleanup) don't block reporting or other commands. Heavy maintenance
+jobs are limited per concurrency class, running jobs send progress
+heartbeats, and the server can cancel them. Command output is streamed
+to the server in sequenced chunks while the job runs.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_client
+from remote_actions import execute_command, set_job_context
+
+logger = logging.getLogger("ITMonitorAgent")
+
+# Concurrency class per action; anything not listed is "normal"
+ACTION_CLASSES = {
+    "sfc_scan": "heavy",
+    "disk_cleanup": "heavy",
+    "gpupdate": "heavy",
+    "clear_temp": "heavy",
+    "restart": "power",
+    "shutdown": "power",
+    "logoff": "power",
+    "live_view": "live",
+}
+
+# Max concurrently running jobs per class ("normal" is set from max_workers)
+CLASS_LIMITS = {
+    "heavy": 1,
+    "power": 1,
+    "live": 1,
+    "normal": 4,
+}
+
+
+# Output streaming: max bytes per posted chunk, and max bytes buffered
+# while the server is unreachable (oldest output is dropped beyond this)
+CHUNK_SIZE = 32 * 1024
+MAX_BUFFERED = 256 * 1024
+
+
+class OutputStream:
+    """Buffers a job's output and hands it out as sequenced chunks."""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+        self._dropped = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self._parts.append(text)
+            self._size += len(text)
+            while self._size > MAX_BUFFERED and len(self._parts) > 1:
+                dropped = self._parts.pop(0)
+                self._size -= len(dropped)
+                self._dropped += len(dropped)
+
+    def take_chunks(self):
+        """Drain the buffer into [{"seq", "data"}] chunks of at most CHUNK_SIZE."""
+        with self._lock:
+            text = "".join(self._parts)
+            if self._dropped:
+                text = f"[... {self._dropped} bytes dropped ...]\n" + text
+            self._parts = []
+            self._size = 0
+            self._dropped = 0
+            chunks = []
+            for start in range(0, len(text), CHUNK_SIZE):
+                chunks.append({"seq": self._seq, "data": text[start:start + CHUNK_SIZE]})
+                self._seq += 1
+            return chunks
+
+    def restore(self, chunks):
+        """Put back chunks that failed to post so they are retried in order."""
+        if not chunks:
+            return
+        with self._lock:
+            self._seq = chunks[0]["seq"]
+            self._parts.insert(0, "".join(c["data"] for c in chunks))
+            self._size += sum(len(c["data"]) for c in chunks)
+
+
+class _Job:
+    def __init__(self, cmd):
+        self.id = cmd.get("id")
+        self.action = cmd.get("action")
+        self.params = cmd.get("params")
+        self.cls = ACTION_CLASSES.get(self.action, "normal")
+        self.cancel = threading.Event()
+        self.output = OutputStream()
+        self.started_at = None
+        # Held while posting progress; done stops heartbeats for the job
+        self.post_lock = threading.Lock()
+        self.done = False
+        # Set once the server has seen a post for the job (claim acknowledged)
+        self.acked = False
+
+
+class CommandExecutor:
+    """Bounded, class-limited executor for remote commands."""
+
+    def __init__(self, on_result, max_workers=4, heartbeat_interval=15, flush_interval=2):
+        """
+        on_result: callable(result_dict) called when a job finishes;
+        the dict contains the command "id" plus the action result.
+        """
+        self.on_result = on_result
+        self.heartbeat_interval = heartbeat_interval
+        self.flush_interval = flush_interval
+        # "normal" gets max_workers slots; the pool has a thread for every
+        # slot of every class, so an admitted job starts immediately
+        self._limits = dict(CLASS_LIMITS, normal=max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=sum(self._limits.values()), thread_name_prefix="command"
+        )
+        # Per class: number of jobs submitted to the pool, and jobs waiting
+        # for a slot. Waiting jobs never occupy a pool thread, so a backlog
+        # of heavy jobs cannot starve quick ones like lock or kill_process.
+        self._running = {name: 0 for name in CLASS_LIMITS}
+        self._pending = {name: deque() for name in CLASS_LIMITS}
+        self._jobs = {}
+        # Recently finished ids: the server re-sends a command whose claim it
+        # never saw acknowledged, which must not run it a second time
+        self._finished = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="command-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def submit(self, commands):
+        """Queue commands received from the server."""
+        for cmd in commands:
+            job = _Job(cmd)
+            with self._lock:
+                if job.id in self._jobs or job.id in self._finished:
+                    continue  # already queued, running or done
+                self._jobs[job.id] = job
+                if self._running[job.cls] < self._limits[job.cls]:
+                    self._running[job.cls] += 1
+                    start = True
+                else:
+                    self._pending[job.cls].append(job)
+                    start = False
+            logger.info(f"Queued command {job.id}: {job.action}")
+            if start:
+                self._pool.submit(self._run, job)
+
+    def cancel(self, cmd_id):
+        """Request cancellation of a queued or running command."""
+        with self._lock:
+            job = self._jobs.get(cmd_id)
+            waiting = job is not None and job in self._pending[job.cls]
+            if waiting:
+                self._pending[job.cls].remove(job)
+        if job:
+            job.cancel.set()
+        if waiting:
+            self._finish(job, {"success": False, "output": "Command cancelled"})
+
+    def _release(self, cls):
+        """Hand a freed class slot to the next waiting job."""
+        with self._lock:
+            if self._pending[cls]:
+                self._pool.submit(self._run, self._pending[cls].popleft())
+            else:
+                self._running[cls] -= 1
+
+    def _run(self, job):
+        try:
+            if job.cancel.is_set():
+                result = {"success": False, "output": "Command cancelled"}
+            else:
+                job.started_at = time.time()
+                logger.info(f"Executing command {job.id}: {job.action}")
+                set_job_context(job.cancel, job.output, job.id)
+                try:
+                    result = execute_command(job.action, job.params)
+                finally:
+                    set_job_context(None)
+        except Exception as e:
+            logger.error(f"Command {job.id} failed: {e}")
+            result = {"success": False, "output": f"Error: {str(e)[:500]}"}
+        finally:
+            self._release(job.cls)
+        self._finish(job, result)
+
+    def _finish(self, job, result):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            self._finished.append(job.id)
+        # Stop heartbeats for the job, waiting out one in flight, so none can
+        # reach the server after the final result
+        with job.post_lock:
+            job.done = True
+        # Deliver remaining output and any attachment before the final result
+        self._post_progress(job, None, final=True)
+        attachment = result.pop("attachment", None)
+        if attachment:
+            if not self._upload_attachment(job, *attachment):
+                result = {"success": False, "output": f"{result.get('output', '')}\nUpload failed".strip()}
+        try:
+            self.on_result({"id": job.id, **result})
+        except Exception as e:
+            logger.error(f"Failed to report result for command {job.id}: {e}")
+
+    def _upload_attachment(self, job, fileobj, content_type):
+        """Stream a binary result (e.g. a screenshot) to the server. Returns True on success."""
+        try:
+            # A generator body is sent chunked straight from the spooled file
+            # (passing the file itself would make requests roll it to disk)
+            resp = get_client().post(
+                f"/api/agent/commands/{job.id}/attachment",
+                data=iter(lambda: fileobj.read(64 * 1024), b""),
+                headers={"Content-Type": content_type},
+                timeout=60,
+            )
+            if resp.status_code == 200:
+                return True
+            logger.warning(f"Attachment for command {job.id} rejected: HTTP {resp.status_code}")
+        except Exception as e:
+            logger.error(f"Failed to upload attachment for command {job.id}: {e}")
+        finally:
+            fileobj.close()
+        return False
+
+    def _post_progress(self, job, status, final=False):
+        """Post buffered output chunks and/or a status line for a job."""
+        with job.post_lock:
+            if job.done and not final:
+                return
+            cancelled = self._post_progress_locked(job, status)
+        if cancelled:
+            # Outside post_lock: a queued job is finished right away
+            self.cancel(job.id)
+
+    def _post_progress_locked(self, job, status):
+        """Post one progress update. Returns True if the server cancelled the job."""
+        chunks = job.output.take_chunks()
+        if not chunks and status is None:
+            return False
+        body = {"progress": True, "chunks": chunks}
+        if status is not None:
+            body["output"] = status
+        try:
+            resp = get_client().post(f"/api/agent/commands/{job.id}/result", json=body)
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}")
+            job.acked = True
+            if resp.json().get("cancel"):
+                logger.info(f"Command {job.id} cancelled by server")
+                return True
+        except Exception as e:
+            job.output.restore(chunks)
+            logger.debug(f"Progress for command {job.id} failed: {e}")
+        return False
+
+    def _heartbeat_loop(self):
+        """Stream output, post progress for running jobs and pick up server-side cancellation."""
+        last_heartbeat = time.time()
+        while True:
+            time.sleep(self.flush_interval)
+            heartbeat = time.time() - last_heartbeat >= self.heartbeat_interval
+            if heartbeat:
+                last_heartbeat = time.time()
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                status = None
+                # New jobs report at once so the server knows they arrived
+                if heartbeat or not job.acked:
+                    state = "running" if job.started_at else "queued"
+                    elapsed = int(time.time() - job.started_at) if job.started_at else 0
+                    status = f"{job.action}: {state} ({elapsed}s)"
+                self._post_progress(job, status)
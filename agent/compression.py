@@ -0,0 +1,88 @@
+"""
+IT Monitor Agent - Payload Compression
+Encodes report payloads as compressed JSON (zstd if available, else gzip).
+
+Run directly to compare codecs on recorded payloads:
+    python compression.py offline_reports/*.json
+"""
+
+import sys
+import gzip
+import json
+import time
+import logging
+
+logger = logging.getLogger("ITMonitorAgent")
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Payloads smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+
+def resolve_codec(preference="auto"):
+    """Pick the codec to use for a configured preference (auto/zstd/gzip/none)."""
+    if preference == "auto":
+        return "zstd" if ZSTD_AVAILABLE else "gzip"
+    if preference == "zstd" and not ZSTD_AVAILABLE:
+        logger.warning("zstandard not installed, falling back to gzip")
+        return "gzip"
+    if preference in ("zstd", "gzip"):
+        return preference
+    return "identity"
+
+
+def compress(raw, codec):
+    """Compress bytes with the given codec."""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    if codec == "gzip":
+        return gzip.compress(raw, compresslevel=6)
+    return raw
+
+
+def encode_json(data, codec="gzip"):
+    """
+    Serialize data to JSON and compress it.
+    Returns (body, headers) ready for an HTTP POST.
+    """
+    raw = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if codec == "identity" or len(raw) < MIN_COMPRESS_SIZE:
+        return raw, headers
+    headers["Content-Encoding"] = codec
+    return compress(raw, codec), headers
+
+
+def _benchmark(paths):
+    """Print wire size and compression time per codec for recorded payloads."""
+    codecs = ["identity", "gzip"] + (["zstd"] if ZSTD_AVAILABLE else [])
+    totals = {codec: [0, 0.0] for codec in codecs}
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.dumps(json.load(f), ensure_ascii=False).encode("utf-8")
+        for codec in codecs:
+            start = time.perf_counter()
+            body = compress(raw, codec)
+            totals[codec][0] += len(body)
+            totals[codec][1] += time.perf_counter() - start
+
+    raw_total = totals["identity"][0] or 1
+    print(f"{len(paths)} payload(s)")
+    for codec, (size, seconds) in totals.items():
+        print(
+            f"{codec:>9}: {size / 1024:10.1f} KB  "
+            f"({size / raw_total * 100:5.1f}%)  {seconds * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python compression.py <payload.json> [...]")
+        sys.exit(1)
+    _benchmark(sys.argv[1:])
@@ -0,0 +1,358 @@
+"""
+IT Monitor Agent - Disk Usage Analyzer
+Walks a volume or path with parallel os.scandir workers, aggregates sizes
+per directory and reports the largest directories and files.
+
+Memory stays bounded: one heap of the top-N files is kept per scan root
+(cached directories store only their totals), and at most
+MAX_TRACKED_DIRS directories are tracked individually - deeper ones are
+folded into their tracked ancestor. A follow-up scan within the cache TTL
+re-reads only directories whose mtime changed; the cache is dropped when
+its TTL expires and holds at most MAX_CACHED_ROOTS scans.
+
+Run directly to benchmark on a synthetic tree:
+    python disk_usage.py [files]
+"""
+
+import os
+import sys
+import time
+import heapq
+import queue
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger("ITMonitorAgent")
+
+DEFAULT_OPTIONS = {
+    "path": None,
+    "top": 20,
+    "depth": 3,
+    "time_budget": 60,
+    "cache_ttl": 600,
+    "workers": 8,
+}
+
+# Upper bound on individually tracked (and cached) directories
+MAX_TRACKED_DIRS = 300_000
+
+# Scans kept for follow-ups; the oldest is dropped beyond this
+MAX_CACHED_ROOTS = 2
+
+# Previous scans, oldest first: path -> (expires_at, {dir: _DirEntry}, top files)
+_scan_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _expire(root, expires_at):
+    """Drop a cached scan once its TTL is over (unless it was replaced)."""
+    with _cache_lock:
+        hit = _scan_cache.get(root)
+        if hit and hit[0] == expires_at:
+            del _scan_cache[root]
+
+
+def default_path():
+    if sys.platform == "win32":
+        return os.environ.get("SYSTEMDRIVE", "C:") + "\\"
+    return "/"
+
+
+def parse_options(params):
+    """Merge disk usage params (dict or JSON string) over the defaults."""
+    import json
+
+    options = dict(DEFAULT_OPTIONS)
+    if params:
+        p = json.loads(params) if isinstance(params, str) else params
+        options.update({k: v for k, v in p.items() if k in DEFAULT_OPTIONS and v is not None})
+
+    options["path"] = options["path"] or default_path()
+    options["top"] = max(1, min(int(options["top"]), 200))
+    options["depth"] = max(1, min(int(options["depth"]), 20))
+    options["time_budget"] = max(1, min(float(options["time_budget"]), 600))
+    options["cache_ttl"] = max(0, int(options["cache_ttl"]))
+    options["workers"] = max(1, min(int(options["workers"]), 32))
+    return options
+
+
+class _DirEntry:
+    """Totals for one directory's direct contents."""
+
+    __slots__ = ("mtime", "size", "files", "subdirs")
+
+    def __init__(self, mtime, size, files, subdirs):
+        self.mtime = mtime
+        self.size = size            # bytes of files directly inside
+        self.files = files          # number of files directly inside
+        self.subdirs = subdirs      # names of subdirectories
+
+
+def _scan_dir(path, mtime, top):
+    """Read one directory's direct entries. Returns (_DirEntry, [(size, name)] largest files)."""
+    size = files = 0
+    subdirs = []
+    largest = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.is_symlink():
+                        subdirs.append(entry.name)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            size += st.st_size
+            files += 1
+            if len(largest) < top:
+                heapq.heappush(largest, (st.st_size, entry.name))
+            elif st.st_size > largest[0][0]:
+                heapq.heapreplace(largest, (st.st_size, entry.name))
+    return _DirEntry(mtime, size, files, subdirs), largest
+
+
+class _Scan:
+    """One parallel walk of a tree."""
+
+    def __init__(self, root, options, cached=None, cached_files=None):
+        self.root = root
+        self.top = options["top"]
+        self.deadline = time.monotonic() + options["time_budget"]
+        self.workers = options["workers"]
+        self.cached = cached or {}
+        # Previous scan's top files by directory: an unchanged directory
+        # contributes these instead of being re-read
+        self.cached_files = {}
+        for size, file_path in cached_files or ():
+            self.cached_files.setdefault(os.path.dirname(file_path), []).append((size, file_path))
+
+        self.entries = {}   # tracked dir -> _DirEntry (becomes the next cache)
+        self.parent = {}    # tracked dir -> tracked parent
+        self.depth = {}     # tracked dir -> depth below root
+        self.folded = {}    # tracked dir -> bytes from untracked descendants
+        self.top_files = []
+        self.stats = {"dirs": 0, "files": 0, "reused": 0, "errors": 0, "partial": False}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+    def run(self):
+        self._track(self.root, None, 0)
+        self._queue.put((self.root, self.root))
+        threads = [
+            threading.Thread(target=self._worker, name=f"disk-usage-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        self._queue.join()
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join()
+
+    def _track(self, path, parent, depth):
+        """Start tracking a directory. Returns False once the cap is reached."""
+        with self._lock:
+            if len(self.depth) >= MAX_TRACKED_DIRS:
+                return False
+            self.parent[path] = parent
+            self.depth[path] = depth
+            self.folded[path] = 0
+            return True
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            try:
+                self._process(*item)
+            except Exception as e:
+                logger.debug(f"Disk usage worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _process(self, path, owner):
+        """Scan path; its bytes count towards owner (path itself if tracked)."""
+        if time.monotonic() > self.deadline:
+            self.stats["partial"] = True
+            return
+        try:
+            mtime = os.stat(path).st_mtime
+            cached = self.cached.get(path)
+            if cached is not None and cached.mtime == mtime:
+                entry = cached
+                files = self.cached_files.get(path, ())
+                reused = 1
+            else:
+                entry, largest = _scan_dir(path, mtime, self.top)
+                files = [(size, os.path.join(path, name)) for size, name in largest]
+                reused = 0
+        except OSError:
+            with self._lock:
+                self.stats["errors"] += 1
+            return
+
+        with self._lock:
+            self.stats["dirs"] += 1
+            self.stats["files"] += entry.files
+            self.stats["reused"] += reused
+            if owner == path:
+                self.entries[path] = entry
+            else:
+                self.folded[owner] += entry.size
+            for item in files:
+                size = item[0]
+                if len(self.top_files) < self.top:
+                    heapq.heappush(self.top_files, item)
+                elif size > self.top_files[0][0]:
+                    heapq.heapreplace(self.top_files, item)
+
+        depth = self.depth.get(owner, 0) + 1
+        for name in entry.subdirs:
+            child = os.path.join(path, name)
+            if owner == path and self._track(child, path, depth):
+                self._queue.put((child, child))
+            else:
+                self._queue.put((child, owner))
+
+    def totals(self):
+        """Total bytes per tracked directory, including all descendants."""
+        totals = {
+            path: (self.entries[path].size if path in self.entries else 0) + self.folded[path]
+            for path in self.depth
+        }
+        for path in sorted(self.depth, key=self.depth.get, reverse=True):
+            parent = self.parent[path]
+            if parent is not None:
+                totals[parent] += totals[path]
+        return totals
+
+
+def analyze(options):
+    """
+    Scan options["path"] and return a summary dict with the top
+    directories (up to options["depth"] below the root) and files.
+    """
+    root = os.path.abspath(options["path"])
+    if not os.path.isdir(root):
+        raise ValueError(f"Not a directory: {root}")
+
+    cached = None
+    with _cache_lock:
+        now = time.time()
+        for path in [p for p, hit in _scan_cache.items() if hit[0] <= now]:
+            del _scan_cache[path]
+        hit = _scan_cache.get(root)
+        if hit and options["cache_ttl"] > 0:
+            cached = hit[1:]
+
+    started = time.perf_counter()
+    scan = _Scan(root, options, *(cached or (None, None)))
+    scan.run()
+    totals = scan.totals()
+
+    # Only complete scans are cached, so a partial result is never reused as whole
+    if not scan.stats["partial"] and options["cache_ttl"] > 0:
+        expires_at = time.time() + options["cache_ttl"]
+        with _cache_lock:
+            _scan_cache.pop(root, None)
+            _scan_cache[root] = (expires_at, scan.entries, list(scan.top_files))
+            while len(_scan_cache) > MAX_CACHED_ROOTS:
+                del _scan_cache[next(iter(_scan_cache))]
+        timer = threading.Timer(options["cache_ttl"], _expire, args=(root, expires_at))
+        timer.daemon = True
+        timer.start()
+
+    candidates = (
+        (size, path) for path, size in totals.items()
+        if 0 < scan.depth[path] <= options["depth"]
+    )
+    top_dirs = heapq.nlargest(options["top"], candidates)
+    top_files = sorted(scan.top_files, reverse=True)
+
+    return {
+        "path": root,
+        "total_bytes": totals.get(root, 0),
+        "dirs_scanned": scan.stats["dirs"],
+        "files_scanned": scan.stats["files"],
+        "dirs_reused": scan.stats["reused"],
+        "errors": scan.stats["errors"],
+        "partial": scan.stats["partial"],
+        "cached": cached is not None,
+        "seconds": round(time.perf_counter() - started, 2),
+        "top_dirs": [{"path": p, "bytes": s} for s, p in top_dirs],
+        "top_files": [{"path": p, "bytes": s} for s, p in top_files],
+    }
+
+
+def format_report(summary):
+    """Human-readable version of an analyze() summary."""
+
+    def _size(n):
+        for unit in ("B", "KB", "MB", "GB"):
+            if n < 1024:
+                return f"{n:.1f} {unit}"
+            n /= 1024
+        return f"{n:.1f} TB"
+
+    lines = [
+        f"{summary['path']}: {_size(summary['total_bytes'])} in "
+        f"{summary['files_scanned']} files, {summary['dirs_scanned']} dirs "
+        f"({summary['seconds']}s{', partial' if summary['partial'] else ''}"
+        f"{', ' + str(summary['dirs_reused']) + ' dirs from cache' if summary['cached'] else ''})",
+        "",
+        "Largest directories:",
+    ]
+    lines += [f"  {_size(d['bytes']):>10}  {d['path']}" for d in summary["top_dirs"]]
+    lines += ["", "Largest files:"]
+    lines += [f"  {_size(f['bytes']):>10}  {f['path']}" for f in summary["top_files"]]
+    return "\n".join(lines)
+
+
+def _benchmark(files=200000):
+    """Time a full scan and a cached re-scan of a synthetic tree."""
+    import psutil
+
+    with tempfile.TemporaryDirectory() as base:
+        per_dir = 50
+        created = 0
+        i = 0
+        while created < files:
+            d = os.path.join(base, f"a{i % 20}", f"b{i % 400}", f"c{i}")
+            os.makedirs(d, exist_ok=True)
+            for k in range(min(per_dir, files - created)):
+                with open(os.path.join(d, f"f{k}"), "wb") as f:
+                    f.truncate((k + 1) * 100)
+                created += 1
+            i += 1
+
+        proc = psutil.Process()
+        rss_before = proc.memory_info().rss
+        options = parse_options({"path": base, "cache_ttl": 600})
+        first = analyze(options)
+        rss_after = proc.memory_info().rss
+        # Touch one directory, then re-scan from the cache
+        with open(os.path.join(base, "a0", "b0", "c0", "new"), "wb") as f:
+            f.truncate(10**6)
+        second = analyze(options)
+        fresh = analyze(parse_options({"path": base, "cache_ttl": 0}))
+        # Equal sizes may tie differently, so compare sizes
+        sizes = [f["bytes"] for f in second["top_files"]]
+        assert sizes == [f["bytes"] for f in fresh["top_files"]], "cached scan keeps the top files"
+        assert second["top_files"][0]["bytes"] == 10**6
+
+    print(f"{files} files, {first['dirs_scanned']} dirs")
+    print(f"  full scan:   {first['seconds']:6.2f} s  rss +{(rss_after - rss_before) / 1048576:.1f} MB")
+    print(f"  cached scan: {second['seconds']:6.2f} s  ({second['dirs_reused']} dirs reused)")
+    root = os.path.abspath(base)
+    _expire(root, _scan_cache[root][0])
+    assert root not in _scan_cache, "expired scan dropped"
+    print(f"  total:       {second['total_bytes'] / 1048576:.1f} MB")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,117 @@
+"""
+IT Monitor Agent - Shared HTTP Client
+One keep-alive connection pool for every agent-to-server call, with the
+API key and default timeouts applied in one place.
+"""
+
+import threading
+import logging
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("ITMonitorAgent")
+
+DEFAULT_TIMEOUT = 10
+# Connections beyond the command workers: report/sync, command channel,
+# result heartbeats and live view
+BASE_POOL_SIZE = 4
+
+
+def _origin(url):
+    """(scheme, host, port) of a URL, with the scheme's default port filled in."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    if port is None:
+        port = {"http": 80, "https": 443}.get(scheme)
+    return scheme, (parts.hostname or "").lower(), port
+
+
+class AgentHttpClient:
+    """Pooled HTTP session shared by all agent modules."""
+
+    def __init__(self, server_url="", api_key="", timeout=DEFAULT_TIMEOUT, pool_size=BASE_POOL_SIZE):
+        self.server_url = server_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._requests = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.resize(pool_size)
+
+    def resize(self, pool_size):
+        """Keep up to pool_size connections per host (one per concurrent caller)."""
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._adapter = adapter
+
+    def _url(self, path):
+        """Resolve a server path ("/api/...") or pass through an absolute URL."""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.server_url}{path}"
+
+    def request(self, method, path, headers=None, timeout=None, **kwargs):
+        """Send a request; the API key is only attached for our own server."""
+        url = self._url(path)
+        merged = {}
+        if self.api_key and self.server_url and _origin(url) == _origin(self.server_url):
+            merged["x-api-key"] = self.api_key
+        if headers:
+            merged.update(headers)
+
+        with self._lock:
+            self._requests += 1
+        return self.session.request(
+            method, url, headers=merged, timeout=timeout or self.timeout, **kwargs
+        )
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def stats(self):
+        """Connections opened vs. requests made (to verify keep-alive reuse)."""
+        connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+        with self._lock:
+            return {"requests": self._requests, "connections": connections}
+
+    def close(self):
+        self.session.close()
+
+
+_client = AgentHttpClient()
+
+
+def init_client(server_url, api_key, timeout=DEFAULT_TIMEOUT, workers=0):
+    """
+    Configure the shared client with the agent's server URL and API key,
+    sizing its pool for workers concurrent command jobs.
+    """
+    _client.server_url = server_url.rstrip("/")
+    _client.api_key = api_key
+    _client.timeout = timeout
+    _client.resize(workers + BASE_POOL_SIZE)
+    return _client
+
+
+def get_client():
+    """Get the shared agent HTTP client."""
+    return _client
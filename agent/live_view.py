@@ -0,0 +1,274 @@
+"""
+IT Monitor Agent - Live View
+Streams the screen at a low frame rate by diffing each frame against the
+last one in fixed-size tiles and sending only the tiles that changed,
+JPEG-compressed, under a hard bandwidth cap.
+
+Frame wire format (POST body, application/octet-stream):
+    4-byte big-endian header length | JSON header | tile JPEGs back to back
+where the header is {"seq", "width", "height", "tiles": [[x, y, w, h, size], ...]}.
+
+Run directly to benchmark tile diffing headlessly on synthetic frames:
+    python live_view.py
+"""
+
+import io
+import json
+import time
+import struct
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("ITMonitorAgent")
+
+DEFAULT_OPTIONS = {
+    "fps": 1,
+    "duration": 120,
+    "max_kbps": 256,
+    "tile": 64,
+    "quality": 50,
+    "max_dimension": 1280,
+    "monitor": "all",
+}
+
+# Upper bounds for admin-supplied options
+LIMITS = {
+    "fps": 5,
+    "duration": 600,
+    "max_kbps": 4096,
+}
+
+
+def parse_options(params):
+    """Merge live view params (dict or JSON string) over the defaults."""
+    options = dict(DEFAULT_OPTIONS)
+    if params:
+        p = json.loads(params) if isinstance(params, str) else params
+        options.update({k: v for k, v in p.items() if k in DEFAULT_OPTIONS})
+
+    options["fps"] = max(0.1, min(float(options["fps"]), LIMITS["fps"]))
+    options["duration"] = max(1, min(int(options["duration"]), LIMITS["duration"]))
+    options["max_kbps"] = max(16, min(int(options["max_kbps"]), LIMITS["max_kbps"]))
+    options["tile"] = max(16, min(int(options["tile"]), 256))
+    options["quality"] = max(1, min(int(options["quality"]), 95))
+    return options
+
+
+class TileDiffer:
+    """Finds the tiles of an RGB frame that differ from the previous frame."""
+
+    def __init__(self, tile=64):
+        self.tile = tile
+        self.prev = None
+
+    def changed(self, frame):
+        """
+        Boolean grid (rows, cols) of tiles that changed since the last
+        committed frame. A new frame size marks every tile as changed.
+        """
+        t = self.tile
+        h, w = frame.shape[:2]
+        rows, cols = -(-h // t), -(-w // t)
+        if self.prev is None or self.prev.shape != frame.shape:
+            self.prev = None
+            return np.ones((rows, cols), dtype=bool)
+
+        # Compare raw bytes (channels folded into the row), pad to whole
+        # tiles, then reduce each tile block in one pass
+        diff = (frame != self.prev).reshape(h, w * 3)
+        pad_h, pad_w = rows * t - h, (cols * t - w) * 3
+        if pad_h or pad_w:
+            diff = np.pad(diff, ((0, pad_h), (0, pad_w)))
+        return diff.reshape(rows, t, cols, t * 3).any(axis=(1, 3))
+
+    def commit(self, frame, tiles):
+        """Record the given (x, y, w, h) tiles of frame as sent."""
+        if self.prev is None:
+            self.prev = np.zeros_like(frame)
+        for x, y, w, h in tiles:
+            self.prev[y:y + h, x:x + w] = frame[y:y + h, x:x + w]
+
+
+def tile_rects(mask, tile, width, height):
+    """(x, y, w, h) rectangles for the True cells of a tile mask."""
+    rects = []
+    for row, col in zip(*np.nonzero(mask)):
+        x, y = int(col) * tile, int(row) * tile
+        rects.append((x, y, min(tile, width - x), min(tile, height - y)))
+    return rects
+
+
+def encode_tile(frame, rect, quality):
+    """JPEG-encode one tile of an RGB frame."""
+    from PIL import Image
+
+    x, y, w, h = rect
+    out = io.BytesIO()
+    Image.fromarray(frame[y:y + h, x:x + w]).save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def build_frame(seq, width, height, tiles):
+    """Pack (rect, jpeg) tiles into the binary frame format."""
+    header = json.dumps({
+        "seq": seq,
+        "width": width,
+        "height": height,
+        "tiles": [[x, y, w, h, len(data)] for (x, y, w, h), data in tiles],
+    }).encode("utf-8")
+    return b"".join([struct.pack(">I", len(header)), header] + [data for _, data in tiles])
+
+
+class Bandwidth:
+    """Token bucket enforcing a hard bytes-per-second cap."""
+
+    def __init__(self, max_kbps, burst_seconds=2):
+        self.rate = max_kbps * 1024 / 8
+        self.capacity = self.rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def available(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def spend(self, size):
+        self.tokens -= size
+
+
+def select_tiles(frame, rects, quality, budget, force_first=False):
+    """
+    Encode changed tiles until the byte budget is used up.
+    Tiles left out stay "changed" and go out in a later frame. With
+    force_first, one tile is sent even if it alone exceeds the budget.
+    """
+    selected, used = [], 0
+    for rect in rects:
+        data = encode_tile(frame, rect, quality)
+        if used + len(data) > budget and not (force_first and not selected):
+            break
+        selected.append((rect, data))
+        used += len(data)
+    return selected, used
+
+
+def grab_frame(options):
+    """Capture the screen as an RGB NumPy array, downscaled to max_dimension."""
+    from PIL import ImageGrab
+    from screenshot import _bbox
+
+    image = ImageGrab.grab(bbox=_bbox(options), all_screens=True)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    max_dim = options.get("max_dimension")
+    if max_dim and max(image.size) > max_dim:
+        image.thumbnail((max_dim, max_dim))
+    return np.asarray(image)
+
+
+def run_live_view(command_id, options, is_cancelled, grab=grab_frame, send=None):
+    """
+    Stream changed tiles until the duration elapses, the job is cancelled
+    or the server asks to stop. Returns a summary dict.
+    """
+    if send is None:
+        from http_client import get_client
+
+        def send(body):
+            resp = get_client().post(
+                f"/api/agent/live/{command_id}",
+                data=body,
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}")
+            return bool(resp.json().get("stop"))
+
+    differ = TileDiffer(options["tile"])
+    bandwidth = Bandwidth(options["max_kbps"])
+    interval = 1.0 / options["fps"]
+    started = time.monotonic()
+    deadline = started + options["duration"]
+    frames = sent_bytes = seq = 0
+    reason = "timeout"
+
+    while time.monotonic() < deadline:
+        if is_cancelled():
+            reason = "cancelled"
+            break
+        tick = time.monotonic()
+
+        frame = grab(options)
+        height, width = frame.shape[:2]
+        rects = tile_rects(differ.changed(frame), options["tile"], width, height)
+        if rects:
+            budget = bandwidth.available()
+            # With a full bucket, always make progress; the debt delays later frames
+            tiles, used = select_tiles(
+                frame, rects, options["quality"], budget,
+                force_first=budget >= bandwidth.capacity,
+            )
+            if tiles:
+                body = build_frame(seq, width, height, tiles)
+                if send(body):
+                    reason = "stopped by server"
+                    break
+                bandwidth.spend(len(body))
+                differ.commit(frame, [rect for rect, _ in tiles])
+                sent_bytes += len(body)
+                frames += 1
+                seq += 1
+
+        time.sleep(max(0.0, interval - (time.monotonic() - tick)))
+
+    elapsed = time.monotonic() - started
+    return {
+        "reason": reason,
+        "frames": frames,
+        "bytes": sent_bytes,
+        "seconds": round(elapsed, 1),
+    }
+
+
+def _benchmark(width=1920, height=1080, frames=50, tile=64):
+    """Time tile diffing and encoding on synthetic frames (no display needed)."""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    differ = TileDiffer(tile)
+    differ.commit(base, [(0, 0, width, height)])
+
+    diff_time = encode_time = 0.0
+    changed_tiles = encoded_bytes = 0
+    frame = base.copy()
+    for i in range(frames):
+        # Simulate typing/cursor movement: a few small regions change
+        for _ in range(3):
+            y = int(rng.integers(0, height - 40))
+            x = int(rng.integers(0, width - 200))
+            frame[y:y + 40, x:x + 200] = rng.integers(0, 256, 3, dtype=np.uint8)
+
+        start = time.perf_counter()
+        rects = tile_rects(differ.changed(frame), tile, width, height)
+        diff_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        tiles, used = select_tiles(frame, rects, 50, float("inf"))
+        encode_time += time.perf_counter() - start
+
+        differ.commit(frame, rects)
+        changed_tiles += len(rects)
+        encoded_bytes += len(build_frame(i, width, height, tiles))
+
+    total_tiles = -(-width // tile) * -(-height // tile)
+    print(f"{frames} frames {width}x{height}, tile {tile} ({total_tiles} tiles/frame)")
+    print(f"  diff:   {diff_time / frames * 1000:7.2f} ms/frame")
+    print(f"  encode: {encode_time / frames * 1000:7.2f} ms/frame "
+          f"({changed_tiles / frames:.1f} changed tiles/frame)")
+    print(f"  wire:   {encoded_bytes / frames / 1024:7.1f} KB/frame")
+
+
+if __name__ == "__main__":
+    _benchmark()
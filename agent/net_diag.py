@@ -0,0 +1,343 @@
+"""
+IT Monitor Agent - Network Diagnostics
+Probes many hosts/ports concurrently from one asyncio loop - TCP connect
+and, where permitted, ICMP echo - and returns per-target RTT min/avg/max,
+loss and jitter.
+
+Run directly to probe targets from the command line:
+    python net_diag.py 10.0.0.1 printer1:9100 server:445
+"""
+
+import sys
+import time
+import struct
+import socket
+import random
+import asyncio
+import logging
+import ipaddress
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("ITMonitorAgent")
+
+DEFAULT_OPTIONS = {
+    "targets": [],
+    "ports": [],
+    "count": 4,
+    "timeout": 1.0,
+    "interval": 0.2,
+    "concurrency": 100,
+    "method": "auto",
+}
+
+MAX_TARGETS = 256
+
+
+def parse_options(params):
+    """Merge diagnostics params (dict or JSON string) over the defaults."""
+    import json
+
+    options = dict(DEFAULT_OPTIONS)
+    if params:
+        p = json.loads(params) if isinstance(params, str) else params
+        options.update({k: v for k, v in p.items() if k in DEFAULT_OPTIONS and v is not None})
+
+    targets = options["targets"]
+    if isinstance(targets, str):
+        targets = targets.replace(",", " ").split()
+    options["targets"] = [str(t).strip() for t in targets if str(t).strip()]
+    options["ports"] = [int(p) for p in options["ports"]]
+    options["count"] = max(1, min(int(options["count"]), 20))
+    options["timeout"] = max(0.1, min(float(options["timeout"]), 10))
+    options["interval"] = max(0.0, min(float(options["interval"]), 5))
+    options["concurrency"] = max(1, min(int(options["concurrency"]), 500))
+    if options["method"] not in ("auto", "tcp", "icmp"):
+        raise ValueError(f"Unknown method: {options['method']}")
+    return options
+
+
+def expand_targets(options):
+    """
+    (host, port) pairs to probe. "host:port" entries ("[addr]:port" for
+    IPv6) are probed over TCP; bare hosts and addresses get each of
+    options["ports"], or ICMP (port None) if none.
+    """
+    pairs = []
+    for target in options["targets"]:
+        try:
+            # A bare address, e.g. 2001:db8::80 (never read as a port)
+            target = str(ipaddress.ip_address(target.strip("[]")))
+            host, sep, port = "", "", ""
+        except ValueError:
+            host, sep, port = target.rpartition(":")
+        # Unbracketed colons in the host part mean a malformed IPv6 target
+        if ":" in host and not (host.startswith("[") and host.endswith("]")):
+            sep = ""
+        if sep and port.isdigit() and host:
+            pairs.append((host.strip("[]"), int(port)))
+        elif options["ports"] and options["method"] != "icmp":
+            pairs.extend((target, p) for p in options["ports"])
+        else:
+            pairs.append((target, None))
+    return pairs[:MAX_TARGETS]
+
+
+# === ICMP ===
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident, seq):
+    payload = b"itmonitor-probe"
+    header = struct.pack("!BBHHH", 8, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack("!BBHHH", 8, 0, checksum, ident, seq) + payload
+
+
+def _open_icmp_socket():
+    """Unprivileged ICMP datagram socket if allowed, else a raw socket (admin)."""
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            sock.setblocking(False)
+            return sock, kind == socket.SOCK_RAW
+        except OSError:
+            continue
+    return None, False
+
+
+def icmp_available():
+    """Whether this process may send ICMP echo requests."""
+    if sys.platform == "win32":
+        return True  # IcmpSendEcho needs no privileges
+    sock, _ = _open_icmp_socket()
+    if sock:
+        sock.close()
+        return True
+    return False
+
+
+def _win_icmp_echo(ip, timeout):
+    """Blocking ICMP echo via IcmpSendEcho (Windows). Returns RTT in ms or None."""
+    import ctypes
+    from ctypes import wintypes
+
+    class IP_OPTION_INFORMATION(ctypes.Structure):
+        _fields_ = [("Ttl", ctypes.c_ubyte), ("Tos", ctypes.c_ubyte),
+                    ("Flags", ctypes.c_ubyte), ("OptionsSize", ctypes.c_ubyte),
+                    ("OptionsData", ctypes.c_void_p)]
+
+    class ICMP_ECHO_REPLY(ctypes.Structure):
+        _fields_ = [("Address", wintypes.ULONG), ("Status", wintypes.ULONG),
+                    ("RoundTripTime", wintypes.ULONG), ("DataSize", wintypes.USHORT),
+                    ("Reserved", wintypes.USHORT), ("Data", ctypes.c_void_p),
+                    ("Options", IP_OPTION_INFORMATION)]
+
+    iphlpapi = ctypes.windll.iphlpapi
+    iphlpapi.IcmpCreateFile.restype = wintypes.HANDLE
+    iphlpapi.IcmpSendEcho.argtypes = [
+        wintypes.HANDLE, wintypes.ULONG, ctypes.c_void_p, wintypes.WORD,
+        ctypes.c_void_p, ctypes.c_void_p, wintypes.DWORD, wintypes.DWORD,
+    ]
+    iphlpapi.IcmpCloseHandle.argtypes = [wintypes.HANDLE]
+
+    payload = b"itmonitor-probe"
+    reply = ctypes.create_string_buffer(ctypes.sizeof(ICMP_ECHO_REPLY) + len(payload) + 8)
+    address = struct.unpack("=L", socket.inet_aton(ip))[0]
+    handle = iphlpapi.IcmpCreateFile()
+    try:
+        start = time.perf_counter()
+        count = iphlpapi.IcmpSendEcho(
+            handle, address, payload, len(payload), None,
+            reply, ctypes.sizeof(reply), int(timeout * 1000),
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if count and ICMP_ECHO_REPLY.from_buffer(reply).Status == 0:
+            return elapsed
+        return None
+    finally:
+        iphlpapi.IcmpCloseHandle(handle)
+
+
+async def _icmp_echo(ip, seq, timeout):
+    """One ICMP echo. Returns RTT in ms, or None on timeout."""
+    loop = asyncio.get_running_loop()
+    if sys.platform == "win32":
+        # Runs on the loop's executor, sized to the concurrency in _run
+        return await loop.run_in_executor(None, _win_icmp_echo, ip, timeout)
+
+    sock, raw = _open_icmp_socket()
+    if sock is None:
+        raise PermissionError("ICMP not permitted")
+    ident = random.randint(1, 0xFFFF)
+    try:
+        start = time.perf_counter()
+        await loop.sock_sendto(sock, _echo_request(ident, seq), (ip, 0))
+        deadline = start + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            try:
+                data = await asyncio.wait_for(loop.sock_recv(sock, 1024), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if raw:
+                data = data[(data[0] & 0x0F) * 4:]  # strip the IP header
+            if len(data) < 8:
+                continue
+            kind, _, _, reply_id, reply_seq = struct.unpack("!BBHHH", data[:8])
+            # Datagram sockets get the id rewritten by the kernel; raw sockets see
+            # every reply on the host, so match the id too
+            if kind == 0 and reply_seq == seq and (not raw or reply_id == ident):
+                return (time.perf_counter() - start) * 1000
+    finally:
+        sock.close()
+
+
+# === TCP ===
+
+async def _tcp_connect(ip, port, timeout):
+    """One TCP connect. Returns RTT in ms; None on timeout; raises on refusal."""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except asyncio.TimeoutError:
+        return None
+    elapsed = (time.perf_counter() - start) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return elapsed
+
+
+# === Probing ===
+
+def summarize(target, method, rtts, sent, error=None):
+    """Per-target statistics from a list of RTTs (ms)."""
+    result = {
+        "target": target,
+        "method": method,
+        "sent": sent,
+        "received": len(rtts),
+        "loss_pct": round((sent - len(rtts)) / sent * 100, 1) if sent else 100.0,
+        "rtt_min": None,
+        "rtt_avg": None,
+        "rtt_max": None,
+        "jitter": None,
+    }
+    if rtts:
+        result["rtt_min"] = round(min(rtts), 2)
+        result["rtt_avg"] = round(statistics.fmean(rtts), 2)
+        result["rtt_max"] = round(max(rtts), 2)
+        # Mean difference between consecutive samples
+        diffs = [abs(b - a) for a, b in zip(rtts, rtts[1:])]
+        result["jitter"] = round(statistics.fmean(diffs), 2) if diffs else 0.0
+    if error:
+        result["error"] = error
+    return result
+
+
+async def _probe(host, port, options, icmp_ok, semaphore, cancel):
+    shown = f"[{host}]" if ":" in host else host
+    target = f"{shown}:{port}" if port else host
+    method = "tcp" if port else "icmp"
+    if method == "icmp" and not icmp_ok:
+        return summarize(target, method, [], 0, "ICMP not permitted; give a port for a TCP probe")
+
+    loop = asyncio.get_running_loop()
+    try:
+        # ICMP probing is IPv4 only; TCP takes whatever the name resolves to
+        family = socket.AF_UNSPEC if port else socket.AF_INET
+        infos = await loop.getaddrinfo(host, port or 0, family=family, type=socket.SOCK_STREAM)
+        ip = infos[0][4][0]
+    except OSError as e:
+        return summarize(target, method, [], 0, f"DNS: {e}")
+
+    rtts, sent, error = [], 0, None
+    for seq in range(options["count"]):
+        if cancel and cancel.is_set():
+            break
+        if seq:
+            await asyncio.sleep(options["interval"])
+        async with semaphore:
+            sent += 1
+            try:
+                if method == "tcp":
+                    rtt = await _tcp_connect(ip, port, options["timeout"])
+                else:
+                    rtt = await _icmp_echo(ip, seq + 1, options["timeout"])
+            except OSError as e:
+                rtt, error = None, type(e).__name__
+        if rtt is None:
+            error = error or "timeout"
+        else:
+            rtts.append(rtt)
+
+    result = summarize(target, method, rtts, sent, error if not rtts else None)
+    result["address"] = ip
+    return result
+
+
+async def _run(options, cancel):
+    # Blocking calls (IcmpSendEcho on Windows, getaddrinfo) get one thread
+    # per concurrent probe instead of sharing the small default pool;
+    # asyncio.run shuts it down with the loop
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+        max_workers=options["concurrency"], thread_name_prefix="net-diag",
+    ))
+    semaphore = asyncio.Semaphore(options["concurrency"])
+    icmp_ok = options["method"] != "tcp" and icmp_available()
+    pairs = expand_targets(options)
+    return await asyncio.gather(*(
+        _probe(host, port, options, icmp_ok, semaphore, cancel) for host, port in pairs
+    ))
+
+
+def run_diagnostics(options, cancel=None):
+    """Probe all targets concurrently. Returns a summary dict."""
+    started = time.perf_counter()
+    results = asyncio.run(_run(options, cancel))
+    return {
+        "targets": len(results),
+        "reachable": sum(1 for r in results if r["received"]),
+        "seconds": round(time.perf_counter() - started, 2),
+        "results": results,
+    }
+
+
+def format_report(summary):
+    """Human-readable table of a run_diagnostics() summary."""
+    lines = [
+        f"{summary['reachable']}/{summary['targets']} reachable ({summary['seconds']}s)",
+        f"{'target':<32} {'method':<5} {'loss':>6} {'min':>8} {'avg':>8} {'max':>8} {'jitter':>8}",
+    ]
+
+    def _ms(v):
+        return f"{v:.1f}" if v is not None else "-"
+
+    for r in summary["results"]:
+        line = (
+            f"{r['target'][:32]:<32} {r['method']:<5} {r['loss_pct']:>5.0f}% "
+            f"{_ms(r['rtt_min']):>8} {_ms(r['rtt_avg']):>8} {_ms(r['rtt_max']):>8} {_ms(r['jitter']):>8}"
+        )
+        if r.get("error"):
+            line += f"  {r['error']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python net_diag.py <host[:port]> [...]")
+        sys.exit(1)
+    print(format_report(run_diagnostics(parse_options({"targets": sys.argv[1:]}))))
@@ -4,14 +4,34 @@ Executes commands received from the IT Monitor server.
 """
 
 import os
+import sys
 import subprocess
 import logging
 import time
-import shutil
 import signal
+import threading
+from collections import deque
 
 logger = logging.getLogger("ITMonitorAgent")
 
+# Per-thread job context set by the command executor: "cancel" is a
+# threading.Event that stops the running command when set, "output" is an
+# optional sink with write(text) that receives output as it is produced,
+# "command_id" is the server id of the command being run
+_job_context = threading.local()
+
+
+def set_job_context(cancel_event=None, output=None, command_id=None):
+    """Attach a cancellation event and output sink to commands run on the current thread."""
+    _job_context.cancel = cancel_event
+    _job_context.output = output
+    _job_context.command_id = command_id
+
+
+def _is_cancelled():
+    cancel = getattr(_job_context, "cancel", None)
+    return bool(cancel and cancel.is_set())
+
 # Allowed actions and their handlers
 ALLOWED_ACTIONS = [
     "restart",
@@ -32,6 +52,10 @@ ALLOWED_ACTIONS = [
     "service_stop",
     "service_restart",
     "screenshot",
+    "live_view",
+    "disk_usage",
+    "net_diag",
+    "refresh_licenses",
 ]
 
 
@@ -53,27 +77,103 @@ def execute_command(action, params=None):
         return {"success": False, "output": f"Error: {str(e)[:500]}"}
 
 
+def _kill_tree(proc):
+    """Kill a process and all of its children."""
+    try:
+        if sys.platform == "win32":
+            subprocess.run(
+                ["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                capture_output=True, timeout=15,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except Exception:
+        pass
+    try:
+        proc.kill()
+    except Exception:
+        pass
+
+
+def _wait_process(proc, timeout):
+    """
+    Wait for a process, killing its tree on timeout or cancellation.
+    Returns None when it exited, else the message to report.
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            proc.wait(timeout=0.5)
+            return None
+        except subprocess.TimeoutExpired:
+            if _is_cancelled():
+                _kill_tree(proc)
+                return "Command cancelled"
+            if time.time() >= deadline:
+                _kill_tree(proc)
+                return "Command timed out"
+
+
 def _run_cmd(cmd, timeout=60):
-    """Run a system command and return output."""
+    """
+    Run a system command and return output.
+    On timeout or cancellation the whole process tree is killed. When the
+    executor attached an output sink, output is streamed to it line by line
+    and the last 2000 characters are returned.
+    """
+    sink = getattr(_job_context, "output", None)
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if sink else subprocess.PIPE,
+            # Nothing to answer prompts (e.g. Read-Host) with
+            stdin=subprocess.DEVNULL,
             shell=True,
             encoding="utf-8",
             errors="replace",
+            # Own process group on POSIX so the whole tree can be killed
+            start_new_session=(sys.platform != "win32"),
         )
-        output = result.stdout.strip()
-        if result.stderr:
-            output += "\n" + result.stderr.strip()
-        return output[:2000]
-    except subprocess.TimeoutExpired:
-        return "Command timed out"
     except Exception as e:
         return f"Error: {str(e)[:500]}"
 
+    if sink:
+        tail = deque(maxlen=200)
+
+        def _pump():
+            for line in proc.stdout:
+                sink.write(line)
+                tail.append(line)
+
+        reader = threading.Thread(target=_pump, name="cmd-output", daemon=True)
+        reader.start()
+        stopped = _wait_process(proc, timeout)
+        reader.join(timeout=5)
+        output = "".join(tail).strip()[-2000:]
+        if stopped:
+            sink.write(f"\n[{stopped}]\n")
+            return f"{output}\n{stopped}".strip()
+        return output
+
+    stdout_stderr = {}
+
+    def _collect():
+        stdout_stderr["out"], stdout_stderr["err"] = proc.communicate()
+
+    collector = threading.Thread(target=_collect, name="cmd-output", daemon=True)
+    collector.start()
+    stopped = _wait_process(proc, timeout)
+    collector.join(timeout=5)
+    if stopped:
+        return stopped
+
+    output = (stdout_stderr.get("out") or "").strip()
+    if stdout_stderr.get("err"):
+        output += "\n" + stdout_stderr["err"].strip()
+    return output[:2000]
+
 
 # === Action Handlers ===
 
@@ -125,49 +225,38 @@ def action_logoff(params):
 
 
 def action_clear_temp(params):
-    """Clear temporary files."""
-    logger.info("Remote action: CLEAR TEMP")
-    cleared = 0
-    errors = 0
-    total_size = 0
-
-    temp_dirs = [
-        os.environ.get("TEMP", ""),
-        os.environ.get("TMP", ""),
-        os.path.join(os.environ.get("SYSTEMROOT", "C:\\Windows"), "Temp"),
-    ]
-
-    for temp_dir in temp_dirs:
-        if not temp_dir or not os.path.exists(temp_dir):
-            continue
-        try:
-            for item in os.listdir(temp_dir):
-                item_path = os.path.join(temp_dir, item)
-                try:
-                    if os.path.isfile(item_path):
-                        total_size += os.path.getsize(item_path)
-                        os.remove(item_path)
-                        cleared += 1
-                    elif os.path.isdir(item_path):
-                        size = sum(
-                            os.path.getsize(os.path.join(dp, f))
-                            for dp, dn, fn in os.walk(item_path)
-                            for f in fn
-                        )
-                        total_size += size
-                        shutil.rmtree(item_path, ignore_errors=True)
-                        cleared += 1
-                except PermissionError:
-                    errors += 1
-                except Exception:
-                    errors += 1
-        except Exception:
-            pass
+    """
+    Clear temporary files.
+    params (optional): dry_run (bool), older_than_days (int).
+    """
+    import json
+    try:
+        p = json.loads(params) if isinstance(params, str) else (params or {})
+        dry_run = bool(p.get("dry_run", False))
+        older_than_days = p.get("older_than_days")
+        older_than_days = float(older_than_days) if older_than_days else None
+    except Exception:
+        return {"success": False, "output": "Invalid params format"}
+
+    from temp_cleaner import clean_temp
+
+    logger.info(f"Remote action: CLEAR TEMP (dry_run={dry_run}, older_than_days={older_than_days})")
+    summary = clean_temp(
+        older_than_days=older_than_days,
+        dry_run=dry_run,
+        cancel=getattr(_job_context, "cancel", None),
+    )
 
-    size_mb = total_size / (1024 * 1024)
+    size_mb = summary["bytes"] / (1024 * 1024)
+    errors = sum(summary["errors"].values())
+    verb = "Would clear" if dry_run else "Cleared"
     return {
         "success": True,
-        "output": f"Cleared {cleared} items ({size_mb:.1f} MB). {errors} items skipped (in use).",
+        "output": (
+            f"{verb} {summary['files']} files ({size_mb:.1f} MB) in {summary['seconds']}s. "
+            f"{errors} items skipped (in use).\n{json.dumps(summary, indent=2)}"
+        ),
+        "summary": summary,
     }
 
 
@@ -218,16 +307,21 @@ def action_run_powershell(params):
     if len(script) > 2000:
         return {"success": False, "output": "Script too long (max 2000 chars)"}
 
+    import base64
+
     logger.info(f"Remote action: RUN POWERSHELL ({len(script)} chars)")
+    # A fresh process per script: exit, stdin reads and session changes
+    # stay with it. -EncodedCommand avoids quoting the script for the shell
+    encoded = base64.b64encode(script.encode("utf-16-le")).decode("ascii")
     output = _run_cmd(
-        f'powershell -ExecutionPolicy Bypass -Command "{script}"',
+        f"powershell -NoProfile -NonInteractive -ExecutionPolicy Bypass -EncodedCommand {encoded}",
         timeout=120,
     )
     return {"success": True, "output": output}
 
 
 def action_ping(params):
-    """Ping a host."""
+    """Ping a host (in-process ICMP, or TCP when given host:port)."""
     if not params:
         return {"success": False, "output": "Missing params: need 'host'"}
 
@@ -237,15 +331,35 @@ def action_ping(params):
     except Exception:
         return {"success": False, "output": "Invalid params format"}
 
-    host = p.get("host", "8.8.8.8")
+    host = str(p.get("host", "8.8.8.8")).strip()
     count = min(int(p.get("count", 4)), 10)
 
-    # Sanitize host
-    safe_host = host.replace('"', '').replace("&", "").replace("|", "").replace(";", "")
+    logger.info(f"Remote action: PING {host}")
+    return action_net_diag({"targets": [host], "count": count})
 
-    logger.info(f"Remote action: PING {safe_host}")
-    output = _run_cmd(f"ping -n {count} {safe_host}", timeout=30)
-    return {"success": True, "output": output}
+
+def action_net_diag(params):
+    """
+    Probe many hosts/ports concurrently.
+    params: targets (list of "host" or "host:port"), ports, count, timeout,
+    interval, concurrency, method (auto/tcp/icmp).
+    """
+    import json
+    try:
+        from net_diag import parse_options, run_diagnostics, format_report
+        options = parse_options(params)
+    except Exception:
+        return {"success": False, "output": "Invalid params format"}
+    if not options["targets"]:
+        return {"success": False, "output": "Missing params: need 'targets'"}
+
+    logger.info(f"Remote action: NET DIAG {len(options['targets'])} target(s)")
+    summary = run_diagnostics(options, cancel=getattr(_job_context, "cancel", None))
+    report = format_report(summary)
+    sink = getattr(_job_context, "output", None)
+    if sink:
+        sink.write(f"{report}\n\n{json.dumps(summary, indent=2)}\n")
+    return {"success": summary["reachable"] > 0, "output": report, "summary": summary}
 
 
 def action_traceroute(params):
@@ -366,29 +480,23 @@ def action_service_restart(params):
 
 
 def action_screenshot(params):
-    """Capture screenshot and return as base64."""
+    """
+    Capture a screenshot.
+    params (optional): format (jpeg/webp/png), quality, max_dimension,
+    monitor ("all" or index), region [x, y, width, height].
+    The encoded image is returned as an "attachment" that the executor
+    uploads as a binary body.
+    """
     try:
-        import io
-        import base64
-        from PIL import ImageGrab
-        
-        # Capture all screens
-        screenshot = ImageGrab.grab(all_screens=True)
-        
-        # Convert to bytes
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG')
-        img_bytes = buffer.getvalue()
-        
-        # Encode to base64
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-        
-        return {
-            "success": True,
-            "output": "Screenshot captured successfully",
-            "screenshot": img_base64
-        }
-        
+        from screenshot import parse_options, capture
+        options = parse_options(params)
+    except ValueError as e:
+        return {"success": False, "output": f"Invalid params: {e}"}
+    except Exception:
+        return {"success": False, "output": "Invalid params format"}
+
+    try:
+        fileobj, info = capture(options)
     except ImportError:
         return {
             "success": False,
@@ -400,6 +508,108 @@ def action_screenshot(params):
             "output": f"Screenshot failed: {str(e)}"
         }
 
+    return {
+        "success": True,
+        "output": (
+            f"Screenshot captured: {info['width']}x{info['height']} "
+            f"{info['format']}, {info['size'] // 1024} KB"
+        ),
+        "attachment": (fileobj, info["content_type"]),
+    }
+
+
+def action_live_view(params):
+    """
+    Stream the screen as changed tiles until the duration elapses or the
+    command is cancelled.
+    params (optional): fps, duration (seconds), max_kbps, tile, quality,
+    max_dimension, monitor.
+    """
+    command_id = getattr(_job_context, "command_id", None)
+    if not command_id:
+        return {"success": False, "output": "Live view needs a command id"}
+
+    try:
+        from live_view import parse_options, run_live_view
+        options = parse_options(params)
+    except ImportError:
+        return {
+            "success": False,
+            "output": "NumPy/Pillow not installed. Install with: pip install numpy pillow"
+        }
+    except Exception:
+        return {"success": False, "output": "Invalid params format"}
+
+    logger.info(f"Remote action: LIVE VIEW ({options['fps']} fps, {options['duration']}s)")
+    try:
+        summary = run_live_view(command_id, options, _is_cancelled)
+    except Exception as e:
+        return {"success": False, "output": f"Live view failed: {str(e)[:500]}"}
+
+    return {
+        "success": True,
+        "output": (
+            f"Live view ended ({summary['reason']}) after {summary['seconds']}s: "
+            f"{summary['frames']} frames, {summary['bytes'] // 1024} KB sent"
+        ),
+    }
+
+
+def action_disk_usage(params):
+    """
+    Report the largest directories and files on a volume or path.
+    params (optional): path, top, depth, time_budget (seconds), cache_ttl (seconds).
+    """
+    import json
+    try:
+        from disk_usage import parse_options, analyze, format_report
+        options = parse_options(params)
+    except Exception:
+        return {"success": False, "output": "Invalid params format"}
+
+    logger.info(f"Remote action: DISK USAGE {options['path']}")
+    try:
+        summary = analyze(options)
+    except ValueError as e:
+        return {"success": False, "output": str(e)}
+    except Exception as e:
+        return {"success": False, "output": f"Disk usage scan failed: {str(e)[:500]}"}
+
+    report = format_report(summary)
+    # The result is truncated server-side; the full report goes to the output stream
+    sink = getattr(_job_context, "output", None)
+    if sink:
+        sink.write(f"{report}\n\n{json.dumps(summary, indent=2)}\n")
+    return {"success": True, "output": report, "summary": summary}
+
+
+def action_refresh_licenses(params):
+    """
+    Re-read Windows and Office license status now, bypassing the fact cache.
+    The license collectors are invalidated so the next report carries the
+    new values.
+    """
+    from collectors import collect_windows_license, collect_office_license
+    from collection import get_engine
+
+    logger.info("Remote action: REFRESH LICENSES")
+    windows = collect_windows_license(force=True)["windows_license"]
+    office = collect_office_license(force=True)["office_license"]
+    engine = get_engine()
+    if engine:
+        engine.invalidate("Windows License")
+        engine.invalidate("Office License")
+
+    lines = []
+    if windows:
+        lines.append(f"Windows: {windows.get('edition', '')} - {windows.get('status', '')}")
+    if office.get("installed"):
+        for product in office.get("products") or [{"name": office.get("version", ""), "status": "Unknown"}]:
+            lines.append(f"Office: {product.get('name', '')} - {product.get('status', '')}")
+    elif office:
+        lines.append("Office: not installed")
+    return {"success": True, "output": "\n".join(lines) or "License information is only available on Windows"}
+
 
 # Handler map
 HANDLERS = {
@@ -421,4 +631,8 @@ HANDLERS = {
     "service_stop": action_service_stop,
     "service_restart": action_service_restart,
     "screenshot": action_screenshot,
+    "live_view": action_live_view,
+    "disk_usage": action_disk_usage,
+    "net_diag": action_net_diag,
+    "refresh_licenses": action_refresh_licenses,
 }
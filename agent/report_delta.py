@@ -0,0 +1,77 @@
+"""
+IT Monitor Agent - Delta Reports
+Sends only report sections that changed since the last snapshot the
+server acknowledged; unchanged sections are sent as hashes and carried
+forward by the server.
+"""
+
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger("ITMonitorAgent")
+
+# Bulky, slow-changing report sections eligible for delta encoding
+DELTA_SECTIONS = [
+    "os_info",
+    "disk_details",
+    "network_info",
+    "software",
+    "antivirus_status",
+    "printers",
+    "windows_license",
+    "office_license",
+    "startup_programs",
+    "shared_folders",
+    "usb_devices",
+    "windows_update",
+    "services",
+]
+
+
+def section_hash(value):
+    """Content hash of a report section."""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ReportDelta:
+    """Tracks acknowledged section hashes and builds delta payloads."""
+
+    def __init__(self, sections=None):
+        self.sections = sections or DELTA_SECTIONS
+        self._acked = {}
+
+    def encode(self, data):
+        """
+        Build the payload to send.
+        Returns (payload, hashes) - pass hashes to acknowledge() once the
+        server accepted the report.
+        """
+        payload = dict(data)
+        hashes = {}
+        unchanged = []
+
+        for key in self.sections:
+            if key not in data:
+                continue
+            digest = section_hash(data[key])
+            hashes[key] = digest
+            if self._acked.get(key) == digest:
+                del payload[key]
+                unchanged.append(key)
+
+        if unchanged:
+            payload["unchanged_sections"] = unchanged
+        payload["section_hashes"] = hashes
+        return payload, hashes
+
+    def acknowledge(self, hashes):
+        """Record the sections the server now holds."""
+        self._acked.update(hashes)
+
+    def reset(self):
+        """Forget acknowledged state so the next report is sent in full."""
+        if self._acked:
+            logger.info("Delta state reset - next report will be sent in full")
+        self._acked = {}
@@ -0,0 +1,166 @@
+"""
+IT Monitor Agent - Screenshot Capture
+Captures the screen (all monitors, one monitor or a region), downscales it
+and encodes it straight into a spooled temp file, ready to be uploaded as a
+binary body instead of base64 inside the JSON command result.
+
+Run directly to compare formats on this machine:
+    python screenshot.py
+"""
+
+import sys
+import time
+import logging
+import tempfile
+
+logger = logging.getLogger("ITMonitorAgent")
+
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+
+DEFAULT_OPTIONS = {
+    "format": "jpeg",
+    "quality": 70,
+    "max_dimension": 1920,
+    "monitor": "all",
+    "region": None,
+}
+
+# Encoded images up to this size stay in memory, larger ones spill to disk
+SPOOL_SIZE = 2 * 1024 * 1024
+
+
+def parse_options(params):
+    """Merge screenshot params (dict or JSON string) over the defaults."""
+    import json
+
+    options = dict(DEFAULT_OPTIONS)
+    if params:
+        p = json.loads(params) if isinstance(params, str) else params
+        options.update({k: v for k, v in p.items() if k in DEFAULT_OPTIONS})
+
+    options["format"] = str(options["format"]).lower().replace("jpg", "jpeg")
+    if options["format"] not in FORMATS:
+        raise ValueError(f"Unsupported format: {options['format']}")
+    options["quality"] = max(1, min(int(options["quality"]), 100))
+    if options["max_dimension"]:
+        options["max_dimension"] = max(int(options["max_dimension"]), 64)
+    return options
+
+
+def list_monitors():
+    """Monitor rectangles (left, top, right, bottom) in virtual-screen coordinates."""
+    if sys.platform != "win32":
+        return []
+
+    import ctypes
+    from ctypes import wintypes
+
+    rects = []
+    callback_type = ctypes.WINFUNCTYPE(
+        ctypes.c_int, wintypes.HMONITOR, wintypes.HDC,
+        ctypes.POINTER(wintypes.RECT), wintypes.LPARAM,
+    )
+
+    def _callback(hmonitor, hdc, rect, lparam):
+        r = rect.contents
+        rects.append((r.left, r.top, r.right, r.bottom))
+        return 1
+
+    ctypes.windll.user32.EnumDisplayMonitors(None, None, callback_type(_callback), 0)
+    return rects
+
+
+def _bbox(options):
+    """Capture bounding box for the monitor/region options, or None for everything."""
+    region = options.get("region")
+    if region:
+        x, y, w, h = [int(v) for v in region]
+        return (x, y, x + w, y + h)
+
+    monitor = options.get("monitor", "all")
+    if monitor in (None, "all"):
+        return None
+    monitors = list_monitors()
+    index = int(monitor)
+    if not 0 <= index < len(monitors):
+        raise ValueError(f"Monitor {index} not found ({len(monitors)} available)")
+    return monitors[index]
+
+
+def capture(options):
+    """
+    Capture and encode a screenshot.
+    Returns (fileobj, info) - fileobj is positioned at 0 and holds the encoded
+    image; info has format, content_type, width, height and size.
+    """
+    from PIL import ImageGrab
+
+    image = ImageGrab.grab(bbox=_bbox(options), all_screens=True)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    max_dim = options.get("max_dimension")
+    if max_dim and max(image.size) > max_dim:
+        # In-place downscale; avoids holding a second full-size copy
+        image.thumbnail((max_dim, max_dim))
+
+    pil_format, content_type = FORMATS[options["format"]]
+    save_args = {}
+    if pil_format in ("JPEG", "WEBP"):
+        save_args["quality"] = options["quality"]
+    if pil_format == "PNG":
+        save_args["optimize"] = False
+
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    image.save(out, format=pil_format, **save_args)
+    size = out.tell()
+    width, height = image.size
+    image.close()
+    out.seek(0)
+
+    return out, {
+        "format": options["format"],
+        "content_type": content_type,
+        "width": width,
+        "height": height,
+        "size": size,
+    }
+
+
+def _benchmark():
+    """Print encoded size, time and memory growth per option set."""
+    import psutil
+
+    proc = psutil.Process()
+    cases = [
+        {"format": "png", "max_dimension": None},
+        {"format": "jpeg", "quality": 85, "max_dimension": None},
+        {"format": "jpeg", "quality": 70, "max_dimension": 1920},
+        {"format": "jpeg", "quality": 60, "max_dimension": 1280},
+        {"format": "webp", "quality": 70, "max_dimension": 1920},
+        {"format": "webp", "quality": 60, "max_dimension": 1280},
+    ]
+    for case in cases:
+        options = parse_options(case)
+        rss_before = proc.memory_info().rss
+        start = time.perf_counter()
+        out, info = capture(options)
+        elapsed = time.perf_counter() - start
+        mem = proc.memory_info()
+        peak = getattr(mem, "peak_wset", mem.rss)
+        out.close()
+        label = f"{options['format']} q{options['quality']} max={options['max_dimension']}"
+        print(
+            f"{label:>26}: {info['width']}x{info['height']}  "
+            f"{info['size'] / 1024:9.1f} KB  {elapsed * 1000:7.1f} ms  "
+            f"rss +{(mem.rss - rss_before) / 1048576:6.1f} MB  peak {peak / 1048576:6.1f} MB"
+        )
+    print(f"monitors: {list_monitors() or 'n/a'}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -14,6 +14,8 @@ import tempfile
 import subprocess
 import requests
 
+from http_client import get_client
+
 logger = logging.getLogger("ITMonitorAgent")
 
 VERSION_FILE = "version.json"
@@ -61,7 +63,7 @@ def check_for_update(server_url):
     """
     try:
         url = f"{server_url}/api/agent/version"
-        resp = requests.get(url, timeout=10)
+        resp = get_client().get(url, timeout=10)
         if resp.status_code != 200:
             logger.warning(f"Version check failed: HTTP {resp.status_code}")
             return None
@@ -112,7 +114,7 @@ def download_and_update(download_url, new_version):
         tmp_dir = tempfile.mkdtemp(prefix="itmon_update_")
         zip_path = os.path.join(tmp_dir, "update.zip")
 
-        resp = requests.get(download_url, timeout=120, stream=True)
+        resp = get_client().get(download_url, timeout=120, stream=True)
         resp.raise_for_status()
 
         with open(zip_path, "wb") as f:
@@ -3,12 +3,13 @@ Server Messages Handler
 Polls server for messages and displays them to user.
 """
 
-import requests
 import logging
 from typing import List, Dict
 import tkinter as tk
 from tkinter import messagebox
 
+from http_client import get_client
+
 logger = logging.getLogger("ITMonitorAgent")
 
 
@@ -18,13 +19,10 @@ def check_server_messages(server_url: str, api_key: str) -> List[Dict]:
     Returns list of messages.
     """
     try:
-        headers = {"x-api-key": api_key}
-        
         # Get messages (server resolves computerId from API key)
-        response = requests.get(
+        response = get_client().get(
             f"{server_url}/api/server-messages",
-            headers=headers,
-            timeout=10,
+            headers={"x-api-key": api_key},
         )
         
         if response.status_code == 200:
@@ -42,16 +40,10 @@ def check_server_messages(server_url: str, api_key: str) -> List[Dict]:
 def mark_message_delivered(server_url: str, api_key: str, message_id: str) -> bool:
     """Mark a message as delivered."""
     try:
-        headers = {
-            "x-api-key": api_key,
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.patch(
+        response = get_client().patch(
             f"{server_url}/api/server-messages/{message_id}",
-            headers=headers,
+            headers={"x-api-key": api_key},
             json={"delivered": True},
-            timeout=10,
         )
         
         return response.status_code == 200
@@ -79,24 +71,33 @@ def show_message_popup(message: str, title: str = "ຂໍ້ຄວາມຈາ
         logger.error(f"Error showing message popup: {e}")
 
 
-def process_server_messages(server_url: str, api_key: str):
+def show_server_messages(messages: List[Dict]) -> List[str]:
     """
-    Check for and process server messages.
-    Shows popup for each message and marks as delivered.
+    Show a popup for each message.
+    Returns ids of the messages that were shown.
     """
-    messages = check_server_messages(server_url, api_key)
-    
+    shown = []
     for msg in messages:
         message_id = msg.get("id")
         message_text = msg.get("message", "")
-        
+
         if message_text:
             logger.info(f"Received server message: {message_text[:50]}...")
             show_message_popup(message_text)
-            
-            # Mark as delivered
             if message_id:
-                if mark_message_delivered(server_url, api_key, message_id):
-                    logger.info(f"Message {message_id} marked as delivered")
-                else:
-                    logger.warning(f"Failed to mark message {message_id} as delivered")
+                shown.append(message_id)
+    return shown
+
+
+def process_server_messages(server_url: str, api_key: str):
+    """
+    Check for and process server messages.
+    Shows popup for each message and marks as delivered.
+    """
+    messages = check_server_messages(server_url, api_key)
+
+    for message_id in show_server_messages(messages):
+        if mark_message_delivered(server_url, api_key, message_id):
+            logger.info(f"Message {message_id} marked as delivered")
+        else:
+            logger.warning(f"Failed to mark message {message_id} as delivered")
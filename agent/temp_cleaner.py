@@ -0,0 +1,208 @@
+"""
+IT Monitor Agent - Temp Cleaner
+Deletes temporary files in a single scandir pass per root: each entry is
+sized and removed in the same traversal, and roots are cleaned in parallel.
+Supports a dry run and an "older than N days" filter.
+
+Run directly to benchmark on a synthetic tree:
+    python temp_cleaner.py [files]
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("ITMonitorAgent")
+
+
+def default_roots():
+    """Temp directories to clean, de-duplicated (TEMP and TMP are usually the same)."""
+    candidates = [
+        os.environ.get("TEMP", ""),
+        os.environ.get("TMP", ""),
+        os.path.join(os.environ.get("SYSTEMROOT", "C:\\Windows"), "Temp"),
+    ]
+    roots, seen = [], set()
+    for path in candidates:
+        if not path or not os.path.isdir(path):
+            continue
+        key = os.path.normcase(os.path.realpath(path))
+        if key not in seen:
+            seen.add(key)
+            roots.append(path)
+    return roots
+
+
+def _is_link(entry):
+    return entry.is_symlink() or getattr(entry, "is_junction", lambda: False)()
+
+
+def clean_tree(root, cutoff=None, dry_run=False, cancel=None):
+    """
+    Remove files under root (root itself is kept).
+    cutoff: only files last modified before this timestamp are removed.
+    Directories left empty are removed afterwards.
+    Returns {"bytes", "files", "dirs", "errors": Counter}.
+    """
+    stats = {"bytes": 0, "files": 0, "dirs": 0, "errors": Counter()}
+    stack = [root]
+    visited = []
+
+    while stack:
+        if cancel and cancel.is_set():
+            break
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if _is_link(entry):
+                            # Remove the link itself, never its target
+                            if not dry_run:
+                                # Windows directory links/junctions need rmdir
+                                if sys.platform == "win32" and entry.is_dir():
+                                    os.rmdir(entry.path)
+                                else:
+                                    os.unlink(entry.path)
+                            stats["files"] += 1
+                        elif entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            # On Windows stat() is served from the scandir data
+                            st = entry.stat(follow_symlinks=False)
+                            if cutoff is not None and st.st_mtime >= cutoff:
+                                continue
+                            if not dry_run:
+                                os.unlink(entry.path)
+                            stats["bytes"] += st.st_size
+                            stats["files"] += 1
+                    except FileNotFoundError:
+                        pass  # removed by someone else meanwhile
+                    except OSError as e:
+                        stats["errors"][type(e).__name__] += 1
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            stats["errors"][type(e).__name__] += 1
+            continue
+        if path != root:
+            visited.append(path)
+
+    # Deepest directories were visited last; remove the ones now empty
+    if not dry_run:
+        for path in reversed(visited):
+            try:
+                os.rmdir(path)
+                stats["dirs"] += 1
+            except OSError:
+                pass  # not empty (in use, or newer than the cutoff)
+
+    return stats
+
+
+def clean_temp(roots=None, older_than_days=None, dry_run=False, cancel=None):
+    """
+    Clean all temp roots in parallel.
+    Returns a summary dict: bytes, files, dirs, errors by type, per-root stats
+    and elapsed seconds.
+    """
+    roots = roots if roots is not None else default_roots()
+    cutoff = time.time() - older_than_days * 86400 if older_than_days else None
+    started = time.perf_counter()
+
+    summary = {
+        "dry_run": dry_run,
+        "older_than_days": older_than_days,
+        "bytes": 0,
+        "files": 0,
+        "dirs": 0,
+        "errors": Counter(),
+        "roots": {},
+    }
+    if roots:
+        with ThreadPoolExecutor(max_workers=len(roots), thread_name_prefix="clear-temp") as pool:
+            futures = {
+                root: pool.submit(clean_tree, root, cutoff, dry_run, cancel) for root in roots
+            }
+            for root, future in futures.items():
+                stats = future.result()
+                for key in ("bytes", "files", "dirs"):
+                    summary[key] += stats[key]
+                summary["errors"].update(stats["errors"])
+                summary["roots"][root] = {
+                    "bytes": stats["bytes"],
+                    "files": stats["files"],
+                    "errors": sum(stats["errors"].values()),
+                }
+
+    summary["errors"] = dict(summary["errors"])
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def _make_tree(base, files, dirs_per_level=10, file_size=512):
+    """Create a synthetic temp tree with the given number of files."""
+    payload = b"x" * file_size
+    per_dir = max(1, files // (dirs_per_level * dirs_per_level))
+    created = 0
+    for i in range(dirs_per_level):
+        for j in range(dirs_per_level):
+            d = os.path.join(base, f"d{i}", f"s{j}")
+            os.makedirs(d, exist_ok=True)
+            for k in range(per_dir):
+                if created >= files:
+                    return
+                with open(os.path.join(d, f"f{k}.tmp"), "wb") as f:
+                    f.write(payload)
+                created += 1
+
+
+def _legacy_clear(root):
+    """The previous two-pass approach (os.walk sizing, then rmtree), for comparison."""
+    total = 0
+    for item in os.listdir(root):
+        item_path = os.path.join(root, item)
+        if os.path.isfile(item_path):
+            total += os.path.getsize(item_path)
+            os.remove(item_path)
+        elif os.path.isdir(item_path):
+            total += sum(
+                os.path.getsize(os.path.join(dp, f))
+                for dp, dn, fn in os.walk(item_path)
+                for f in fn
+            )
+            shutil.rmtree(item_path, ignore_errors=True)
+    return total
+
+
+def _benchmark(files=20000):
+    """Time the legacy and single-pass cleaners on identical synthetic trees."""
+    with tempfile.TemporaryDirectory() as base:
+        legacy_root = os.path.join(base, "legacy")
+        _make_tree(legacy_root, files)
+        start = time.perf_counter()
+        legacy_bytes = _legacy_clear(legacy_root)
+        legacy_time = time.perf_counter() - start
+
+        roots = [os.path.join(base, f"root{i}") for i in range(3)]
+        for root in roots:
+            _make_tree(root, files // 3)
+        dry = clean_temp(roots, dry_run=True)
+        start = time.perf_counter()
+        summary = clean_temp(roots)
+        new_time = time.perf_counter() - start
+
+    print(f"{files} files")
+    print(f"  legacy two-pass:  {legacy_time:6.2f} s  ({legacy_bytes / 1048576:.1f} MB)")
+    print(f"  dry run:          {dry['seconds']:6.2f} s  ({dry['bytes'] / 1048576:.1f} MB)")
+    print(f"  single-pass (x3): {new_time:6.2f} s  ({summary['bytes'] / 1048576:.1f} MB, "
+          f"{summary['files']} files, {summary['dirs']} dirs, errors {summary['errors']})")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
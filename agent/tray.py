@@ -302,7 +302,7 @@ if ($result -eq [System.Windows.Forms.DialogResult]::OK) {{
 
                 logger.info(f"Sending message: '{message[:50]}...'")
 
-                import requests
+                from http_client import get_client
                 url = f"{self.config.get('server_url', 'http://localhost:3000')}/api/agent/message"
                 payload = {
                     "hostname": socket.gethostname(),
@@ -317,7 +317,7 @@ if ($result -eq [System.Windows.Forms.DialogResult]::OK) {{
                 logger.info(f"Sending to {url}")
 
                 try:
-                    resp = requests.post(url, json=payload, headers=headers, timeout=10)
+                    resp = get_client().post(url, json=payload, headers=headers)
                     logger.info(f"Server response: {resp.status_code}")
                     if resp.status_code == 200:
                         ctypes.windll.user32.MessageBoxW(
@@ -7,12 +7,13 @@ import os
 import sys
 import json
 import logging
-import requests
 import subprocess
 import tempfile
 import shutil
 from pathlib import Path
 
+from http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -65,7 +66,7 @@ def check_for_updates(server_url):
     try:
         # Get latest release from GitHub API
         api_url = "https://api.github.com/repos/Kittisayst/it-help/releases/latest"
-        response = requests.get(api_url, timeout=10)
+        response = get_client().get(api_url, timeout=10)
         
         if response.status_code != 200:
             logger.warning(f"Failed to check updates: HTTP {response.status_code}")
@@ -113,7 +114,7 @@ def download_update(download_url, is_installer=False):
     try:
         logger.info(f"Downloading update from {download_url}")
         
-        response = requests.get(download_url, stream=True, timeout=60)
+        response = get_client().get(download_url, stream=True, timeout=60)
         response.raise_for_status()
         
         # Create temp file with appropriate extension
@@ -0,0 +1,300 @@
+"""
+IT Monitor Agent - Shared WMI Access
+One dedicated COM-initialized thread owns a cached WMI connection per
+namespace and runs every collector's WQL on it, instead of each collector
+paying for a fresh wmi.WMI() connect (hundreds of ms, and leaked handles on
+some Windows builds) every cycle.
+
+Collectors run concurrently, so their queries arrive together: the worker
+drains everything queued and runs it back to back in one visit. batch()
+submits several queries at once explicitly. Per-query timings are kept in
+stats() and slow queries are logged.
+
+Rows are returned as plain dicts, since COM objects must not leave the
+thread that created them.
+
+Run directly to self-test against a stand-in connection (works on Linux):
+    python wmi_pool.py
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+logger = logging.getLogger("ITMonitorAgent")
+
+DEFAULT_NAMESPACE = "root\\cimv2"
+# A query running longer than this is considered hung: the worker is
+# abandoned and a new one (with fresh connections) takes over
+STUCK_AFTER = 120
+# Log queries slower than this (seconds)
+SLOW_QUERY = 1.0
+
+
+class WMIError(Exception):
+    """A WQL query failed or WMI is not available."""
+
+
+def available():
+    """Whether the wmi module (and pywin32) can be imported."""
+    try:
+        import wmi  # noqa: F401
+        import pythoncom  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _connect(namespace):
+    import wmi
+    return wmi.WMI(namespace=namespace)
+
+
+def _row(obj):
+    """Copy a WMI object's properties into a dict."""
+    if isinstance(obj, dict):
+        return obj
+    return {name: getattr(obj, name, None) for name in obj.properties}
+
+
+class WMIWorker:
+    """Runs WQL queries on one thread with cached per-namespace connections."""
+
+    def __init__(self, connect=None):
+        self._connect = connect or _connect
+        self._lock = threading.Lock()
+        self._jobs = None
+        self._thread = None
+        self._busy_since = None
+        self._stats = {}
+
+    def _ensure_worker(self):
+        with self._lock:
+            stuck = self._busy_since is not None and time.monotonic() - self._busy_since > STUCK_AFTER
+            if self._thread and self._thread.is_alive() and not stuck:
+                return self._jobs
+            if stuck:
+                logger.warning("WMI worker hung, starting a new one")
+            # The old thread (if any) keeps its own queue and connections
+            self._jobs = queue.Queue()
+            self._busy_since = None
+            self._thread = threading.Thread(
+                target=self._run, args=(self._jobs,), name="wmi-worker", daemon=True
+            )
+            self._thread.start()
+            return self._jobs
+
+    def _run(self, jobs):
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+        except ImportError:
+            pass
+
+        connections = {}
+        while True:
+            batch = [jobs.get()]
+            while True:
+                try:
+                    batch.append(jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            started = time.perf_counter()
+            for future, namespace, wql in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if jobs is self._jobs:
+                    self._busy_since = time.monotonic()
+                try:
+                    future.set_result(self._execute(connections, namespace, wql))
+                except Exception as e:
+                    future.set_exception(e if isinstance(e, WMIError) else WMIError(str(e)[:300]))
+            if jobs is not self._jobs:
+                # Replaced while hung: let the remaining queue die with the thread
+                return
+            self._busy_since = None
+            logger.debug(f"WMI: ran {len(batch)} queries in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _execute(self, connections, namespace, wql):
+        """Run one query, reconnecting once if the cached connection failed."""
+        started = time.perf_counter()
+        for attempt in range(2):
+            try:
+                conn = connections.get(namespace)
+                if conn is None:
+                    conn = connections[namespace] = self._connect(namespace)
+                rows = [_row(obj) for obj in conn.query(wql)]
+                break
+            except ImportError:
+                self._record(namespace, wql, started, failed=True)
+                raise WMIError("WMI not available")
+            except Exception:
+                connections.pop(namespace, None)
+                if attempt:
+                    self._record(namespace, wql, started, failed=True)
+                    raise
+        self._record(namespace, wql, started)
+        return rows
+
+    def _record(self, namespace, wql, started, failed=False):
+        elapsed = time.perf_counter() - started
+        key = f"{namespace}: {wql}"
+        with self._lock:
+            entry = self._stats.setdefault(key, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["errors"] += int(failed)
+            entry["total_ms"] += elapsed * 1000
+            entry["max_ms"] = max(entry["max_ms"], elapsed * 1000)
+            entry["last_ms"] = elapsed * 1000
+        if elapsed >= SLOW_QUERY:
+            logger.info(f"Slow WMI query ({elapsed:.1f}s): {key}")
+
+    def _submit(self, wql, namespace):
+        future = Future()
+        self._ensure_worker().put((future, namespace, wql))
+        return future
+
+    @staticmethod
+    def _wait(future, wql, timeout):
+        try:
+            return future.result(timeout=max(0, timeout))
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"WMI query timed out after {timeout}s: {wql[:100]}")
+
+    def query(self, wql, namespace=DEFAULT_NAMESPACE, timeout=20):
+        """
+        Run a WQL query and return its rows as dicts. Raises WMIError if it
+        failed and TimeoutError if no result arrived within timeout seconds.
+        """
+        return self._wait(self._submit(wql, namespace), wql, timeout)
+
+    def batch(self, queries, timeout=20):
+        """
+        Run several queries in one visit. queries maps a name to a WQL
+        string or a (namespace, wql) tuple; returns {name: rows or exception}.
+        """
+        deadline = time.monotonic() + timeout
+        futures = {}
+        for name, spec in queries.items():
+            namespace, wql = spec if isinstance(spec, tuple) else (DEFAULT_NAMESPACE, spec)
+            futures[name] = (self._submit(wql, namespace), wql)
+
+        results = {}
+        for name, (future, wql) in futures.items():
+            try:
+                results[name] = self._wait(future, wql, deadline - time.monotonic())
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def stats(self):
+        """Per-query timing: count, errors, avg/max/last milliseconds."""
+        with self._lock:
+            return {
+                key: {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 1),
+                    "max_ms": round(s["max_ms"], 1),
+                    "last_ms": round(s["last_ms"], 1),
+                }
+                for key, s in self._stats.items()
+            }
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_wmi():
+    """Shared WMI worker (its thread starts on first use)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = WMIWorker()
+        return _worker
+
+
+def wmi_query(wql, namespace=DEFAULT_NAMESPACE, timeout=20):
+    """Run a WQL query on the shared worker and return its rows as dicts."""
+    return get_wmi().query(wql, namespace=namespace, timeout=timeout)
+
+
+class _StandInConnection:
+    """Fake connection: "SELECT n" returns n rows, "SLEEP s" blocks, "FAIL" raises."""
+
+    connects = 0
+
+    def __init__(self, namespace):
+        type(self).connects += 1
+        self.namespace = namespace
+        self.broken = False
+
+    def query(self, wql):
+        if self.broken:
+            raise RuntimeError("RPC server is unavailable")
+        word, _, arg = wql.partition(" ")
+        if word == "SLEEP":
+            time.sleep(float(arg))
+            return []
+        if word == "FAIL":
+            raise RuntimeError("Invalid query")
+        return [{"Name": f"row{i}", "Namespace": self.namespace} for i in range(int(arg))]
+
+
+def _selftest():
+    """Exercise the worker against stand-in connections."""
+    global STUCK_AFTER
+    conns = []
+
+    def connect(namespace):
+        conns.append(_StandInConnection(namespace))
+        return conns[-1]
+
+    worker = WMIWorker(connect)
+    assert len(worker.query("SELECT 3")) == 3
+    assert worker.query("SELECT 1", namespace="root\\SecurityCenter2")[0]["Namespace"] == "root\\SecurityCenter2"
+    worker.query("SELECT 2")
+    assert len(conns) == 2, "one connection per namespace, reused"
+
+    conns[0].broken = True
+    assert len(worker.query("SELECT 1")) == 1, "reconnect after a failed connection"
+    assert len(conns) == 3
+
+    try:
+        worker.query("FAIL")
+        raise AssertionError("expected WMIError")
+    except WMIError:
+        pass
+
+    results = worker.batch({"a": "SELECT 1", "b": ("root\\SecurityCenter2", "SELECT 2"), "c": "FAIL"})
+    assert len(results["a"]) == 1 and len(results["b"]) == 2 and isinstance(results["c"], WMIError)
+
+    try:
+        worker.query("SLEEP 2", timeout=0.5)
+        raise AssertionError("expected TimeoutError")
+    except TimeoutError:
+        pass
+    STUCK_AFTER = 0.2
+    time.sleep(0.3)
+    started = time.perf_counter()
+    assert len(worker.query("SELECT 1", timeout=1)) == 1, "hung worker replaced"
+    assert time.perf_counter() - started < 1
+    STUCK_AFTER = 120
+
+    start = time.perf_counter()
+    results = worker.batch({i: "SELECT 10" for i in range(200)})
+    per_query = (time.perf_counter() - start) / 200 * 1000
+    assert all(len(rows) == 10 for rows in results.values())
+    stats = worker.stats()
+    assert stats[f"{DEFAULT_NAMESPACE}: SELECT 10"]["count"] == 200
+    assert stats[f"{DEFAULT_NAMESPACE}: FAIL"]["errors"] == 2
+    print(f"ok - {per_query:.3f} ms per query through the worker, {len(conns)} connections")
+
+
+if __name__ == "__main__":
+    _selftest()
@@ -0,0 +1,12 @@
+-- CreateTable
+CREATE TABLE "CommandOutput" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "commandId" TEXT NOT NULL,
+    "seq" INTEGER NOT NULL,
+    "data" TEXT NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "CommandOutput_commandId_fkey" FOREIGN KEY ("commandId") REFERENCES "Command" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "CommandOutput_commandId_seq_key" ON "CommandOutput"("commandId", "seq");
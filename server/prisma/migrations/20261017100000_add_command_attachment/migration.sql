@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE "CommandAttachment" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "commandId" TEXT NOT NULL,
+    "contentType" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "data" BLOB NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "CommandAttachment_commandId_fkey" FOREIGN KEY ("commandId") REFERENCES "Command" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "CommandAttachment_commandId_key" ON "CommandAttachment"("commandId");
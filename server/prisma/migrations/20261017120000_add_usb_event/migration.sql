@@ -0,0 +1,18 @@
+-- CreateTable
+CREATE TABLE "UsbEvent" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "computerId" TEXT NOT NULL,
+    "action" TEXT NOT NULL,
+    "name" TEXT NOT NULL,
+    "manufacturer" TEXT,
+    "deviceId" TEXT NOT NULL,
+    "occurredAt" DATETIME NOT NULL,
+    "createdAt" DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "UsbEvent_computerId_fkey" FOREIGN KEY ("computerId") REFERENCES "Computer" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- CreateIndex
+CREATE INDEX "UsbEvent_computerId_occurredAt_idx" ON "UsbEvent"("computerId", "occurredAt");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "UsbEvent_computerId_deviceId_action_occurredAt_key" ON "UsbEvent"("computerId", "deviceId", "action", "occurredAt");
@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "Command" ADD COLUMN "claimedAt" DATETIME;
+ALTER TABLE "Command" ADD COLUMN "ackedAt" DATETIME;
@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "Report" ADD COLUMN "cpuUsageMax" REAL;
+ALTER TABLE "Report" ADD COLUMN "cpuUsageP95" REAL;
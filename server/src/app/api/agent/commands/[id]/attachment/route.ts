@@ -0,0 +1,58 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+
+const ALLOWED_TYPES = ["image/jpeg", "image/webp", "image/png"];
+const MAX_SIZE = 20 * 1024 * 1024;
+
+// POST /api/agent/commands/[id]/attachment - Agent uploads a binary result
+// (e.g. a screenshot) as the raw request body. Re-uploads replace it.
+export async function POST(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const apiKey = request.headers.get("x-api-key");
+    if (!apiKey) {
+      return NextResponse.json({ error: "Missing API key" }, { status: 401 });
+    }
+
+    const contentType = (request.headers.get("content-type") || "").split(";")[0];
+    if (!ALLOWED_TYPES.includes(contentType)) {
+      return NextResponse.json(
+        { error: "Unsupported attachment type" },
+        { status: 415 }
+      );
+    }
+
+    const { id } = await params;
+    const command = await prisma.command.findUnique({ where: { id } });
+    if (!command) {
+      return NextResponse.json(
+        { error: "Command not found" },
+        { status: 404 }
+      );
+    }
+
+    const data = Buffer.from(await request.arrayBuffer());
+    if (data.length > MAX_SIZE) {
+      return NextResponse.json(
+        { error: "Attachment too large" },
+        { status: 413 }
+      );
+    }
+
+    await prisma.commandAttachment.upsert({
+      where: { commandId: id },
+      create: { commandId: id, contentType, size: data.length, data },
+      update: { contentType, size: data.length, data },
+    });
+
+    return NextResponse.json({ success: true, size: data.length });
+  } catch (error) {
+    console.error("Command attachment error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
@@ -1,7 +1,11 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/db";
+import { endLiveSession } from "@/lib/live-view";
 
-// POST /api/agent/commands/[id]/result - Agent reports command execution result
+// POST /api/agent/commands/[id]/result - Agent reports command execution result.
+// With progress: true the agent is sending a heartbeat for a running command;
+// the response tells it whether the command was cancelled.
+// chunks: [{ seq, data }] carries streamed output; re-sent chunks are ignored.
 export async function POST(
   request: NextRequest,
   { params }: { params: Promise<{ id: string }> }
@@ -14,7 +18,7 @@ export async function POST(
 
     const { id } = await params;
     const data = await request.json();
-    const { success, output } = data;
+    const { success, output, progress, chunks } = data;
 
     const command = await prisma.command.findUnique({
       where: { id },
@@ -27,15 +31,48 @@ export async function POST(
       );
     }
 
+    const cancelled = command.status === "cancelled";
+
+    if (Array.isArray(chunks)) {
+      for (const chunk of chunks as Array<{ seq: number; data: string }>) {
+        await prisma.commandOutput.upsert({
+          where: { commandId_seq: { commandId: id, seq: chunk.seq } },
+          create: { commandId: id, seq: chunk.seq, data: chunk.data },
+          update: {},
+        });
+      }
+    }
+
+    // Any post from the agent confirms it received the command
+    if (!command.ackedAt) {
+      await prisma.command.updateMany({
+        where: { id, ackedAt: null },
+        data: { ackedAt: new Date() },
+      });
+    }
+
+    if (progress) {
+      if (!cancelled && output) {
+        // Only while running: a late heartbeat must not overwrite the final result
+        await prisma.command.updateMany({
+          where: { id, status: "executing" },
+          data: { result: output.substring(0, 5000) },
+        });
+      }
+      return NextResponse.json({ success: true, cancel: cancelled });
+    }
+
     await prisma.command.update({
       where: { id },
       data: {
-        status: success ? "completed" : "failed",
+        status: cancelled ? "cancelled" : success ? "completed" : "failed",
         result: output ? output.substring(0, 5000) : null,
         executedAt: new Date(),
       },
     });
 
+    if (command.action === "live_view") endLiveSession(id);
+
     return NextResponse.json({ success: true });
   } catch (error) {
     console.error("Command result error:", error);
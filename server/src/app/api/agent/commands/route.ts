@@ -1,7 +1,12 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/db";
+import { claimPendingCommands, waitForCommand } from "@/lib/agent-commands";
 
-// GET /api/agent/commands?hostname=XXX - Agent polls for pending commands
+const MAX_WAIT_SECONDS = 30;
+
+// GET /api/agent/commands?hostname=XXX[&wait=25] - Agent polls for pending commands.
+// With wait, the request is held open (long-poll) until a command arrives
+// or the wait elapses.
 export async function GET(request: NextRequest) {
   try {
     const apiKey = request.headers.get("x-api-key");
@@ -11,6 +16,7 @@ export async function GET(request: NextRequest) {
 
     const { searchParams } = new URL(request.url);
     const hostname = searchParams.get("hostname");
+    const wait = Math.min(Number(searchParams.get("wait")) || 0, MAX_WAIT_SECONDS);
 
     if (!hostname) {
       return NextResponse.json(
@@ -28,21 +34,13 @@ export async function GET(request: NextRequest) {
       return NextResponse.json([]);
     }
 
-    // Get pending commands
-    const commands = await prisma.command.findMany({
-      where: {
-        computerId: computer.id,
-        status: "pending",
-      },
-      orderBy: { createdAt: "asc" },
-    });
+    let commands = await claimPendingCommands(computer.id);
 
-    // Mark them as "executing" so they aren't fetched again
-    for (const cmd of commands) {
-      await prisma.command.update({
-        where: { id: cmd.id },
-        data: { status: "executing" },
-      });
+    if (commands.length === 0 && wait > 0) {
+      await waitForCommand(computer.id, wait * 1000, request.signal);
+      if (!request.signal.aborted) {
+        commands = await claimPendingCommands(computer.id);
+      }
     }
 
     return NextResponse.json(commands);
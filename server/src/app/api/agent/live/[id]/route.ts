@@ -0,0 +1,51 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { parseFrame, publishFrame, endLiveSession } from "@/lib/live-view";
+
+// POST /api/agent/live/[id] - Agent pushes a live view frame (changed tiles).
+// The response tells the agent to stop when the command was cancelled.
+export async function POST(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const apiKey = request.headers.get("x-api-key");
+    if (!apiKey) {
+      return NextResponse.json({ error: "Missing API key" }, { status: 401 });
+    }
+
+    const { id } = await params;
+    const command = await prisma.command.findUnique({
+      where: { id },
+      select: { status: true, action: true },
+    });
+
+    if (!command || command.action !== "live_view") {
+      return NextResponse.json(
+        { error: "Live view command not found" },
+        { status: 404 }
+      );
+    }
+
+    if (command.status === "cancelled") {
+      endLiveSession(id);
+      return NextResponse.json({ success: true, stop: true });
+    }
+
+    let frame;
+    try {
+      frame = parseFrame(Buffer.from(await request.arrayBuffer()));
+    } catch {
+      return NextResponse.json({ error: "Invalid frame" }, { status: 400 });
+    }
+    publishFrame(id, frame);
+
+    return NextResponse.json({ success: true, stop: false });
+  } catch (error) {
+    console.error("Live frame error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,91 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { claimPendingCommands } from "@/lib/agent-commands";
+import { processAgentReport } from "@/lib/agent-report";
+import { readJsonBody, UnsupportedEncodingError, PayloadTooLargeError } from "@/lib/agent-request";
+import { getCachedAgentVersion } from "@/lib/agent-version";
+
+// POST /api/agent/sync - One round trip per agent cycle.
+// Request: report payload + command_results + delivered_message_ids
+// Response: report result + pending commands + server messages + latest version
+export async function POST(request: NextRequest) {
+  try {
+    const apiKey = request.headers.get("x-api-key");
+    if (!apiKey) {
+      return NextResponse.json({ error: "Missing API key" }, { status: 401 });
+    }
+
+    const data = await readJsonBody(request);
+    if (!data.hostname) {
+      return NextResponse.json({ error: "Missing hostname" }, { status: 400 });
+    }
+
+    const { command_results, delivered_message_ids, ...reportData } = data;
+    const { computer, report, alerts, resync } = await processAgentReport(reportData, apiKey);
+    if (!report) {
+      // The agent resends the whole sync in full; handle results, commands
+      // and messages then, so nothing is claimed into a discarded response
+      return NextResponse.json({ success: true, computerId: computer.id, reportId: null, alerts, resync });
+    }
+
+    // Results of commands executed during the previous cycle
+    if (Array.isArray(command_results)) {
+      for (const result of command_results as Array<{ id: string; success: boolean; output?: string }>) {
+        if (!result?.id) continue;
+        await prisma.command.updateMany({
+          where: { id: result.id, computerId: computer.id, status: { not: "cancelled" } },
+          data: {
+            status: result.success ? "completed" : "failed",
+            result: result.output ? result.output.substring(0, 5000) : null,
+            executedAt: new Date(),
+          },
+        });
+      }
+    }
+
+    // Messages the agent has shown to the user
+    if (Array.isArray(delivered_message_ids) && delivered_message_ids.length > 0) {
+      await prisma.serverMessage.updateMany({
+        where: { id: { in: delivered_message_ids }, computerId: computer.id },
+        data: { delivered: true, deliveredAt: new Date() },
+      });
+    }
+
+    // Pending commands (usually already delivered over the long-poll channel).
+    // If this response is lost, the claims are never acknowledged and are
+    // re-queued (see claimPendingCommands)
+    const commands = await claimPendingCommands(computer.id);
+
+    const messages = await prisma.serverMessage.findMany({
+      where: { computerId: computer.id, delivered: false },
+      orderBy: { createdAt: "asc" },
+    });
+
+    // Never wait on GitHub here: a slow fetch would push the response past
+    // the agent's timeout and make it resend the whole sync
+    const latestVersion = getCachedAgentVersion();
+
+    return NextResponse.json({
+      success: true,
+      computerId: computer.id,
+      reportId: report.id,
+      alerts,
+      resync,
+      commands,
+      messages,
+      latest_version: latestVersion,
+    });
+  } catch (error) {
+    if (error instanceof UnsupportedEncodingError) {
+      return NextResponse.json({ error: error.message }, { status: 415 });
+    }
+    if (error instanceof PayloadTooLargeError) {
+      return NextResponse.json({ error: error.message }, { status: 413 });
+    }
+    console.error("Agent sync error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
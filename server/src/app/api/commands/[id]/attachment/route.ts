@@ -0,0 +1,37 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+
+// GET /api/commands/[id]/attachment - Binary command result (e.g. screenshot image)
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+
+    const attachment = await prisma.commandAttachment.findUnique({
+      where: { commandId: id },
+    });
+
+    if (!attachment) {
+      return NextResponse.json(
+        { error: "Attachment not found" },
+        { status: 404 }
+      );
+    }
+
+    return new NextResponse(new Uint8Array(attachment.data), {
+      headers: {
+        "Content-Type": attachment.contentType,
+        "Content-Length": String(attachment.size),
+        "Cache-Control": "private, max-age=3600",
+      },
+    });
+  } catch (error) {
+    console.error("Get attachment error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,50 @@
+import { NextRequest } from "next/server";
+import { liveBus, getSnapshot, type LiveFrame } from "@/lib/live-view";
+
+// GET /api/commands/[id]/live - Server-sent events stream of live view frames.
+// The current picture is sent first, then each frame of changed tiles.
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  const { id } = await params;
+  const encoder = new TextEncoder();
+  let cleanup = () => {};
+
+  const stream = new ReadableStream({
+    start(controller) {
+      const send = (event: string, data: unknown) => {
+        controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`));
+      };
+
+      const onFrame = (frame: LiveFrame) => send("frame", frame);
+      const onEnd = () => {
+        send("end", {});
+        cleanup();
+        controller.close();
+      };
+
+      liveBus.on(`frame:${id}`, onFrame);
+      liveBus.once(`end:${id}`, onEnd);
+      cleanup = () => {
+        liveBus.off(`frame:${id}`, onFrame);
+        liveBus.off(`end:${id}`, onEnd);
+      };
+      request.signal.addEventListener("abort", cleanup);
+
+      const snapshot = getSnapshot(id);
+      if (snapshot) send("frame", snapshot);
+    },
+    cancel() {
+      cleanup();
+    },
+  });
+
+  return new Response(stream, {
+    headers: {
+      "Content-Type": "text/event-stream",
+      "Cache-Control": "no-cache, no-transform",
+      Connection: "keep-alive",
+    },
+  });
+}
@@ -0,0 +1,68 @@
+import { NextRequest, NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { endLiveSession } from "@/lib/live-view";
+
+// GET /api/commands/[id] - Command with its full streamed output
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+
+    const command = await prisma.command.findUnique({
+      where: { id },
+      include: { outputs: { orderBy: { seq: "asc" } } },
+    });
+
+    if (!command) {
+      return NextResponse.json({ error: "Command not found" }, { status: 404 });
+    }
+
+    const { outputs, ...rest } = command;
+    return NextResponse.json({
+      ...rest,
+      output: outputs.map((o) => o.data).join(""),
+    });
+  } catch (error) {
+    console.error("Get command error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
+
+// DELETE /api/commands/[id] - Admin cancels a pending or running command.
+// A running command is stopped by the agent on its next progress heartbeat.
+export async function DELETE(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+
+    const { count } = await prisma.command.updateMany({
+      where: { id, status: { in: ["pending", "executing"] } },
+      data: { status: "cancelled" },
+    });
+
+    if (count === 0) {
+      return NextResponse.json(
+        { error: "Command not found or already finished" },
+        { status: 404 }
+      );
+    }
+
+    // Close any live view viewers right away; the agent stops on its next frame
+    endLiveSession(id);
+
+    return NextResponse.json({ success: true });
+  } catch (error) {
+    console.error("Cancel command error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 }
+    );
+  }
+}
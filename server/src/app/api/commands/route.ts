@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { prisma } from "@/lib/db";
+import { notifyCommand } from "@/lib/agent-commands";
 
 // POST /api/commands - Admin creates a command for a computer
 export async function POST(request: NextRequest) {
@@ -34,6 +35,9 @@ export async function POST(request: NextRequest) {
       },
     });
 
+    // Wake the agent's long-poll, if it is connected
+    notifyCommand(computerId);
+
     return NextResponse.json(command);
   } catch (error) {
     console.error("Create command error:", error);
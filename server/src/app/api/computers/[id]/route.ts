@@ -19,6 +19,10 @@ export async function GET(
           orderBy: { createdAt: "desc" },
           take: 50,
         },
+        usbEvents: {
+          orderBy: { occurredAt: "desc" },
+          take: 50,
+        },
       },
     });
 
@@ -34,6 +38,17 @@ export async function GET(
 
     const lastReport = computer.reports[0] || null;
 
+    // Reports only carry events that were new at the time: merge the most
+    // recent ones across the loaded reports, newest first by event time
+    const eventTime = (e: { time?: string }) => {
+      const t = e.time ? Date.parse(e.time) : NaN;
+      return Number.isNaN(t) ? 0 : t;
+    };
+    const eventLogs = computer.reports
+      .flatMap((r) => (r.eventLogs ? JSON.parse(r.eventLogs) : []))
+      .sort((a: { time?: string }, b: { time?: string }) => eventTime(b) - eventTime(a))
+      .slice(0, 20);
+
     return NextResponse.json({
       id: computer.id,
       hostname: computer.hostname,
@@ -51,6 +66,8 @@ export async function GET(
             cpuCores: lastReport.cpuCores,
             cpuSpeed: lastReport.cpuSpeed,
             cpuTemp: lastReport.cpuTemp,
+            cpuUsageMax: lastReport.cpuUsageMax,
+            cpuUsageP95: lastReport.cpuUsageP95,
             ramTotal: lastReport.ramTotal,
             ramUsed: lastReport.ramUsed,
             ramUsage: lastReport.ramUsage,
@@ -60,10 +77,11 @@ export async function GET(
             diskDetails: lastReport.diskDetails ? JSON.parse(lastReport.diskDetails) : null,
             networkUp: lastReport.networkUp,
             networkInfo: lastReport.networkInfo ? JSON.parse(lastReport.networkInfo) : null,
+            networkQuality: lastReport.networkQuality ? JSON.parse(lastReport.networkQuality) : null,
             osInfo: lastReport.osInfo ? JSON.parse(lastReport.osInfo) : null,
             uptime: lastReport.uptime,
             topProcesses: lastReport.topProcesses ? JSON.parse(lastReport.topProcesses) : null,
-            eventLogs: lastReport.eventLogs ? JSON.parse(lastReport.eventLogs) : null,
+            eventLogs: eventLogs.length > 0 ? eventLogs : null,
             software: lastReport.software ? JSON.parse(lastReport.software) : null,
             antivirusStatus: lastReport.antivirusStatus,
             printers: lastReport.printers ? JSON.parse(lastReport.printers) : null,
@@ -74,6 +92,7 @@ export async function GET(
             usbDevices: lastReport.usbDevices ? JSON.parse(lastReport.usbDevices) : null,
             windowsUpdate: lastReport.windowsUpdate ? JSON.parse(lastReport.windowsUpdate) : null,
             services: lastReport.services ? JSON.parse(lastReport.services) : null,
+            collectionStatus: lastReport.collectionStatus ? JSON.parse(lastReport.collectionStatus) : null,
           }
         : null,
       history: computer.reports.map((r) => ({
@@ -90,6 +109,13 @@ export async function GET(
         resolved: a.resolved,
         createdAt: a.createdAt,
       })),
+      usbEvents: computer.usbEvents.map((e) => ({
+        action: e.action,
+        name: e.name,
+        manufacturer: e.manufacturer,
+        deviceId: e.deviceId,
+        occurredAt: e.occurredAt,
+      })),
     });
   } catch (error) {
     console.error("Get computer error:", error);
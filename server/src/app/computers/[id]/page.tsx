@@ -28,9 +28,12 @@ import {
   Loader2,
   Cog,
   Camera,
+  Video,
 } from "lucide-react";
 import { StatusBadge } from "@/components/status-badge";
 import { UsageBar } from "@/components/usage-bar";
+import { LiveView } from "@/components/live-view";
+import { formatBytes } from "@/lib/utils";
 import {
   LineChart,
   Line,
@@ -59,6 +62,8 @@ interface ComputerDetail {
     cpuCores: number | null;
     cpuSpeed: string | null;
     cpuTemp: number | null;
+    cpuUsageMax: number | null;
+    cpuUsageP95: number | null;
     ramTotal: number;
     ramUsed: number;
     ramUsage: number;
@@ -68,9 +73,15 @@ interface ComputerDetail {
     diskDetails: Array<{ device: string; total: number; used: number; percent: number }> | null;
     networkUp: boolean;
     networkInfo: Record<string, string> | null;
+    networkQuality: {
+      targets: Array<{ target: string; method: string; role?: string; loss_pct: number; rtt_min: number | null; rtt_avg: number | null; rtt_max: number | null; jitter: number | null }>;
+      throughput: Record<string, { rx_bps: number; tx_bps: number }>;
+      rxBps: number;
+      txBps: number;
+    } | null;
     osInfo: Record<string, string> | null;
     uptime: number | null;
-    topProcesses: Array<{ name: string; cpu: number; memory: number }> | null;
+    topProcesses: Array<{ name: string; cpu: number; memory: number | null }> | null;
     eventLogs: Array<{ level: string; source: string; message: string; time: string }> | null;
     software: Array<{ name: string; version: string }> | null;
     antivirusStatus: string | null;
@@ -80,8 +91,9 @@ interface ComputerDetail {
     startupPrograms: Array<{ name: string; command: string; location: string }> | null;
     sharedFolders: Array<{ name: string; path: string; remark: string; is_hidden: boolean }> | null;
     usbDevices: Array<{ name: string; status: string; manufacturer: string }> | null;
-    windowsUpdate: { recent_updates: Array<{ id: string; description: string; installed_on: string }>; pending_count: number } | null;
+    windowsUpdate: { recent_updates: Array<{ id: string; description: string; installed_on: string }>; pending_count: number; pending_checked_at?: number | null; pending_searching?: boolean } | null;
     services: Array<{ name: string; displayName: string; status: string; startType: string }> | null;
+    collectionStatus: Record<string, string> | null;
   } | null;
   history: Array<{
     cpuUsage: number;
@@ -97,6 +109,13 @@ interface ComputerDetail {
     resolved: boolean;
     createdAt: string;
   }>;
+  usbEvents?: Array<{
+    action: string;
+    name: string;
+    manufacturer: string | null;
+    deviceId: string;
+    occurredAt: string;
+  }>;
 }
 
 function formatUptime(seconds: number): string {
@@ -129,6 +148,7 @@ export default function ComputerDetailPage() {
   const [serverMessage, setServerMessage] = useState("");
   const [screenshot, setScreenshot] = useState<string | null>(null);
   const [screenshotLoading, setScreenshotLoading] = useState(false);
+  const [liveCommandId, setLiveCommandId] = useState<string | null>(null);
 
   const fetchComputer = async () => {
     try {
@@ -156,6 +176,29 @@ export default function ComputerDetailPage() {
     }
   };
 
+  const [fullOutput, setFullOutput] = useState<{ id: string; output: string } | null>(null);
+
+  const showFullOutput = async (commandId: string) => {
+    try {
+      const res = await fetch(`/api/commands/${commandId}`);
+      if (res.ok) {
+        const json = await res.json();
+        setFullOutput({ id: commandId, output: json.output || json.result || "" });
+      }
+    } catch (err) {
+      console.error("Failed to fetch command output:", err);
+    }
+  };
+
+  const cancelCommand = async (commandId: string) => {
+    try {
+      await fetch(`/api/commands/${commandId}`, { method: "DELETE" });
+      fetchCommands();
+    } catch (err) {
+      console.error("Failed to cancel command:", err);
+    }
+  };
+
   const sendCommand = async (action: string, cmdParams?: Record<string, unknown>) => {
     if (!computer) return;
     setActionLoading(action);
@@ -261,26 +304,12 @@ export default function ComputerDetailPage() {
           if (cmd && cmd.status === "completed") {
             clearInterval(pollInterval);
             setScreenshotLoading(false);
-            
-            if (cmd.result) {
-              try {
-                const result = JSON.parse(cmd.result);
-                console.log("Screenshot result:", result);
-                if (result.screenshot) {
-                  setScreenshot(result.screenshot);
-                  console.log("Screenshot set successfully, length:", result.screenshot.length);
-                } else {
-                  console.error("No screenshot in result:", result);
-                  alert("Screenshot failed: " + (result.output || "Unknown error"));
-                }
-              } catch (e) {
-                console.error("Parse error:", e);
-                alert("Failed to parse screenshot result: " + cmd.result);
-              }
-            } else {
-              console.error("No result in command:", cmd);
-              alert("Command completed but no result returned");
-            }
+            // The image is uploaded by the agent as a binary attachment
+            setScreenshot(`/api/commands/${commandId}/attachment`);
+          } else if (cmd && (cmd.status === "failed" || cmd.status === "cancelled")) {
+            clearInterval(pollInterval);
+            setScreenshotLoading(false);
+            alert("Screenshot failed: " + (cmd.result || "Unknown error"));
           }
         }, 2000);
         
@@ -297,6 +326,32 @@ export default function ComputerDetailPage() {
     }
   };
 
+  const startLiveView = async () => {
+    if (!computer) return;
+    try {
+      const res = await fetch("/api/commands", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          computerId: computer.id,
+          action: "live_view",
+          params: { fps: 1, duration: 300, max_kbps: 512 },
+        }),
+      });
+      if (res.ok) {
+        const command = await res.json();
+        setLiveCommandId(command.id);
+      }
+    } catch (err) {
+      console.error("Failed to start live view:", err);
+    }
+  };
+
+  const stopLiveView = async () => {
+    if (liveCommandId) await cancelCommand(liveCommandId);
+    setLiveCommandId(null);
+  };
+
   useEffect(() => {
     fetchComputer();
     const interval = setInterval(fetchComputer, 15000);
@@ -422,6 +477,14 @@ export default function ComputerDetailPage() {
             )}
             ຖ່າຍຮູບໜ້າຈໍ
           </button>
+          <button
+            onClick={liveCommandId ? stopLiveView : startLiveView}
+            className="flex items-center gap-2 px-4 py-2 bg-blue-500/20 text-blue-400 border border-blue-500/30 rounded-lg text-sm font-medium hover:bg-blue-500/30 transition-colors"
+            title="Live view"
+          >
+            <Video className="w-4 h-4" />
+            {liveCommandId ? "Stop live view" : "Live view"}
+          </button>
           <button
             onClick={() => {
               const rdpContent = `full address:s:${computer.ipAddress}\nprompt for credentials:i:1\nadministrative session:i:1`;
@@ -444,6 +507,11 @@ export default function ComputerDetailPage() {
         </div>
       </div>
 
+      {/* Live View */}
+      {liveCommandId && (
+        <LiveView commandId={liveCommandId} onClose={stopLiveView} />
+      )}
+
       {/* Screenshot Display */}
       {screenshot && (
         <div className="bg-card border border-border rounded-xl p-4">
@@ -458,7 +526,7 @@ export default function ComputerDetailPage() {
           </div>
           <div className="bg-background rounded-lg overflow-hidden">
             <img
-              src={`data:image/png;base64,${screenshot}`}
+              src={screenshot}
               alt="Screenshot"
               className="w-full h-auto"
             />
@@ -497,6 +565,20 @@ export default function ComputerDetailPage() {
 
       {tab === "overview" && (
         <div className="space-y-6">
+          {/* Collectors that timed out or failed in the last report */}
+          {report?.collectionStatus && Object.keys(report.collectionStatus).length > 0 && (
+            <div className="border border-amber-500/30 bg-amber-500/5 rounded-xl p-4 text-sm">
+              <div className="flex items-center gap-2 text-amber-400 font-medium mb-1">
+                <AlertTriangle className="w-4 h-4" />
+                Incomplete data in the last report
+              </div>
+              <p className="text-muted">
+                {Object.entries(report.collectionStatus)
+                  .map(([name, state]) => `${name}: ${state}`)
+                  .join(", ")}
+              </p>
+            </div>
+          )}
           {/* System Info */}
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4">
             <div className="bg-card border border-border rounded-xl p-4">
@@ -519,6 +601,11 @@ export default function ComputerDetailPage() {
                 Network
               </div>
               <p className="font-medium text-sm">{report?.networkUp ? "Connected" : "Disconnected"}</p>
+              {report?.networkQuality && (
+                <p className="text-xs text-muted mt-1">
+                  ↓ {formatBytes(report.networkQuality.rxBps, 1)}/s ↑ {formatBytes(report.networkQuality.txBps, 1)}/s
+                </p>
+              )}
             </div>
             <div className="bg-card border border-border rounded-xl p-4">
               <div className="flex items-center gap-2 text-muted text-sm mb-2">
@@ -539,6 +626,11 @@ export default function ComputerDetailPage() {
                 </div>
                 <UsageBar label="Usage" value={report.cpuUsage} />
                 <div className="mt-3 text-xs text-muted space-y-1">
+                  {report.cpuUsageMax !== null && report.cpuUsageP95 !== null && (
+                    <p>
+                      Peak: {report.cpuUsageMax.toFixed(1)}% · p95: {report.cpuUsageP95.toFixed(1)}%
+                    </p>
+                  )}
                   {report.cpuCores && <p>Cores: {report.cpuCores}</p>}
                   {report.cpuSpeed && <p>Speed: {report.cpuSpeed}</p>}
                   {report.cpuTemp && <p>Temp: {report.cpuTemp}°C</p>}
@@ -567,6 +659,41 @@ export default function ComputerDetailPage() {
             </div>
           )}
 
+          {/* Network Quality */}
+          {report?.networkQuality && report.networkQuality.targets.length > 0 && (
+            <div className="bg-card border border-border rounded-xl p-6">
+              <h3 className="font-semibold mb-4 flex items-center gap-2">
+                <Wifi className="w-4 h-4" />
+                Network Quality
+              </h3>
+              <table className="w-full text-sm">
+                <thead>
+                  <tr className="text-left text-muted border-b border-border">
+                    <th className="pb-2">Target</th>
+                    <th className="pb-2">Loss</th>
+                    <th className="pb-2">Latency (min / avg / max)</th>
+                    <th className="pb-2">Jitter</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {report.networkQuality.targets.map((t) => (
+                    <tr key={t.target} className="border-b border-border/50">
+                      <td className="py-2">
+                        {t.target}
+                        <span className="text-xs text-muted ml-2">{t.role || t.method}</span>
+                      </td>
+                      <td className={`py-2 ${t.loss_pct > 0 ? "text-amber-400" : ""}`}>{t.loss_pct}%</td>
+                      <td className="py-2">
+                        {t.rtt_avg !== null ? `${t.rtt_min} / ${t.rtt_avg} / ${t.rtt_max} ms` : "-"}
+                      </td>
+                      <td className="py-2">{t.jitter !== null ? `${t.jitter} ms` : "-"}</td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            </div>
+          )}
+
           {/* History Chart */}
           {chartData.length > 1 && (
             <div className="bg-card border border-border rounded-xl p-6">
@@ -647,7 +774,9 @@ export default function ComputerDetailPage() {
                       <td className={`py-3 px-4 text-right font-mono ${proc.cpu > 50 ? "text-red-400" : ""}`}>
                         {proc.cpu.toFixed(1)}%
                       </td>
-                      <td className="py-3 px-4 text-right font-mono">{proc.memory.toFixed(1)}</td>
+                      <td className="py-3 px-4 text-right font-mono">
+                        {proc.memory !== null ? proc.memory.toFixed(1) : "-"}
+                      </td>
                     </tr>
                   ))}
                 </tbody>
@@ -926,6 +1055,22 @@ export default function ComputerDetailPage() {
             ) : (
               <p className="text-muted text-center py-4">No USB devices detected</p>
             )}
+            {computer.usbEvents && computer.usbEvents.length > 0 && (
+              <div className="mt-4">
+                <p className="text-xs text-muted mb-2">Recent insert/remove events</p>
+                <div className="space-y-1 max-h-48 overflow-y-auto text-sm">
+                  {computer.usbEvents.map((e, i) => (
+                    <div key={i} className="flex items-center gap-3">
+                      <span className="text-xs text-muted w-40 shrink-0">{new Date(e.occurredAt).toLocaleString()}</span>
+                      <span className={`text-xs px-2 py-0.5 rounded ${e.action === "inserted" ? "bg-emerald-500/10 text-emerald-400" : "bg-red-500/10 text-red-400"}`}>
+                        {e.action}
+                      </span>
+                      <span className="truncate" title={e.deviceId}>{e.name}</span>
+                    </div>
+                  ))}
+                </div>
+              </div>
+            )}
           </div>
 
           {/* Windows Update */}
@@ -938,6 +1083,12 @@ export default function ComputerDetailPage() {
                   {report.windowsUpdate.pending_count} pending
                 </span>
               ) : null}
+              {report?.windowsUpdate?.pending_checked_at ? (
+                <span className="text-xs text-muted font-normal">
+                  checked {new Date(report.windowsUpdate.pending_checked_at * 1000).toLocaleString()}
+                  {report.windowsUpdate.pending_searching ? " (searching...)" : ""}
+                </span>
+              ) : null}
             </h3>
             {report?.windowsUpdate?.recent_updates && report.windowsUpdate.recent_updates.length > 0 ? (
               <div className="overflow-x-auto">
@@ -1063,6 +1214,8 @@ export default function ComputerDetailPage() {
                 { action: "flush_dns", label: "Flush DNS", icon: RefreshCw, color: "text-cyan-400 border-cyan-500/30 hover:bg-cyan-500/10" },
                 { action: "gpupdate", label: "GP Update", icon: RefreshCw, color: "text-orange-400 border-orange-500/30 hover:bg-orange-500/10" },
                 { action: "ipconfig", label: "IP Config", icon: Wifi, color: "text-teal-400 border-teal-500/30 hover:bg-teal-500/10" },
+                { action: "disk_usage", label: "Disk Usage", icon: HardDrive, color: "text-sky-400 border-sky-500/30 hover:bg-sky-500/10" },
+                { action: "refresh_licenses", label: "Refresh Licenses", icon: RefreshCw, color: "text-indigo-400 border-indigo-500/30 hover:bg-indigo-500/10" },
               ].map((a) => (
                 <button
                   key={a.action}
@@ -1094,7 +1247,7 @@ export default function ComputerDetailPage() {
             </h3>
             <div className="flex gap-3 items-end">
               <div className="flex-1">
-                <label className="text-xs text-muted mb-1 block">Host / IP</label>
+                <label className="text-xs text-muted mb-1 block">Host / IP (Sweep: several host or host:port)</label>
                 <input
                   type="text"
                   value={pingHost}
@@ -1117,6 +1270,14 @@ export default function ComputerDetailPage() {
               >
                 Traceroute
               </button>
+              <button
+                onClick={() => sendCommand("net_diag", { targets: pingHost })}
+                disabled={actionLoading !== null}
+                className="px-4 py-2 bg-accent/20 text-accent border border-accent/30 rounded-lg text-sm hover:bg-accent/30 transition-colors"
+                title="Probe several hosts at once (host or host:port, separated by spaces or commas)"
+              >
+                Sweep
+              </button>
             </div>
           </div>
 
@@ -1246,6 +1407,14 @@ export default function ComputerDetailPage() {
                         }`}>
                           {cmd.status}
                         </span>
+                        {(cmd.status === "pending" || cmd.status === "executing") && (
+                          <button
+                            onClick={() => cancelCommand(cmd.id)}
+                            className="text-xs text-muted hover:text-red-400 transition-colors"
+                          >
+                            Cancel
+                          </button>
+                        )}
                       </div>
                       <span className="text-xs text-muted">
                         {new Date(cmd.createdAt).toLocaleString()}
@@ -1256,11 +1425,21 @@ export default function ComputerDetailPage() {
                         Params: {cmd.params}
                       </p>
                     )}
-                    {cmd.result && (
+                    {fullOutput?.id === cmd.id ? (
+                      <pre className="text-xs text-muted mt-2 p-2 bg-background rounded border border-border overflow-x-auto max-h-96 whitespace-pre-wrap">
+                        {fullOutput.output}
+                      </pre>
+                    ) : cmd.result && (
                       <pre className="text-xs text-muted mt-2 p-2 bg-background rounded border border-border overflow-x-auto max-h-40 whitespace-pre-wrap">
                         {cmd.result}
                       </pre>
                     )}
+                    <button
+                      onClick={() => fullOutput?.id === cmd.id ? setFullOutput(null) : showFullOutput(cmd.id)}
+                      className="text-xs text-muted hover:text-foreground transition-colors mt-1"
+                    >
+                      {fullOutput?.id === cmd.id ? "Hide full output" : "Full output"}
+                    </button>
                   </div>
                 ))}
               </div>
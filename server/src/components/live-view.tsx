@@ -0,0 +1,64 @@
+"use client";
+
+import { useEffect, useRef, useState } from "react";
+
+interface LiveViewProps {
+  commandId: string;
+  onClose: () => void;
+}
+
+type LiveFrame = {
+  width: number;
+  height: number;
+  tiles: { x: number; y: number; w: number; h: number; data: string }[];
+};
+
+// Draws live view frames (changed JPEG tiles) onto a canvas as they arrive
+export function LiveView({ commandId, onClose }: LiveViewProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null);
+  const [status, setStatus] = useState("ກຳລັງເຊື່ອມຕໍ່...");
+
+  useEffect(() => {
+    const source = new EventSource(`/api/commands/${commandId}/live`);
+
+    source.addEventListener("frame", (event) => {
+      const frame: LiveFrame = JSON.parse((event as MessageEvent).data);
+      const canvas = canvasRef.current;
+      if (!canvas) return;
+      if (canvas.width !== frame.width || canvas.height !== frame.height) {
+        canvas.width = frame.width;
+        canvas.height = frame.height;
+      }
+      const ctx = canvas.getContext("2d");
+      for (const tile of frame.tiles) {
+        const img = new Image();
+        img.onload = () => ctx?.drawImage(img, tile.x, tile.y);
+        img.src = `data:image/jpeg;base64,${tile.data}`;
+      }
+      setStatus("Live");
+    });
+
+    source.addEventListener("end", () => {
+      setStatus("ສິ້ນສຸດແລ້ວ");
+      source.close();
+    });
+
+    return () => source.close();
+  }, [commandId]);
+
+  return (
+    <div className="bg-card border border-border rounded-xl p-4">
+      <div className="flex items-center justify-between mb-3">
+        <h3 className="font-semibold">
+          Live view <span className="text-xs text-muted font-normal ml-2">{status}</span>
+        </h3>
+        <button onClick={onClose} className="text-xs text-muted hover:text-foreground">
+          ປິດ
+        </button>
+      </div>
+      <div className="bg-background rounded-lg overflow-hidden">
+        <canvas ref={canvasRef} className="w-full h-auto" />
+      </div>
+    </div>
+  );
+}
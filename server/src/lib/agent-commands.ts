@@ -0,0 +1,69 @@
+import { EventEmitter } from "events";
+import { prisma } from "@/lib/db";
+
+// In-process notification of new commands, so long-polling agents are
+// woken as soon as an admin issues a command
+const globalForCommands = globalThis as unknown as {
+  commandBus: EventEmitter | undefined;
+};
+
+export const commandBus = globalForCommands.commandBus ?? new EventEmitter();
+commandBus.setMaxListeners(0); // one listener per connected agent
+
+if (process.env.NODE_ENV !== "production") globalForCommands.commandBus = commandBus;
+
+export function notifyCommand(computerId: string) {
+  commandBus.emit(`command:${computerId}`);
+}
+
+// Resolve when a command is issued for the computer, the timeout elapses
+// or the request is aborted
+export function waitForCommand(computerId: string, timeoutMs: number, signal?: AbortSignal) {
+  return new Promise<void>((resolve) => {
+    const event = `command:${computerId}`;
+    const done = () => {
+      clearTimeout(timer);
+      commandBus.off(event, done);
+      signal?.removeEventListener("abort", done);
+      resolve();
+    };
+    const timer = setTimeout(done, timeoutMs);
+    commandBus.once(event, done);
+    signal?.addEventListener("abort", done);
+  });
+}
+
+// A claimed command the agent has not acknowledged (with a heartbeat or
+// result) within this long is assumed lost in transit and claimed again
+export const CLAIM_ACK_TIMEOUT_MS = 2 * 60 * 1000;
+
+// Atomically move pending (or lost) commands to "executing" and return the
+// ones this caller claimed (the sync route and the long-poll channel may race)
+export async function claimPendingCommands(computerId: string) {
+  const claimable = () => ({
+    OR: [
+      { status: "pending" },
+      {
+        status: "executing",
+        ackedAt: null,
+        claimedAt: { lt: new Date(Date.now() - CLAIM_ACK_TIMEOUT_MS) },
+      },
+    ],
+  });
+
+  const pending = await prisma.command.findMany({
+    where: { computerId, ...claimable() },
+    orderBy: { createdAt: "asc" },
+  });
+
+  const claimed = [];
+  for (const cmd of pending) {
+    const claimedAt = new Date();
+    const { count } = await prisma.command.updateMany({
+      where: { id: cmd.id, ...claimable() },
+      data: { status: "executing", claimedAt },
+    });
+    if (count === 1) claimed.push({ ...cmd, status: "executing", claimedAt });
+  }
+  return claimed;
+}
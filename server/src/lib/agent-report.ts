@@ -0,0 +1,294 @@
+import { prisma } from "@/lib/db";
+
+// Reports only carry events that are new since the previous one, so the
+// event log alert counts error events over this window of stored reports
+const EVENT_ERROR_WINDOW_MS = 60 * 60 * 1000;
+
+// Store an agent report: find/create the computer, write the report row
+// (carrying delta sections forward) and update threshold alerts.
+// Shared by /api/agent/report and /api/agent/sync.
+export async function processAgentReport(data: any, apiKey: string) {
+  const { hostname, ip_address, mac_address, os_version, department, ...metrics } = data;
+
+  // Find or create computer
+  let computer = await prisma.computer.findUnique({ where: { hostname } });
+
+  if (!computer) {
+    computer = await prisma.computer.create({
+      data: {
+        hostname,
+        ipAddress: ip_address || "unknown",
+        macAddress: mac_address,
+        osVersion: os_version,
+        department: department || "General",
+        apiKey,
+      },
+    });
+  } else {
+    computer = await prisma.computer.update({
+      where: { id: computer.id },
+      data: {
+        ipAddress: ip_address || computer.ipAddress,
+        macAddress: mac_address || computer.macAddress,
+        osVersion: os_version || computer.osVersion,
+        department: department || computer.department,
+        lastSeenAt: new Date(),
+      },
+    });
+  }
+
+  // Delta reports: sections listed in unchanged_sections are omitted by
+  // the agent and carried forward from the previous report
+  // Empty sections ([] / {} / "") are stored as-is so they can be carried forward
+  const serialize = (value: unknown) =>
+    value === undefined || value === null ? null : JSON.stringify(value);
+  const sections = {
+    diskDetails: serialize(metrics.disk_details),
+    networkInfo: serialize(metrics.network_info),
+    osInfo: serialize(metrics.os_info),
+    software: serialize(metrics.software),
+    antivirusStatus: (metrics.antivirus_status as string | undefined) ?? null,
+    printers: serialize(metrics.printers),
+    windowsLicense: serialize(metrics.windows_license),
+    officeLicense: serialize(metrics.office_license),
+    startupPrograms: serialize(metrics.startup_programs),
+    sharedFolders: serialize(metrics.shared_folders),
+    usbDevices: serialize(metrics.usb_devices),
+    windowsUpdate: serialize(metrics.windows_update),
+    services: serialize(metrics.services),
+  };
+  const sectionColumns: Record<string, keyof typeof sections> = {
+    disk_details: "diskDetails",
+    network_info: "networkInfo",
+    os_info: "osInfo",
+    software: "software",
+    antivirus_status: "antivirusStatus",
+    printers: "printers",
+    windows_license: "windowsLicense",
+    office_license: "officeLicense",
+    startup_programs: "startupPrograms",
+    shared_folders: "sharedFolders",
+    usb_devices: "usbDevices",
+    windows_update: "windowsUpdate",
+    services: "services",
+  };
+
+  const unchanged: string[] = Array.isArray(metrics.unchanged_sections)
+    ? metrics.unchanged_sections
+    : [];
+
+  // Hashes the agent computed for each section; stored with the row so a
+  // carried-forward section can be checked against what the agent holds
+  const sectionHashes: Record<string, string> =
+    metrics.section_hashes && typeof metrics.section_hashes === "object"
+      ? { ...metrics.section_hashes }
+      : {};
+
+  let resync = false;
+  if (unchanged.length > 0) {
+    const previous = await prisma.report.findFirst({
+      where: { computerId: computer.id },
+      orderBy: { createdAt: "desc" },
+    });
+    const previousHashes: Record<string, string> = previous?.sectionHashes
+      ? JSON.parse(previous.sectionHashes)
+      : {};
+    for (const key of unchanged) {
+      const column = sectionColumns[key];
+      if (!column) continue;
+      const value = previous ? previous[column] : null;
+      const hashMatches =
+        sectionHashes[key] !== undefined && previousHashes[key] === sectionHashes[key];
+      if (value === null || value === undefined || !hashMatches) {
+        // Nothing (or something else) to carry forward - ask for a full report
+        resync = true;
+        break;
+      }
+      sections[column] = value;
+    }
+  }
+
+  if (resync) {
+    // No partial row and no alerts: the agent resends the full report at once
+    return { computer, report: null, alerts: [] as string[], resync };
+  }
+
+  // Create report
+  const report = await prisma.report.create({
+    data: {
+      computerId: computer.id,
+      cpuUsage: metrics.cpu_usage || 0,
+      cpuCores: metrics.cpu_cores,
+      cpuSpeed: metrics.cpu_speed,
+      cpuTemp: metrics.cpu_temp,
+      cpuUsageMax: metrics.cpu_usage_max ?? null,
+      cpuUsageP95: metrics.cpu_usage_p95 ?? null,
+      ramTotal: metrics.ram_total || 0,
+      ramUsed: metrics.ram_used || 0,
+      ramUsage: metrics.ram_usage || 0,
+      diskTotal: metrics.disk_total || 0,
+      diskUsed: metrics.disk_used || 0,
+      diskUsage: metrics.disk_usage || 0,
+      networkUp: metrics.network_up !== false,
+      // Link quality and throughput over the report interval
+      networkQuality: metrics.network_quality
+        ? JSON.stringify({
+            targets: metrics.network_quality,
+            throughput: metrics.network_throughput || {},
+            rxBps: metrics.network_rx_bps || 0,
+            txBps: metrics.network_tx_bps || 0,
+          })
+        : null,
+      uptime: metrics.uptime,
+      topProcesses: metrics.top_processes ? JSON.stringify(metrics.top_processes) : null,
+      // Agent sends only events new since its last report
+      eventLogs: metrics.event_logs?.length ? JSON.stringify(metrics.event_logs) : null,
+      sectionHashes: Object.keys(sectionHashes).length ? JSON.stringify(sectionHashes) : null,
+      collectionStatus: metrics.collection_status ? JSON.stringify(metrics.collection_status) : null,
+      ...sections,
+    },
+  });
+
+  // USB insert/remove events; the unique key makes a re-sent event a no-op
+  if (Array.isArray(metrics.usb_events)) {
+    for (const e of metrics.usb_events) {
+      if (!e?.device_id || !e?.action || typeof e.time !== "number") continue;
+      const occurredAt = new Date(e.time * 1000);
+      await prisma.usbEvent.upsert({
+        where: {
+          computerId_deviceId_action_occurredAt: {
+            computerId: computer.id,
+            deviceId: e.device_id,
+            action: e.action,
+            occurredAt,
+          },
+        },
+        update: {},
+        create: {
+          computerId: computer.id,
+          action: e.action,
+          name: e.name || "Unknown USB Device",
+          manufacturer: e.manufacturer || null,
+          deviceId: e.device_id,
+          occurredAt,
+        },
+      });
+    }
+  }
+
+  // Check thresholds and create alerts (deduplicated by computer + type)
+  const alerts: string[] = [];
+
+  const upsertAlert = async (
+    type: string,
+    triggered: boolean,
+    severity: "warning" | "critical",
+    message: string
+  ) => {
+    if (triggered) {
+      alerts.push(type.toUpperCase());
+      const existing = await prisma.alert.findFirst({
+        where: {
+          computerId: computer.id,
+          type,
+          resolved: false,
+        },
+        orderBy: { createdAt: "desc" },
+      });
+
+      if (existing) {
+        await prisma.alert.update({
+          where: { id: existing.id },
+          data: {
+            message,
+            severity,
+            createdAt: new Date(),
+          },
+        });
+      } else {
+        await prisma.alert.create({
+          data: {
+            computerId: computer.id,
+            type,
+            severity,
+            message,
+          },
+        });
+      }
+    } else {
+      // Automatically resolve old alert of same type when issue is gone
+      await prisma.alert.updateMany({
+        where: {
+          computerId: computer.id,
+          type,
+          resolved: false,
+        },
+        data: {
+          resolved: true,
+          resolvedAt: new Date(),
+        },
+      });
+    }
+  };
+
+  await upsertAlert(
+    "cpu_high",
+    metrics.cpu_usage > 90,
+    "critical",
+    `CPU usage is ${metrics.cpu_usage.toFixed(1)}% on ${hostname}`
+  );
+
+  await upsertAlert(
+    "ram_high",
+    metrics.ram_usage > 85,
+    metrics.ram_usage > 95 ? "critical" : "warning",
+    `RAM usage is ${metrics.ram_usage.toFixed(1)}% on ${hostname}`
+  );
+
+  await upsertAlert(
+    "disk_high",
+    metrics.disk_usage > 90,
+    metrics.disk_usage > 95 ? "critical" : "warning",
+    `Disk usage is ${metrics.disk_usage.toFixed(1)}% on ${hostname}`
+  );
+
+  const recentEventReports = await prisma.report.findMany({
+    where: {
+      computerId: computer.id,
+      createdAt: { gte: new Date(Date.now() - EVENT_ERROR_WINDOW_MS) },
+      eventLogs: { not: null },
+    },
+    select: { eventLogs: true },
+  });
+  const errorCount = recentEventReports
+    .flatMap((r) => JSON.parse(r.eventLogs as string) as { level: string }[])
+    .filter((log) => log.level === "Error" || log.level === "Critical").length;
+  await upsertAlert(
+    "event_log_error",
+    errorCount > 0,
+    "warning",
+    `${errorCount} error(s) found in Windows Event Log on ${hostname} in the last ${
+      EVENT_ERROR_WINDOW_MS / 60000
+    } minutes`
+  );
+
+  // Clean up old reports (keep last 24 hours)
+  const oneDayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
+  await prisma.report.deleteMany({
+    where: {
+      computerId: computer.id,
+      createdAt: { lt: oneDayAgo },
+    },
+  });
+
+  // USB events are kept for 90 days
+  const ninetyDaysAgo = new Date(Date.now() - 90 * 24 * 60 * 60 * 1000);
+  await prisma.usbEvent.deleteMany({
+    where: {
+      computerId: computer.id,
+      occurredAt: { lt: ninetyDaysAgo },
+    },
+  });
+
+  return { computer, report, alerts, resync };
+}
@@ -0,0 +1,61 @@
+import { NextRequest } from "next/server";
+import zlib from "node:zlib";
+
+// Cap on the decompressed size of an agent payload, so a small body cannot
+// expand without bound (full reports with software lists are ~1-2 MB)
+const MAX_DECODED_BYTES = 32 * 1024 * 1024;
+
+// Read a JSON request body, transparently decompressing agent payloads
+// sent with Content-Encoding: gzip / deflate / zstd
+export async function readJsonBody(request: NextRequest) {
+  const encoding = (request.headers.get("content-encoding") || "identity").toLowerCase();
+  if (encoding === "identity") {
+    return request.json();
+  }
+
+  const body = Buffer.from(await request.arrayBuffer());
+  const options = { maxOutputLength: MAX_DECODED_BYTES };
+  let decoded: Buffer;
+  try {
+    switch (encoding) {
+      case "gzip":
+        decoded = zlib.gunzipSync(body, options);
+        break;
+      case "deflate":
+        decoded = zlib.inflateSync(body, options);
+        break;
+      case "zstd": {
+        // zstd is available in node:zlib from Node 22.15
+        const zstdDecompressSync = (zlib as unknown as {
+          zstdDecompressSync?: (buf: Buffer, opts: { maxOutputLength: number }) => Buffer;
+        }).zstdDecompressSync;
+        if (!zstdDecompressSync) {
+          throw new UnsupportedEncodingError(encoding);
+        }
+        decoded = zstdDecompressSync(body, options);
+        break;
+      }
+      default:
+        throw new UnsupportedEncodingError(encoding);
+    }
+  } catch (error) {
+    // zlib throws ERR_BUFFER_TOO_LARGE (a RangeError) past maxOutputLength
+    if (error instanceof RangeError) {
+      throw new PayloadTooLargeError();
+    }
+    throw error;
+  }
+  return JSON.parse(decoded.toString("utf-8"));
+}
+
+export class UnsupportedEncodingError extends Error {
+  constructor(public encoding: string) {
+    super(`Unsupported Content-Encoding: ${encoding}`);
+  }
+}
+
+export class PayloadTooLargeError extends Error {
+  constructor() {
+    super(`Decompressed payload exceeds ${MAX_DECODED_BYTES} bytes`);
+  }
+}
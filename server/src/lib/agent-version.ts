@@ -0,0 +1,67 @@
+const GITHUB_REPO = "Kittisayst/it-help";
+
+// Latest agent release from GitHub Releases (cached for 5 minutes)
+export async function fetchLatestAgentRelease() {
+  const res = await fetch(
+    `https://api.github.com/repos/${GITHUB_REPO}/releases/latest`,
+    {
+      headers: { Accept: "application/vnd.github.v3+json" },
+      next: { revalidate: 300 }, // Cache for 5 minutes
+      signal: AbortSignal.timeout(5000),
+    }
+  );
+
+  if (!res.ok) {
+    return null;
+  }
+
+  const release = await res.json();
+
+  // Find the zip asset
+  const zipAsset = release.assets?.find(
+    (a: { name: string }) => a.name === "it-monitor-agent.zip"
+  );
+
+  return {
+    version: release.tag_name || "unknown",
+    name: release.name || "",
+    published_at: release.published_at,
+    download_url: zipAsset?.browser_download_url || null,
+    release_url: release.html_url,
+  };
+}
+
+type CachedRelease = {
+  release: Awaited<ReturnType<typeof fetchLatestAgentRelease>>;
+  fetchedAt: number;
+  refreshing: boolean;
+};
+
+const globalForRelease = globalThis as unknown as {
+  agentRelease: CachedRelease | undefined;
+};
+
+const releaseCache: CachedRelease =
+  globalForRelease.agentRelease ?? { release: null, fetchedAt: 0, refreshing: false };
+globalForRelease.agentRelease = releaseCache;
+
+const RELEASE_CACHE_MS = 5 * 60 * 1000;
+
+// Latest agent version without waiting on GitHub: returns the cached value
+// (null until the first fetch finishes) and refreshes it in the background
+// when stale. Used on the agent sync path, which must answer quickly.
+export function getCachedAgentVersion(): string | null {
+  if (!releaseCache.refreshing && Date.now() - releaseCache.fetchedAt > RELEASE_CACHE_MS) {
+    releaseCache.refreshing = true;
+    fetchLatestAgentRelease()
+      .then((release) => {
+        if (release) releaseCache.release = release;
+      })
+      .catch(() => {})
+      .finally(() => {
+        releaseCache.fetchedAt = Date.now();
+        releaseCache.refreshing = false;
+      });
+  }
+  return releaseCache.release?.version ?? null;
+}
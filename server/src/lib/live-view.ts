@@ -0,0 +1,86 @@
+import { EventEmitter } from "events";
+
+// In-memory live view sessions: the latest tile at each position per
+// command, so a viewer that connects mid-stream gets the full picture.
+// Frames are short-lived and never persisted.
+
+export type LiveTile = { x: number; y: number; w: number; h: number; data: string };
+
+export type LiveFrame = { seq: number; width: number; height: number; tiles: LiveTile[] };
+
+type LiveSession = {
+  width: number;
+  height: number;
+  tiles: Map<string, LiveTile>;
+  updatedAt: number;
+};
+
+// Sessions without frames for this long are dropped
+const SESSION_TTL_MS = 60_000;
+
+const globalForLive = globalThis as unknown as {
+  liveBus: EventEmitter | undefined;
+  liveSessions: Map<string, LiveSession> | undefined;
+};
+
+export const liveBus = globalForLive.liveBus ?? new EventEmitter();
+liveBus.setMaxListeners(0); // one listener per viewer
+
+const sessions = globalForLive.liveSessions ?? new Map<string, LiveSession>();
+
+if (process.env.NODE_ENV !== "production") {
+  globalForLive.liveBus = liveBus;
+  globalForLive.liveSessions = sessions;
+}
+
+// Decode the agent's binary frame:
+// 4-byte big-endian header length | JSON header | tile JPEGs back to back
+export function parseFrame(body: Buffer): LiveFrame {
+  const headerLength = body.readUInt32BE(0);
+  const header = JSON.parse(body.subarray(4, 4 + headerLength).toString("utf-8"));
+  let offset = 4 + headerLength;
+
+  const tiles: LiveTile[] = [];
+  for (const [x, y, w, h, size] of header.tiles as number[][]) {
+    if (offset + size > body.length) throw new Error("Truncated frame");
+    tiles.push({ x, y, w, h, data: body.subarray(offset, offset + size).toString("base64") });
+    offset += size;
+  }
+  return { seq: header.seq, width: header.width, height: header.height, tiles };
+}
+
+export function publishFrame(commandId: string, frame: LiveFrame) {
+  const now = Date.now();
+  for (const [id, session] of sessions) {
+    if (now - session.updatedAt > SESSION_TTL_MS) sessions.delete(id);
+  }
+
+  let session = sessions.get(commandId);
+  if (!session || session.width !== frame.width || session.height !== frame.height) {
+    session = { width: frame.width, height: frame.height, tiles: new Map(), updatedAt: now };
+    sessions.set(commandId, session);
+  }
+  for (const tile of frame.tiles) {
+    session.tiles.set(`${tile.x},${tile.y}`, tile);
+  }
+  session.updatedAt = now;
+
+  liveBus.emit(`frame:${commandId}`, frame);
+}
+
+// Full current picture for a newly connected viewer
+export function getSnapshot(commandId: string): LiveFrame | null {
+  const session = sessions.get(commandId);
+  if (!session) return null;
+  return {
+    seq: -1,
+    width: session.width,
+    height: session.height,
+    tiles: Array.from(session.tiles.values()),
+  };
+}
+
+export function endLiveSession(commandId: string) {
+  sessions.delete(commandId);
+  liveBus.emit(`end:${commandId}`);
+}